@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Benchmark startup of a catalog-backed TemplateManager against eager loading.
+
+Usage:
+    PYTHONPATH=src python benchmarks/bench_catalog_startup.py [templates]
+"""
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from scaledown.templates import Template, TemplateManager, load_template_catalog
+from scaledown.utils.catalog import write_packed_catalog
+
+
+def make_records(count):
+    return [
+        {
+            "id": f"template-{i}",
+            "title": f"Generated template {i}",
+            "template": f"Summarize [topic] for [audience] with focus area {i % 97}.",
+            "category": f"category-{i % 20}",
+            "subcategory": f"subcategory-{i % 200}",
+        }
+        for i in range(count)
+    ]
+
+
+def measure(name, func):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{name:<28} {elapsed * 1000:10.1f} ms  {peak / 1024 / 1024:8.1f} MB peak")
+    return result
+
+
+def eager(records):
+    manager = TemplateManager()
+    for record in records:
+        manager.add_template(Template.from_dict(record))
+    return manager
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    records = make_records(count)
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "templates.sdcat")
+        start = time.perf_counter()
+        write_packed_catalog(records, path)
+        print(f"{count:,} templates, packed catalog {os.path.getsize(path) / 1024 / 1024:.1f} MB "
+              f"written in {time.perf_counter() - start:.2f}s\n")
+
+        measure("eager TemplateManager", lambda: eager(records))
+        manager = measure("catalog startup", lambda: load_template_catalog(path))
+        measure("catalog first get", lambda: manager.get_template(f"template-{count // 2}"))
+        measure("catalog 1,000 gets", lambda: [manager.get_template(f"template-{i}")
+                                              for i in range(0, count, max(1, count // 1000))])
+        measure("catalog full listing", lambda: manager.count_templates())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Compare fixed and adaptive concurrency limits against a loaded provider.
+
+The mock provider serves --capacity concurrent calls at its base latency,
+slows down in proportion to load beyond that, and answers 429 above
+--rate-limit concurrent calls.
+
+Usage:
+    PYTHONPATH=src python benchmarks/bench_concurrency.py [--calls 600]
+"""
+import argparse
+import time
+
+from scaledown.models.llm_model import LLMModel
+from scaledown.models.scheduler import RequestScheduler
+from scaledown.tools.llms import RateLimitError
+
+
+def run(scheduler, args):
+    configuration = {"MOCK_LATENCY": str(args.latency), "MOCK_CAPACITY": str(args.capacity),
+                     "MOCK_RATE_LIMIT": str(args.rate_limit)}
+    model = LLMModel("mock", configuration=configuration, scheduler=scheduler)
+
+    start = time.perf_counter()
+    futures = [model.submit(f"Summarize document {i}", 200) for i in range(args.calls)]
+    rate_limited = 0
+    for future in futures:
+        try:
+            future.result()
+        except RateLimitError:
+            rate_limited += 1
+    elapsed = time.perf_counter() - start
+    stats = scheduler.stats()["providers"]["mock"]
+    scheduler.shutdown()
+    return (args.calls - rate_limited) / elapsed, rate_limited, stats
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=600)
+    parser.add_argument("--latency", type=float, default=0.02)
+    parser.add_argument("--capacity", type=int, default=16)
+    parser.add_argument("--rate-limit", type=int, default=24)
+    args = parser.parse_args()
+
+    runs = {
+        "fixed 4": RequestScheduler(concurrency=4),
+        "fixed 32": RequestScheduler(concurrency=32),
+        "adaptive": RequestScheduler(concurrency=4, adaptive=True),
+    }
+    for name, scheduler in runs.items():
+        throughput, rate_limited, stats = run(scheduler, args)
+        line = f"{name:<9} {throughput:7.0f} ok/s  {rate_limited:4d} rate limited  final limit {stats['limit']}"
+        if "limiter" in stats:
+            line += f"  decisions {stats['limiter']['decisions']}"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
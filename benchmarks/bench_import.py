@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Benchmark package import time in fresh interpreters.
+
+Each scenario runs in a new process, so nothing is cached between runs.
+
+Usage:
+    PYTHONPATH=src python benchmarks/bench_import.py [runs]
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+
+SCENARIOS = {
+    "import scaledown": "import scaledown",
+    "scaledown.sd": "import scaledown; scaledown.sd",
+    "ScaleDown().get_prompt": ("from scaledown import ScaleDown; s = ScaleDown(); "
+                               "s.select_template('technical-2'); "
+                               "s.set_values({p: 'x' for p in s.current_template.placeholders}); s.get_prompt()"),
+    "optimize_prompt": "from scaledown import optimize_prompt; optimize_prompt('Why?', ['cot'])",
+}
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+exec({code!r})
+elapsed = time.perf_counter() - start
+print(json.dumps({{"seconds": elapsed,
+                   "modules": len(sys.modules),
+                   "requests": "requests" in sys.modules}}))
+"""
+
+
+def run(code):
+    output = subprocess.run([sys.executable, "-c", PROBE.format(code=code)], env=os.environ,
+                            check=True, capture_output=True, text=True).stdout
+    return json.loads(output)
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 15
+    print(f"{'scenario':<26} {'median ms':>10} {'min ms':>8} {'modules':>8}  requests loaded")
+    for name, code in SCENARIOS.items():
+        results = [run(code) for _ in range(runs)]
+        seconds = [result["seconds"] for result in results]
+        print(f"{name:<26} {statistics.median(seconds) * 1000:10.1f} {min(seconds) * 1000:8.1f} "
+              f"{results[0]['modules']:8d}  {results[0]['requests']}")
+
+
+if __name__ == "__main__":
+    main()
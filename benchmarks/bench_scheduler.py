@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Measure interactive latency while a batch job shares the same provider.
+
+A batch tenant floods the mock provider while interactive calls arrive at a
+steady rate. Every run allows the same number of concurrent provider calls:
+"fifo" queues all calls as one tenant at one priority, "fair" gives the
+batch job its own tenant, and "priority" also marks its calls as batch.
+
+Usage:
+    PYTHONPATH=src python benchmarks/bench_scheduler.py [--batch 400] [--interactive 50]
+"""
+import argparse
+import threading
+import time
+
+from scaledown.models.llm_model import LLMModel
+from scaledown.models.scheduler import RequestScheduler
+
+
+def run(batch_tenant, batch_priority, args):
+    scheduler = RequestScheduler(concurrency=args.concurrency)
+    configuration = {"MOCK_LATENCY": str(args.latency)}
+    batch = LLMModel("mock", configuration=configuration, scheduler=scheduler,
+                     priority=batch_priority, tenant=batch_tenant)
+    live = LLMModel("mock", configuration=configuration, scheduler=scheduler, tenant="live")
+
+    batch_futures = [batch.submit(f"Summarize document {i}", 200) for i in range(args.batch)]
+    latencies = []
+
+    def interactive():
+        start = time.perf_counter()
+        live.call_llm("Where is my order?", 200)
+        latencies.append(time.perf_counter() - start)
+
+    threads = []
+    for _ in range(args.interactive):
+        thread = threading.Thread(target=interactive)
+        thread.start()
+        threads.append(thread)
+        time.sleep(args.latency)
+    for thread in threads:
+        thread.join()
+    for future in batch_futures:
+        future.result()
+    scheduler.shutdown()
+
+    latencies.sort()
+    return latencies[len(latencies) // 2], latencies[int(len(latencies) * 0.99)]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--batch", type=int, default=400)
+    parser.add_argument("--interactive", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=0.02)
+    args = parser.parse_args()
+
+    runs = (("fifo", "live", "default"), ("fair", "nightly", "default"), ("priority", "nightly", "batch"))
+    for name, tenant, priority in runs:
+        p50, p99 = run(tenant, priority, args)
+        print(f"{name:<9} interactive p50 {p50 * 1000:7.1f} ms   p99 {p99 * 1000:7.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
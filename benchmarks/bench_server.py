@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Load-test the embedded HTTP server against the mock stand-in provider.
+
+Starts a server in-process (or targets --port of a running `scaledown serve`)
+and keeps a fixed number of keep-alive connections busy.
+
+Usage:
+    PYTHONPATH=src python benchmarks/bench_server.py [--endpoint render] [--concurrency 64]
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from scaledown.api import ScaleDown
+from scaledown.server import ScaleDownServer
+
+
+PAYLOADS = {
+    "render": {"template": "technical-2", "style": "expert_thinking",
+               "values": {"issue": "Crash on save", "component": "editor"}},
+    "optimize": {"prompt": "Explain how the cache is invalidated.", "optimizers": ["cot", "uncertainty"]},
+    "count-tokens": {"text": "Explain how the cache is invalidated. " * 50},
+    "optimize-and-call": {"question": "Explain how the cache is invalidated.",
+                          "optimizers": ["cot"], "model": "mock"},
+}
+
+
+async def client(port, path, body, deadline, latencies, statuses):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    request = (f"POST {path} HTTP/1.1\r\nHost: bench\r\nContent-Type: application/json\r\n"
+               f"Content-Length: {len(body)}\r\n\r\n").encode() + body
+    try:
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            writer.write(request)
+            await writer.drain()
+            status_line = await reader.readline()
+            length = 0
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b""):
+                    break
+                if line.lower().startswith(b"content-length:"):
+                    length = int(line.split(b":")[1])
+            await reader.readexactly(length)
+            status = int(status_line.split()[1])
+            statuses[status] = statuses.get(status, 0) + 1
+            latencies.append(time.perf_counter() - start)
+            if status == 503:
+                # Back off briefly, as a well-behaved client honouring Retry-After would
+                await asyncio.sleep(0.01)
+    finally:
+        writer.close()
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--endpoint", default="render", choices=sorted(PAYLOADS))
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--queue-size", type=int, default=64)
+    parser.add_argument("--mock-latency", type=float, default=0.05)
+    parser.add_argument("--port", type=int, help="Target a running server instead of starting one")
+    args = parser.parse_args()
+
+    server = None
+    port = args.port
+    if port is None:
+        scaledown = ScaleDown(model_configuration={"MOCK_LATENCY": str(args.mock_latency)})
+        server = ScaleDownServer(scaledown, port=0, workers=args.workers, queue_size=args.queue_size)
+        await server.start()
+        port = server.port
+
+    body = json.dumps(PAYLOADS[args.endpoint]).encode()
+    latencies, statuses = [], {}
+    deadline = time.perf_counter() + args.seconds
+    await asyncio.gather(*(client(port, f"/{args.endpoint}", body, deadline, latencies, statuses)
+                           for _ in range(args.concurrency)))
+
+    latencies.sort()
+    ok = statuses.get(200, 0)
+    print(f"/{args.endpoint}: {len(latencies):,} requests in {args.seconds:.1f}s "
+          f"({ok / args.seconds:,.0f} ok/s), statuses {statuses}")
+    if latencies:
+        print(f"latency p50 {latencies[len(latencies) // 2] * 1000:.1f} ms, "
+              f"p99 {latencies[int(len(latencies) * 0.99)] * 1000:.1f} ms")
+
+    if server:
+        await server.shutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Benchmark compiled template rendering against the previous replace-based loop.
+
+Usage:
+    PYTHONPATH=src python benchmarks/bench_template_render.py [rows]
+"""
+import sys
+import time
+
+from scaledown.templates import Template
+
+
+def legacy_render(template, **kwargs):
+    """The pre-compilation Template.render: one str.replace pass per value."""
+    filled_template = template.template_text
+    for placeholder, value in kwargs.items():
+        if placeholder in template.placeholders:
+            filled_template = filled_template.replace(f"[{placeholder}]", str(value))
+    return filled_template
+
+
+def make_rows(count):
+    return [
+        {
+            "issue": f"Crash #{i} when saving a file larger than {i % 512} MB",
+            "component": f"storage-{i % 17}",
+            "version": f"2.{i % 9}.{i % 31}",
+            "steps": "Open the editor, paste a large document and press save. " * 4,
+        }
+        for i in range(count)
+    ]
+
+
+def bench(name, func, rows):
+    start = time.perf_counter()
+    count = 0
+    for _ in func(rows):
+        count += 1
+    elapsed = time.perf_counter() - start
+    print(f"{name:<20} {count:>9} rows  {elapsed:8.3f}s  {count / elapsed:12,.0f} rows/s")
+    return elapsed
+
+
+def run(template, rows):
+    print(f"\n{template.title}: {len(rows):,} rows, {len(template.template_text):,} chars, "
+          f"{len(template.placeholders)} placeholder slots")
+    legacy = bench("legacy replace", lambda rs: (legacy_render(template, **r) for r in rs), rows)
+    single = bench("render", lambda rs: (template.render(**r) for r in rs), rows)
+    many = bench("render_many", template.render_many, rows)
+    print(f"speedup: render {legacy / single:.2f}x, render_many {legacy / many:.2f}x")
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    rows = make_rows(count)
+
+    short = Template(
+        id="bench-short",
+        title="Bug report",
+        template_text=("Create a detailed bug report for [issue] in [component] (version [version]). "
+                       "Steps to reproduce: [steps]. Expected behavior for [component] in [version]: "
+                       "no crash. Include the [issue] title in the summary."),
+        category="technical"
+    )
+    run(short, rows)
+
+    section = ("Section on [component]: describe how [issue] affects release [version] and list "
+               "the mitigations considered so far. ") * 3
+    long = Template(
+        id="bench-long",
+        title="Incident review",
+        template_text=("Write an incident review. " + section * 12 + "Reproduction: [steps]"),
+        category="technical"
+    )
+    run(long, rows[:max(1, count // 10)])
+
+
+if __name__ == "__main__":
+    main()
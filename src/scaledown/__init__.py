@@ -1,29 +1,63 @@
-from .templates import Template, TemplateManager, get_default_manager as get_default_template_manager
-from .styles import (
-    Style, StyleManager, get_default_style_manager, get_enhanced_style_manager,
-    OptimizationStyle
-)
-from .api import ScaleDown
-
-# Import optimization components
-try:
-    from .optimization import (
-        optimize_prompt, parse_optimizers, OPTIMIZER_PROMPTS,
-        get_optimizer_registry, PromptOptimizerRegistry
-    )
-    _optimization_available = True
-except ImportError:
-    _optimization_available = False
+"""
+ScaleDown: prompt templates, styles and optimization for LLM calls.
 
-# Import tools for backward compatibility
+Public names are imported on first access (PEP 562), and the shared ``sd``
+instance is created the first time it is used, so ``import scaledown`` stays
+cheap for CLI invocations and cold starts.
+"""
+import importlib
+import threading
+
+# Import tools eagerly: the ``tools`` function shadows the ``scaledown.tools``
+# subpackage, which lazy lookup could not guarantee. Its provider SDK imports
+# are themselves deferred until first use.
 try:
     from .tools import tools, LLMProviderFactory
     _tools_available = True
 except ImportError:
     _tools_available = False
 
-# Create a singleton instance for easy access with optimization enabled
-sd = ScaleDown(enable_optimization_styles=True)
+_LAZY_ATTRIBUTES = {
+    'Template': ('.templates', 'Template'),
+    'TemplateManager': ('.templates', 'TemplateManager'),
+    'get_default_template_manager': ('.templates', 'get_default_manager'),
+    'Style': ('.styles', 'Style'),
+    'StyleManager': ('.styles', 'StyleManager'),
+    'OptimizationStyle': ('.styles', 'OptimizationStyle'),
+    'get_default_style_manager': ('.styles', 'get_default_style_manager'),
+    'get_enhanced_style_manager': ('.styles', 'get_enhanced_style_manager'),
+    'ScaleDown': ('.api', 'ScaleDown'),
+    'PromptRequest': ('.request', 'PromptRequest'),
+    'optimize_prompt': ('.optimization', 'optimize_prompt'),
+    'parse_optimizers': ('.optimization', 'parse_optimizers'),
+    'OPTIMIZER_PROMPTS': ('.optimization', 'OPTIMIZER_PROMPTS'),
+    'get_optimizer_registry': ('.optimization', 'get_optimizer_registry'),
+    'PromptOptimizerRegistry': ('.optimization', 'PromptOptimizerRegistry'),
+}
+
+_sd_lock = threading.Lock()
+
+
+def __getattr__(name):
+    if name == "sd":
+        # Create the singleton instance, with optimization enabled, on first use
+        with _sd_lock:
+            if "sd" not in globals():
+                from .api import ScaleDown
+                globals()["sd"] = ScaleDown(enable_optimization_styles=True)
+        return globals()["sd"]
+
+    if name not in _LAZY_ATTRIBUTES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    module_name, attribute = _LAZY_ATTRIBUTES[name]
+    value = getattr(importlib.import_module(module_name, __name__), attribute)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
+
 
 # Export main classes
 __all__ = [
@@ -33,22 +67,18 @@ __all__ = [
     'StyleManager',
     'OptimizationStyle',
     'ScaleDown',
+    'PromptRequest',
     'sd',
     'get_default_template_manager',
     'get_default_style_manager',
-    'get_enhanced_style_manager'
+    'get_enhanced_style_manager',
+    'optimize_prompt',
+    'parse_optimizers',
+    'OPTIMIZER_PROMPTS',
+    'get_optimizer_registry',
+    'PromptOptimizerRegistry'
 ]
 
-# Add optimization exports if available
-if _optimization_available:
-    __all__.extend([
-        'optimize_prompt',
-        'parse_optimizers',
-        'OPTIMIZER_PROMPTS',
-        'get_optimizer_registry',
-        'PromptOptimizerRegistry'
-    ])
-
 # Add tools exports if available
 if _tools_available:
     __all__.extend([
@@ -57,4 +87,4 @@ if _tools_available:
     ])
 
 # Version info
-__version__ = "0.2.0"
\ No newline at end of file
+__version__ = "0.2.0"
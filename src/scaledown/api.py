@@ -1,37 +1,99 @@
-from typing import Dict, List, Optional, Union, Any
+from typing import TYPE_CHECKING, Dict, List, Optional, Union, Any
 import json
+import threading
 
-from .templates import Template, TemplateManager, get_default_manager as get_default_template_manager
+from .utils.cache import LRUCache
+from .utils.tracing import span
+from .templates import Template, TemplateManager, PromptDocument, get_default_manager as get_default_template_manager
 from .styles import (
     Style, StyleManager, get_default_style_manager, get_enhanced_style_manager,
     OptimizationStyle, get_optimization_style_by_optimizers
 )
+from .request import PromptRequest
+
+if TYPE_CHECKING:
+    from .models.scheduler import RequestScheduler
+
+
+def _prompt_key(template: Template, values: Dict[str, Any], style: Optional[Style],
+                optimizers: tuple = ()) -> Optional[tuple]:
+    """Memo key for a rendered prompt, or None if a placeholder has no value."""
+    if any(p not in values for p in template.placeholders):
+        return None
+    
+    style_key = None
+    if style:
+        style_key = (style.id, style.template_modifier, tuple(getattr(style, "optimizers", ())))
+    filled = tuple(str(values[name]) for name in template._slot_names)
+    return (template.id, template.version, filled, style_key, optimizers)
 
 class ScaleDown:
     """Main interface for the ScaleDown package."""
     
-    def __init__(self, enable_optimization_styles: bool = True):
-        """Initialize ScaleDown with default managers."""
+    def __init__(self, enable_optimization_styles: bool = True,
+                 template_catalog: Optional[str] = None, style_catalog: Optional[str] = None,
+                 watch_catalogs: bool = False, prompt_cache_size: int = 128,
+                 model_configuration: Optional[Dict[str, str]] = None,
+                 scheduler: Optional['RequestScheduler'] = None):
+        """Initialize ScaleDown with default managers.
+        
+        Args:
+            enable_optimization_styles: Include the optimization styles
+            template_catalog: Optional packed catalog file or directory of extra templates
+            style_catalog: Optional packed catalog file or directory of extra styles
+            watch_catalogs: Reload the catalogs in the background when they change
+            prompt_cache_size: Number of rendered prompts memoized by get_prompt
+            model_configuration: API keys etc. for models created by execute()
+            scheduler: Optional RequestScheduler queueing the calls of models created by execute()
+        
+        Catalog entries are decoded on first access; built-in templates and
+        styles take precedence over catalog entries with the same ID.
+        """
         self.template_manager = get_default_template_manager()
         self.style_manager = get_enhanced_style_manager() if enable_optimization_styles else get_default_style_manager()
+        self.catalog_watchers = []
+        if watch_catalogs:
+            if template_catalog:
+                self.catalog_watchers.append(self.template_manager.watch_catalog(template_catalog))
+            if style_catalog:
+                self.catalog_watchers.append(self.style_manager.watch_catalog(style_catalog))
+        elif template_catalog or style_catalog:
+            from .utils.catalog import open_catalog
+            if template_catalog:
+                self.template_manager.attach_catalog(open_catalog(template_catalog))
+            if style_catalog:
+                self.style_manager.attach_catalog(open_catalog(style_catalog))
         self.current_template = None
         self.current_style = None
         self.current_model = None
         self.template_values = {}
         self.optimization_enabled = enable_optimization_styles
+        self._prompt_cache = LRUCache(prompt_cache_size, name="prompt")
+        self.model_configuration = model_configuration or {}
+        self.scheduler = scheduler
+        self._models: Dict[tuple, Any] = {}
+        self._models_lock = threading.Lock()
     
-    def load(self, item_type: str) -> List[Dict[str, str]]:
+    def load(self, item_type: str, offset: int = 0, limit: Optional[int] = None) -> List[Dict[str, str]]:
         """Load templates, styles, or models.
         
         Args:
             item_type: Type of items to load ("templates", "styles", or "models")
+            offset: Number of templates to skip (templates only)
+            limit: Maximum number of templates to return (templates only)
             
         Returns:
             List of items with their id, name, and description
         """
         if item_type.lower() == "templates":
             return [{"id": t.id, "title": t.title, "description": t.template_text} 
-                    for t in self.template_manager.list_templates()]
+                    for t in self.template_manager.list_templates(offset=offset, limit=limit)]
+        
+        elif item_type.lower() == "categories":
+            from .categories import CategoryManager
+            return [{"id": c.name, "name": c.name,
+                     "description": f"{c.template_count} templates in {len(c.subcategories)} subcategories"}
+                    for c in CategoryManager(self.template_manager).list_categories()]
         
         elif item_type.lower() == "styles":
             return [{"id": s.id, "name": s.name, "description": s.description} 
@@ -53,7 +115,23 @@ class ScaleDown:
             return [{"id": r.lower(), "name": r, "description": f"Expert role: {r}"} for r in EXPERT_ROLES]
         
         else:
-            raise ValueError(f"Invalid item type: {item_type}. Choose from: templates, styles, models, expert_domains, expert_roles")
+            raise ValueError(f"Invalid item type: {item_type}. Choose from: templates, categories, styles, models, expert_domains, expert_roles")
+    
+    def search_templates(self, query: str, limit: int = 10, offset: int = 0,
+                         category: Optional[str] = None) -> List[Dict[str, str]]:
+        """Search templates by title and text, best matches first.
+        
+        Args:
+            query: Free-text search query
+            limit: Maximum number of results
+            offset: Number of top results to skip
+            category: Optional category filter
+            
+        Returns:
+            List of templates with their id, title, and description
+        """
+        return [{"id": t.id, "title": t.title, "description": t.template_text}
+                for t in self.template_manager.search_templates(query, limit, offset, category)]
     
     def select_template(self, template_id: str) -> Template:
         """Select a template by ID."""
@@ -90,8 +168,45 @@ class ScaleDown:
         """Set multiple values for template variables."""
         self.template_values.update(values)
     
+    def _get_prompt_key(self) -> Optional[tuple]:
+        """Memo key for the current template version, values and style.
+        
+        Built on every call rather than cached on the instance, so values
+        written directly to template_values are never served stale.
+        Returns None when the prompt cannot be rendered, so the error is
+        raised by the normal rendering path.
+        """
+        if not self.current_template:
+            return None
+        return _prompt_key(self.current_template, self.template_values, self.current_style)
+    
     def get_prompt(self) -> str:
-        """Generate a prompt using the current template, values, and style."""
+        """Generate a prompt using the current template, values, and style.
+        
+        Rendered prompts are memoized per template version, values and style,
+        so repeated calls skip rendering and the optimizer pipeline.
+        """
+        key = self._get_prompt_key()
+        if key is not None:
+            prompt = self._prompt_cache.get(key)
+            if prompt is not None:
+                return prompt
+        
+        prompt = self.get_prompt_document().render()
+        if key is not None:
+            self._prompt_cache.put(key, prompt)
+        return prompt
+    
+    def prompt_cache_stats(self) -> Dict[str, Any]:
+        """Return hit/miss statistics of the get_prompt memo."""
+        return self._prompt_cache.stats()
+    
+    def get_prompt_document(self) -> PromptDocument:
+        """Generate a segmented prompt using the current template, values, and style.
+        
+        The returned document is joined into a string only when it reaches
+        the provider (or when render() is called).
+        """
         if not self.current_template:
             raise ValueError("No template selected. Call select_template() first.")
         
@@ -102,14 +217,160 @@ class ScaleDown:
             raise ValueError(f"Missing values for placeholders: {', '.join(missing)}")
         
         # Render the template
-        prompt = self.current_template.render(**self.template_values)
+        with span("scaledown.render", template=self.current_template.id):
+            document = self.current_template.render_document(**self.template_values)
         
         # Apply style if one is selected
         if self.current_style:
-            prompt = self.current_style.apply_to_prompt(prompt)
+            with span("scaledown.style", style=self.current_style.id):
+                document = self.current_style.apply_to_document(document)
+        
+        return document
+    
+    def _resolve(self, request: PromptRequest):
+        """Look up the template and style of a request."""
+        template = request.template
+        if isinstance(template, str):
+            template = self.template_manager.get_template(template)
+            if not template:
+                raise ValueError(f"Template not found: {request.template}")
+        
+        style = request.style
+        if isinstance(style, str):
+            style = self.style_manager.get_style(style)
+            if not style:
+                raise ValueError(f"Style not found: {request.style}")
+        
+        return template, style
+    
+    def build_document(self, request: PromptRequest, apply_optimizers: bool = True) -> PromptDocument:
+        """Build a segmented prompt for a request without touching instance state.
+        
+        Args:
+            request: The prompt request
+            apply_optimizers: Apply the request's optimizers to the document
+            
+        Returns:
+            A new PromptDocument
+        """
+        template, style = self._resolve(request)
+        if template is None:
+            document = PromptDocument.from_text(request.question)
+        else:
+            with span("scaledown.render", template=template.id):
+                document = template.render_document(**request.values)
+        
+        if style:
+            with span("scaledown.style", style=style.id):
+                document = style.apply_to_document(document)
+        
+        if apply_optimizers and request.optimizers:
+            from .optimization.prompt_optimizers import get_optimizer_registry
+            document = get_optimizer_registry().apply_optimizers_to_document(document, list(request.optimizers))
+        
+        return document
+    
+    def build(self, request: PromptRequest) -> str:
+        """Build the prompt string for a request without touching instance state.
         
+        Safe to call from many threads at once. Rendered prompts share the
+        get_prompt memo.
+        """
+        template, style = self._resolve(request)
+        key = _prompt_key(template, request.values, style, request.optimizers) if template else None
+        if key is not None:
+            prompt = self._prompt_cache.get(key)
+            if prompt is not None:
+                return prompt
+        
+        prompt = self.build_document(request).render()
+        if key is not None:
+            self._prompt_cache.put(key, prompt)
         return prompt
     
+    def _get_model(self, request: PromptRequest):
+        """Get the model for a request, creating each named model once."""
+        if request.model is None:
+            raise ValueError("No model in request")
+        if not isinstance(request.model, str):
+            return request.model
+        
+        key = (request.model, request.temperature)
+        model = self._models.get(key)
+        if model is None:
+            with self._models_lock:
+                model = self._models.get(key)
+                if model is None:
+                    from .models.llm_model import LLMModelFactory
+                    model = LLMModelFactory.create_model(model_name=request.model,
+                                                         temperature=request.temperature,
+                                                         configuration=self.model_configuration,
+                                                         scheduler=self.scheduler)
+                    self._models[key] = model
+        return model
+    
+    def execute(self, request: PromptRequest) -> Dict[str, Any]:
+        """Build a request's prompt, optimize it and call its model.
+        
+        Never reads or writes the instance's current template, style, values
+        or model, so one ScaleDown can execute requests concurrently.
+        
+        Returns:
+            Dictionary with optimization info and LLM response
+        """
+        model = self._get_model(request)
+        document = self.build_document(request, apply_optimizers=False)
+        options = {"priority": request.priority, "tenant": request.tenant}
+        if getattr(model, "output_budget", None) is not None:
+            # Output budgets are learned per style and template
+            options["style"] = getattr(request.style, "id", request.style)
+            options["template"] = getattr(request.template, "id", request.template)
+        options = {name: value for name, value in options.items() if value is not None}
+        return model.optimize_and_call(document, list(request.optimizers), request.max_tokens,
+                                       context=request.context, **options)
+    
+    def render_bulk(self, input_path: str, output_path: str, template_id: Optional[str] = None,
+                    style_id: Optional[str] = None, optimizers: Optional[List[str]] = None,
+                    **options) -> Dict[str, Any]:
+        """Render a template for every row of a CSV, JSONL or Parquet file.
+        
+        Rows are streamed and never touch the instance's current values.
+        
+        Args:
+            input_path: File of template values, one row per prompt
+            output_path: JSONL or CSV file to write prompts to
+            template_id: Template to render (defaults to the current template)
+            style_id: Style to apply (defaults to the current style)
+            optimizers: Optional optimizer names applied to each prompt
+            **options: chunk_size, workers, on_error, input_format,
+                output_format and id_field (see BulkRenderer)
+            
+        Returns:
+            Dictionary with row counts and timing
+        """
+        from .bulk import BulkRenderer
+        
+        if template_id:
+            template = self.template_manager.get_template(template_id)
+            if not template:
+                raise ValueError(f"Template not found: {template_id}")
+        elif self.current_template:
+            template = self.current_template
+        else:
+            raise ValueError("No template selected. Pass template_id or call select_template() first.")
+        
+        if style_id:
+            style = self.style_manager.get_style(style_id)
+            if not style:
+                raise ValueError(f"Style not found: {style_id}")
+        else:
+            style = self.current_style
+        
+        file_options = {key: options.pop(key) for key in ("input_format", "output_format", "id_field")
+                        if key in options}
+        renderer = BulkRenderer(template, style=style, optimizers=optimizers, **options)
+        return renderer.render_file(input_path, output_path, **file_options)
+    
     def mock_optimize(self, prompt: Optional[str] = None) -> Dict[str, Any]:
         """Mock optimization function for testing."""
         if prompt is None:
@@ -148,7 +409,8 @@ class ScaleDown:
             self.current_model = LLMModelFactory.create_model(
                 model_name=model_name,
                 temperature=temperature,
-                configuration=configuration
+                configuration=configuration,
+                scheduler=self.scheduler
             )
         except ImportError:
             # Fallback if LLM integration not available
@@ -174,8 +436,9 @@ class ScaleDown:
         try:
             from .optimization.prompt_optimizers import get_optimizer_registry
             registry = get_optimizer_registry()
-            optimized_prompt = registry.apply_optimizers(prompt, optimizers)
-            report = registry.get_optimization_report(prompt, optimized_prompt, optimizers)
+            stats = {}
+            optimized_prompt = registry.apply_optimizers(prompt, optimizers, stats)
+            report = registry.get_optimization_report(prompt, optimized_prompt, optimizers, stats)
 
             return report
         except ImportError:
@@ -188,13 +451,17 @@ class ScaleDown:
             }
 
     def optimize_and_call_llm(self, question: str, optimizers: List[str],
-                             max_tokens: int = 1000) -> Dict[str, Any]:
+                             max_tokens: Optional[int] = None, context: str = "") -> Dict[str, Any]:
         """Optimize prompt and call LLM in one step.
 
         Args:
             question: The question or prompt
             optimizers: List of optimizer names to apply
-            max_tokens: Maximum tokens for response
+            max_tokens: Maximum tokens for response; if None, the model predicts a
+                budget from past outputs with the same optimizers, style and template
+            context: Optional shared context (e.g. retrieved documents). It is
+                not run through the optimizers and is cached by providers that
+                support a separate context channel.
 
         Returns:
             Dictionary with optimization info and LLM response
@@ -202,12 +469,21 @@ class ScaleDown:
         if not self.current_model:
             raise ValueError("No model selected. Call select_model() first.")
 
-        if self.current_template:
-            prompt = self.get_prompt()
-        else:
-            prompt = question
+        with span("scaledown.optimize_and_call_llm", model=getattr(self.current_model, "model_name", None),
+                  optimizers=list(optimizers)):
+            if self.current_template:
+                prompt = self.get_prompt_document()
+            else:
+                prompt = question
 
-        return self.current_model.optimize_and_call(prompt, optimizers, max_tokens)
+            options = {}
+            if getattr(self.current_model, "output_budget", None) is not None:
+                # Output budgets are learned per style and template
+                if self.current_style:
+                    options["style"] = self.current_style.id
+                if self.current_template:
+                    options["template"] = self.current_template.id
+            return self.current_model.optimize_and_call(prompt, optimizers, max_tokens, context=context, **options)
 
     def select_optimization_style(self, optimizers: List[str]) -> Optional[OptimizationStyle]:
         """Select an optimization style based on optimizer list.
@@ -248,8 +524,7 @@ class ScaleDown:
             List of optimization style information
         """
         try:
-            from .styles.optimization_style import create_default_optimization_styles
-            styles = create_default_optimization_styles()
-            return [style.to_dict() for style in styles]
+            from .styles.optimization_style import get_default_optimization_styles
+            return [style.to_dict() for style in get_default_optimization_styles()]
         except ImportError:
             return []
\ No newline at end of file
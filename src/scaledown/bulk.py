@@ -0,0 +1,236 @@
+"""
+Streaming bulk rendering of prompts from CSV, JSONL and Parquet inputs.
+
+Rows are read lazily, rendered in chunks through the compiled template (plus an
+optional style and optimizers) and written out as each chunk completes, so
+memory stays constant however large the input is. Chunks can be spread over
+several processes.
+"""
+import csv
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .templates import Template
+from .styles import Style
+
+
+SUPPORTED_FORMATS = ("csv", "jsonl", "parquet")
+
+_EXTENSIONS = {
+    ".csv": "csv",
+    ".jsonl": "jsonl",
+    ".ndjson": "jsonl",
+    ".parquet": "parquet",
+    ".pq": "parquet",
+}
+
+
+def detect_format(path: str) -> str:
+    """Detect the file format from a path's extension."""
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in _EXTENSIONS:
+        raise ValueError(f"Cannot detect format of '{path}'. Choose from: {', '.join(SUPPORTED_FORMATS)}")
+    return _EXTENSIONS[extension]
+
+
+def read_rows(path: str, input_format: Optional[str] = None, batch_size: int = 10000) -> Iterator[Dict[str, Any]]:
+    """Lazily read rows of template values from a file.
+
+    Args:
+        path: Input file path
+        input_format: "csv", "jsonl" or "parquet" (detected from the extension if None)
+        batch_size: Rows decoded at a time from Parquet files
+
+    Returns:
+        Iterator of value dictionaries
+    """
+    input_format = input_format or detect_format(path)
+
+    if input_format == "csv":
+        with open(path, newline="", encoding="utf-8") as f:
+            yield from csv.DictReader(f)
+
+    elif input_format == "jsonl":
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+    elif input_format == "parquet":
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("pyarrow is required to read Parquet files: pip install pyarrow")
+
+        parquet_file = pq.ParquetFile(path)
+        for batch in parquet_file.iter_batches(batch_size=batch_size):
+            yield from batch.to_pylist()
+
+    else:
+        raise ValueError(f"Invalid format: {input_format}. Choose from: {', '.join(SUPPORTED_FORMATS)}")
+
+
+def _chunked(rows: Iterable[Dict[str, Any]], size: int) -> Iterator[List[Dict[str, Any]]]:
+    """Group rows into lists of at most size rows."""
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _render_one(template: Template, style: Optional[Style], optimizers: Tuple[str, ...],
+                row: Dict[str, Any]) -> str:
+    """Render a single row, applying the style and optimizers segment-wise."""
+    if style is None and not optimizers:
+        return template.render(**row)
+
+    document = template.render_document(**row)
+    if style is not None:
+        document = style.apply_to_document(document)
+    if optimizers:
+        from .optimization.prompt_optimizers import get_optimizer_registry
+        document = get_optimizer_registry().apply_optimizers_to_document(document, list(optimizers))
+    return document.render()
+
+
+def _render_chunk(template: Template, style: Optional[Style], optimizers: Tuple[str, ...],
+                  skip_errors: bool, rows: List[Dict[str, Any]]) -> List[Optional[str]]:
+    """Render one chunk of rows (runs in worker processes).
+
+    Rows that fail to render are returned as None when skip_errors is set.
+    """
+    if style is None and not optimizers and not skip_errors:
+        return list(template.render_many(rows))
+
+    prompts = []
+    for row in rows:
+        try:
+            prompts.append(_render_one(template, style, optimizers, row))
+        except ValueError:
+            if not skip_errors:
+                raise
+            prompts.append(None)
+    return prompts
+
+
+class BulkRenderer:
+    """Renders a template for a stream of rows in chunks, optionally in parallel."""
+
+    def __init__(self, template: Template, style: Optional[Style] = None,
+                 optimizers: Optional[List[str]] = None, chunk_size: int = 1000,
+                 workers: int = 1, on_error: str = "raise"):
+        """Initialize bulk renderer.
+
+        Args:
+            template: Template to render
+            style: Optional style applied to each prompt
+            optimizers: Optional optimizer names applied to each prompt
+            chunk_size: Rows rendered per chunk
+            workers: Number of worker processes (1 renders in-process)
+            on_error: "raise" to stop on rows with missing values, "skip" to drop them
+        """
+        if on_error not in ("raise", "skip"):
+            raise ValueError(f"Invalid on_error: {on_error}. Choose from: raise, skip")
+        if chunk_size <= 0 or workers <= 0:
+            raise ValueError("chunk_size and workers must be positive")
+
+        self.template = template
+        self.style = style
+        self.optimizers = tuple(optimizers or ())
+        self.chunk_size = chunk_size
+        self.workers = workers
+        self.on_error = on_error
+
+    def _render_chunks(self, chunks: Iterator[List[Dict[str, Any]]]) -> Iterator[Tuple[List[Dict[str, Any]], List[Optional[str]]]]:
+        """Render chunks in order, keeping a bounded number in flight."""
+        skip_errors = self.on_error == "skip"
+        args = (self.template, self.style, self.optimizers, skip_errors)
+
+        if self.workers == 1:
+            for chunk in chunks:
+                yield chunk, _render_chunk(*args, chunk)
+            return
+
+        # At most two chunks per worker are pending, which bounds memory
+        max_pending = self.workers * 2
+        with ProcessPoolExecutor(max_workers=self.workers) as executor:
+            pending = deque()
+            for chunk in chunks:
+                pending.append((chunk, executor.submit(_render_chunk, *args, chunk)))
+                if len(pending) >= max_pending:
+                    chunk, future = pending.popleft()
+                    yield chunk, future.result()
+            while pending:
+                chunk, future = pending.popleft()
+                yield chunk, future.result()
+
+    def render_rows(self, rows: Iterable[Dict[str, Any]]) -> Iterator[Tuple[Dict[str, Any], Optional[str]]]:
+        """Render rows lazily.
+
+        Returns:
+            Iterator of (row, prompt) pairs in input order; prompt is None for
+            skipped rows
+        """
+        for chunk, prompts in self._render_chunks(_chunked(rows, self.chunk_size)):
+            yield from zip(chunk, prompts)
+
+    def render_file(self, input_path: str, output_path: str, input_format: Optional[str] = None,
+                    output_format: Optional[str] = None, id_field: Optional[str] = None) -> Dict[str, Any]:
+        """Render every row of an input file and write the prompts to an output file.
+
+        Args:
+            input_path: CSV, JSONL or Parquet file of template values
+            output_path: Output file; JSONL or CSV with a "prompt" column
+            input_format: Input format (detected from the extension if None)
+            output_format: "jsonl" or "csv" (detected from the extension if None)
+            id_field: Optional input column copied to the output to identify rows
+
+        Returns:
+            Dictionary with row counts and timing
+        """
+        output_format = output_format or detect_format(output_path)
+        if output_format not in ("csv", "jsonl"):
+            raise ValueError(f"Invalid output format: {output_format}. Choose from: csv, jsonl")
+
+        fields = [id_field, "prompt"] if id_field else ["prompt"]
+        stats = {"rows": 0, "rendered": 0, "skipped": 0, "chunks": 0}
+        start = time.perf_counter()
+
+        with open(output_path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f) if output_format == "csv" else None
+            if writer:
+                writer.writerow(fields)
+
+            chunks = _chunked(read_rows(input_path, input_format), self.chunk_size)
+            for chunk, prompts in self._render_chunks(chunks):
+                lines = []
+                for row, prompt in zip(chunk, prompts):
+                    if prompt is None:
+                        stats["skipped"] += 1
+                        continue
+                    record = [row.get(id_field), prompt] if id_field else [prompt]
+                    if writer:
+                        lines.append(record)
+                    else:
+                        lines.append(json.dumps(dict(zip(fields, record)), ensure_ascii=False) + "\n")
+
+                # One write per chunk
+                if writer:
+                    writer.writerows(lines)
+                else:
+                    f.write("".join(lines))
+
+                stats["rows"] += len(chunk)
+                stats["rendered"] += len(lines)
+                stats["chunks"] += 1
+
+        stats["seconds"] = time.perf_counter() - start
+        return stats
@@ -0,0 +1,7 @@
+from .category import Category
+from .category_manager import CategoryManager
+
+__all__ = [
+    'Category',
+    'CategoryManager'
+]
@@ -0,0 +1,30 @@
+from typing import Any, Dict, List, Optional
+
+
+class Category:
+    """Class representing a template category and its subcategories."""
+    
+    def __init__(self, name: str, subcategories: Optional[Dict[str, int]] = None,
+                 template_count: int = 0):
+        """Initialize category.
+        
+        Args:
+            name: Category name
+            subcategories: Template counts keyed by subcategory name
+            template_count: Number of templates in the category
+        """
+        self.name = name
+        self.subcategories = subcategories or {}
+        self.template_count = template_count
+    
+    def list_subcategories(self) -> List[str]:
+        """List the subcategory names."""
+        return list(self.subcategories)
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert category to dictionary."""
+        return {
+            "name": self.name,
+            "subcategories": dict(self.subcategories),
+            "template_count": self.template_count
+        }
@@ -0,0 +1,42 @@
+from typing import Iterator, List, Optional
+
+from .category import Category
+from ..templates.template import Template
+from ..templates.template_manager import TemplateManager
+
+
+class CategoryManager:
+    """Read-only view of template categories, backed by a TemplateManager's indexes."""
+    
+    def __init__(self, template_manager: TemplateManager):
+        """Initialize category manager.
+        
+        Args:
+            template_manager: Template manager whose indexes are queried
+        """
+        self.template_manager = template_manager
+    
+    def get_category(self, name: str) -> Optional[Category]:
+        """Get a category by name."""
+        count = self.template_manager.count_templates(category=name)
+        if not count:
+            return None
+        
+        subcategories = {
+            subcategory: self.template_manager.count_templates(category=name, subcategory=subcategory)
+            for subcategory in self.template_manager.list_subcategories(name)
+        }
+        return Category(name, subcategories, count)
+    
+    def list_categories(self) -> List[Category]:
+        """List all categories with their subcategories and template counts."""
+        return [self.get_category(name) for name in self.template_manager.list_categories()]
+    
+    def iter_templates(self, category: str, subcategory: Optional[str] = None) -> Iterator[Template]:
+        """Iterate the templates of a category lazily."""
+        return self.template_manager.iter_templates(category, subcategory)
+    
+    def list_templates(self, category: str, subcategory: Optional[str] = None,
+                       offset: int = 0, limit: Optional[int] = None) -> List[Template]:
+        """List a page of the templates of a category."""
+        return self.template_manager.list_templates(category, subcategory, offset, limit)
@@ -1,6 +1,6 @@
 import click
 import json
-from scaledown import sd
+import scaledown
 
 @click.group()
 def cli():
@@ -8,10 +8,11 @@ def cli():
     pass
 
 @cli.command()
-@click.argument('item_type', type=click.Choice(['templates', 'styles', 'models', 'expert_domains', 'expert_roles']))
+@click.argument('item_type', type=click.Choice(['templates', 'categories', 'styles', 'models',
+                                                      'expert_domains', 'expert_roles']))
 def list(item_type):
-    """List available templates, styles, or models."""
-    items = sd.load(item_type)
+    """List available templates, categories, styles, or models."""
+    items = scaledown.sd.load(item_type)
     
     if not items:
         click.echo(f"No {item_type} found.")
@@ -37,7 +38,7 @@ def render(template_id, style, values, expert_domain, expert_role):
     """Render a template with the given style and values."""
     try:
         # Select template
-        sd.select_template(template_id)
+        scaledown.sd.select_template(template_id)
         
         # Set values if provided
         values_dict = {}
@@ -49,7 +50,7 @@ def render(template_id, style, values, expert_domain, expert_role):
                 return
         
         # Check for missing values
-        missing = [p for p in sd.current_template.placeholders if p not in values_dict]
+        missing = [p for p in scaledown.sd.current_template.placeholders if p not in values_dict]
         if missing:
             click.echo(f"Missing values for placeholders: {', '.join(missing)}")
             for placeholder in missing:
@@ -57,19 +58,19 @@ def render(template_id, style, values, expert_domain, expert_role):
                 values_dict[placeholder] = value
         
         # Set values
-        sd.set_values(values_dict)
+        scaledown.sd.set_values(values_dict)
         
         # Set style
         if expert_domain and expert_role:
             # Create and select expert style
-            sd.create_expert_style(expert_domain, expert_role)
+            scaledown.sd.create_expert_style(expert_domain, expert_role)
             click.echo(f"Created expert style: {expert_domain} {expert_role}")
         elif style:
-            sd.select_style(style)
+            scaledown.sd.select_style(style)
             click.echo(f"Selected style: {style}")
         
         # Generate prompt
-        prompt = sd.get_prompt()
+        prompt = scaledown.sd.get_prompt()
         click.echo("\nGenerated prompt:")
         click.echo(prompt)
         
@@ -84,7 +85,7 @@ def mock_optimize(template_id, style, values):
     """Mock-optimize a prompt (for testing without models)."""
     try:
         # Select template
-        sd.select_template(template_id)
+        scaledown.sd.select_template(template_id)
         
         # Set values if provided
         values_dict = {}
@@ -96,7 +97,7 @@ def mock_optimize(template_id, style, values):
                 return
         
         # Check for missing values
-        missing = [p for p in sd.current_template.placeholders if p not in values_dict]
+        missing = [p for p in scaledown.sd.current_template.placeholders if p not in values_dict]
         if missing:
             click.echo(f"Missing values for placeholders: {', '.join(missing)}")
             for placeholder in missing:
@@ -104,20 +105,20 @@ def mock_optimize(template_id, style, values):
                 values_dict[placeholder] = value
         
         # Set values
-        sd.set_values(values_dict)
+        scaledown.sd.set_values(values_dict)
         
         # Set style
         if style:
-            sd.select_style(style)
+            scaledown.sd.select_style(style)
             click.echo(f"Selected style: {style}")
         
         # Generate prompt
-        prompt = sd.get_prompt()
+        prompt = scaledown.sd.get_prompt()
         click.echo("\nOriginal prompt:")
         click.echo(prompt)
         
         # Mock optimize
-        result = sd.mock_optimize()
+        result = scaledown.sd.mock_optimize()
         click.echo("\nMock-optimized prompt:")
         click.echo(result["optimized"])
         
@@ -126,4 +127,67 @@ def mock_optimize(template_id, style, values):
         click.echo(f"Words saved: {result['saved_tokens']} ({result['saved_percentage']:.1f}%)")
         
     except ValueError as e:
-        click.echo(f"Error: {str(e)}")
\ No newline at end of file
+        click.echo(f"Error: {str(e)}")
+
+@cli.command()
+@click.argument('template_id')
+@click.argument('input_path', type=click.Path(exists=True, dir_okay=False))
+@click.argument('output_path', type=click.Path(dir_okay=False))
+@click.option('--style', '-s', help='Style ID to apply')
+@click.option('--optimizers', '-o', help='Comma-separated optimizers to apply')
+@click.option('--id-field', help='Input column copied to the output to identify rows')
+@click.option('--chunk-size', default=1000, show_default=True, help='Rows rendered per chunk')
+@click.option('--workers', '-w', default=1, show_default=True, help='Number of worker processes')
+@click.option('--skip-errors', is_flag=True, help='Skip rows with missing values instead of stopping')
+def bulk(template_id, input_path, output_path, style, optimizers, id_field, chunk_size, workers, skip_errors):
+    """Render a template for every row of a CSV, JSONL or Parquet file."""
+    try:
+        optimizer_list = None
+        if optimizers:
+            from scaledown.optimization import parse_optimizers
+            optimizer_list = parse_optimizers(optimizers)
+        
+        stats = scaledown.sd.render_bulk(
+            input_path,
+            output_path,
+            template_id=template_id,
+            style_id=style,
+            optimizers=optimizer_list,
+            id_field=id_field,
+            chunk_size=chunk_size,
+            workers=workers,
+            on_error="skip" if skip_errors else "raise"
+        )
+        
+        click.echo(f"Rendered {stats['rendered']} of {stats['rows']} rows to {output_path} "
+                   f"in {stats['seconds']:.2f}s")
+        if stats['skipped']:
+            click.echo(f"Skipped {stats['skipped']} rows with missing values")
+        
+    except (ValueError, ImportError) as e:
+        click.echo(f"Error: {str(e)}")
+
+@cli.command()
+@click.option('--host', default='127.0.0.1', show_default=True, help='Interface to bind')
+@click.option('--port', default=8080, show_default=True, type=int, help='Port to bind')
+@click.option('--workers', default=8, show_default=True, type=int, help='Worker threads')
+@click.option('--queue-size', default=64, show_default=True, type=int,
+              help='Requests queued before answering 503')
+@click.option('--shutdown-timeout', default=30.0, show_default=True, type=float,
+              help='Seconds to finish queued work on shutdown')
+def serve(host, port, workers, queue_size, shutdown_timeout):
+    """Serve render, optimize, count-tokens and optimize-and-call over HTTP.
+    
+    API keys are read from SCALEDOWN_API_KEY, SCALEDOWN_RATE and GOOGLE_API_KEY;
+    use model "mock" for an offline stand-in provider.
+    """
+    import os
+    from scaledown.api import ScaleDown
+    from scaledown.server import ScaleDownServer
+    
+    configuration = {key: os.environ[key] for key in ("SCALEDOWN_API_KEY", "SCALEDOWN_RATE", "GOOGLE_API_KEY")
+                     if key in os.environ}
+    server = ScaleDownServer(ScaleDown(model_configuration=configuration), host=host, port=port,
+                             workers=workers, queue_size=queue_size, shutdown_timeout=shutdown_timeout)
+    click.echo(f"Serving on http://{host}:{port} with {workers} workers (Ctrl+C to stop)")
+    server.run()
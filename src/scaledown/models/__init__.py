@@ -2,24 +2,56 @@
 ScaleDown models module.
 
 This module provides model interfaces and implementations for various AI providers.
+LLM classes are imported on first access, so importing the package does not load
+the provider modules.
 """
+import importlib
 
 from .base_model import BaseModel
-from .llm_model import LLMModel, LLMModelFactory
-
-# Import LLM providers from tools for integration
-try:
-    from ..tools.llms import LLMProviderFactory, LLM
-    __all__ = [
-        'BaseModel',
-        'LLMModel',
-        'LLMModelFactory',
-        'LLMProviderFactory',
-        'LLM'
-    ]
-except ImportError:
-    __all__ = [
-        'BaseModel',
-        'LLMModel',
-        'LLMModelFactory'
-    ]
\ No newline at end of file
+
+_LAZY_ATTRIBUTES = {
+    'LLMModel': ('.llm_model', 'LLMModel'),
+    'LLMModelFactory': ('.llm_model', 'LLMModelFactory'),
+    'LLMProviderFactory': ('..tools.llms', 'LLMProviderFactory'),
+    'LLM': ('..tools.llms', 'LLM'),
+    'ModelSpec': ('.model_catalog', 'ModelSpec'),
+    'ModelCatalog': ('.model_catalog', 'ModelCatalog'),
+    'get_model_catalog': ('.model_catalog', 'get_model_catalog'),
+    'RequestScheduler': ('.scheduler', 'RequestScheduler'),
+    'get_request_scheduler': ('.scheduler', 'get_request_scheduler'),
+    'AdaptiveConcurrencyLimiter': ('.concurrency', 'AdaptiveConcurrencyLimiter'),
+    'RouterModel': ('.router', 'RouterModel'),
+    'OutputBudgetPredictor': ('.output_budget', 'OutputBudgetPredictor'),
+    'get_output_budget_predictor': ('.output_budget', 'get_output_budget_predictor'),
+}
+
+
+def __getattr__(name):
+    if name not in _LAZY_ATTRIBUTES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    module_name, attribute = _LAZY_ATTRIBUTES[name]
+    value = getattr(importlib.import_module(module_name, __name__), attribute)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_ATTRIBUTES))
+
+
+__all__ = [
+    'BaseModel',
+    'LLMModel',
+    'LLMModelFactory',
+    'LLMProviderFactory',
+    'LLM',
+    'ModelSpec',
+    'ModelCatalog',
+    'get_model_catalog',
+    'RequestScheduler',
+    'get_request_scheduler',
+    'AdaptiveConcurrencyLimiter',
+    'RouterModel',
+    'OutputBudgetPredictor',
+    'get_output_budget_predictor'
+]
@@ -1,7 +1,8 @@
 from abc import ABC, abstractmethod
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Union
 
 from ..templates.template import Template
+from ..templates.prompt_document import PromptDocument
 
 
 class BaseModel(ABC):
@@ -82,12 +83,14 @@ class BaseModel(ABC):
             "remaining": limit - count
         }
 
-    def optimize_prompt_with_pipeline(self, prompt: str, optimizers: List[str]) -> str:
+    def optimize_prompt_with_pipeline(self, prompt: Union[str, PromptDocument], optimizers: List[str],
+                                      stats: Optional[Dict[str, Any]] = None) -> str:
         """Optimize prompt using the modular optimization pipeline.
 
         Args:
-            prompt: The original prompt
+            prompt: The original prompt; a PromptDocument is optimized in place
             optimizers: List of optimizer names to apply
+            stats: Optional dict the optimizers' statistics are stored in
 
         Returns:
             The optimized prompt with optimizers applied
@@ -95,27 +98,36 @@ class BaseModel(ABC):
         try:
             from ..optimization.prompt_optimizers import get_optimizer_registry
             registry = get_optimizer_registry()
-            return registry.apply_optimizers(prompt, optimizers)
+            if isinstance(prompt, PromptDocument):
+                return registry.apply_optimizers_to_document(prompt, optimizers, stats).render()
+            return registry.apply_optimizers(prompt, optimizers, stats)
         except ImportError:
             # Fallback to basic optimization if pipeline not available
+            if isinstance(prompt, PromptDocument):
+                prompt = prompt.render()
             return self.optimize_prompt(prompt)
 
-    def get_optimization_report(self, original_prompt: str, optimizer_names: List[str]) -> Dict[str, Any]:
+    def get_optimization_report(self, original_prompt: Union[str, PromptDocument],
+                                optimizer_names: List[str]) -> Dict[str, Any]:
         """Generate optimization report using the pipeline.
 
         Args:
-            original_prompt: The original prompt
+            original_prompt: The original prompt; a PromptDocument is optimized in place
             optimizer_names: List of optimizer names applied
 
         Returns:
             Optimization report with metrics
         """
-        optimized_prompt = self.optimize_prompt_with_pipeline(original_prompt, optimizer_names)
+        document = original_prompt
+        if isinstance(original_prompt, PromptDocument):
+            original_prompt = original_prompt.render()
+        stats = {}
+        optimized_prompt = self.optimize_prompt_with_pipeline(document, optimizer_names, stats)
 
         try:
             from ..optimization.prompt_optimizers import get_optimizer_registry
             registry = get_optimizer_registry()
-            return registry.get_optimization_report(original_prompt, optimized_prompt, optimizer_names)
+            return registry.get_optimization_report(original_prompt, optimized_prompt, optimizer_names, stats)
         except ImportError:
             # Fallback report
             return {
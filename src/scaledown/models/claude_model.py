@@ -2,6 +2,7 @@ from typing import Dict, Any, Optional
 import anthropic  # Assuming anthropic package is available
 
 from .base_model import BaseModel
+from .model_catalog import resolve_model
 
 
 class ClaudeModel(BaseModel):
@@ -26,7 +27,8 @@ class ClaudeModel(BaseModel):
         super().__init__(model_name, **kwargs)
         self.client = anthropic.Anthropic(api_key=api_key)
         
-        if model_name not in self.MODEL_SIZES:
+        spec = resolve_model(model_name)
+        if model_name not in self.MODEL_SIZES and (spec is None or spec.provider != "anthropic"):
             raise ValueError(f"Unsupported Claude model: {model_name}")
     
     def optimize_prompt(self, prompt: str) -> str:
@@ -69,4 +71,7 @@ class ClaudeModel(BaseModel):
         Returns:
             Maximum number of tokens allowed
         """
+        spec = resolve_model(self.model_name)
+        if spec is not None:
+            return spec.context_window
         return self.MODEL_SIZES.get(self.model_name, 100000)  # Default fallback
\ No newline at end of file
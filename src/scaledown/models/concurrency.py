@@ -0,0 +1,148 @@
+"""
+Adaptive concurrency limits for provider calls.
+
+An AdaptiveConcurrencyLimiter tunes how many calls to one provider (and API
+key) may be in flight using AIMD: while latency stays near its no-load
+baseline and the limit is in use, the limit grows by about one per round of
+calls; when smoothed latency rises past a tolerance of the baseline, or a
+call is rate limited (429) or times out, it is cut multiplicatively, at most
+once per round. Every change is recorded as a decision for the metrics.
+"""
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, Optional
+
+from ..tools.llms import ProviderTimeoutError, RateLimitError
+
+
+class AdaptiveConcurrencyLimiter:
+    """AIMD concurrency limit driven by latency, rate limits and timeouts."""
+
+    def __init__(self, initial_limit: int = 4, min_limit: int = 1, max_limit: int = 64,
+                 backoff: float = 0.5, latency_tolerance: float = 2.0, smoothing: float = 0.2,
+                 baseline_window: int = 200, history_size: int = 50):
+        """Initialize limiter.
+
+        Args:
+            initial_limit: Concurrent calls allowed at first
+            min_limit: Lowest limit backoff may reach
+            max_limit: Highest limit growth may reach
+            backoff: Factor applied to the limit on congestion
+            latency_tolerance: Smoothed latency above this multiple of the baseline is congestion
+            smoothing: Weight of each new latency sample in the moving average
+            baseline_window: Recent successful calls whose lowest latency is the baseline
+            history_size: Recent decisions kept for stats()
+        """
+        if not 1 <= min_limit <= initial_limit <= max_limit:
+            raise ValueError("Limits must satisfy 1 <= min_limit <= initial_limit <= max_limit")
+        if not 0 < backoff < 1:
+            raise ValueError("backoff must be between 0 and 1")
+
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.backoff = backoff
+        self.latency_tolerance = latency_tolerance
+        self.smoothing = smoothing
+        self._limit = float(initial_limit)
+        self._latency: Optional[float] = None
+        self._baseline = deque(maxlen=baseline_window)
+        # As if a whole round had passed, so the first overload signal cuts the limit
+        self._since_decrease = initial_limit
+        self._in_flight = 0
+        self._decisions: Dict[str, int] = {"increase": 0, "latency": 0, "rate_limited": 0, "timeout": 0}
+        self._history = deque(maxlen=history_size)
+        self._condition = threading.Condition()
+
+    @property
+    def limit(self) -> int:
+        """Current number of concurrent calls allowed."""
+        return int(self._limit)
+
+    def set_limit(self, limit: int) -> None:
+        """Override the current limit; adaptation continues from there."""
+        with self._condition:
+            self._change(float(max(self.min_limit, min(self.max_limit, limit))), "manual")
+
+    def _change(self, new_limit: float, reason: str) -> None:
+        old = int(self._limit)
+        self._limit = new_limit
+        if int(new_limit) != old:
+            if reason in self._decisions:
+                self._decisions[reason] += 1
+            self._history.append({"time": time.time(), "reason": reason, "from": old, "to": int(new_limit)})
+            self._condition.notify_all()
+
+    def _decrease(self, reason: str) -> None:
+        if self._since_decrease < self.limit:
+            # Calls started before the last cut still reflect the old limit
+            return
+        self._since_decrease = 0
+        self._change(max(float(self.min_limit), self._limit * self.backoff), reason)
+
+    def record(self, latency: float, error: Optional[BaseException] = None,
+               in_flight: Optional[int] = None) -> None:
+        """Feed the outcome of one call.
+
+        Args:
+            latency: Seconds the call took
+            error: Exception the call raised, if any
+            in_flight: Calls in flight when it finished, itself included
+                (defaults to the count kept by acquire/release)
+        """
+        with self._condition:
+            self._since_decrease += 1
+            if in_flight is None:
+                in_flight = self._in_flight + 1
+
+            if isinstance(error, RateLimitError):
+                self._decrease("rate_limited")
+                return
+            if isinstance(error, (ProviderTimeoutError, TimeoutError)):
+                self._decrease("timeout")
+                return
+            if error is not None:
+                # Other failures say nothing about congestion
+                return
+
+            self._baseline.append(latency)
+            if self._latency is None:
+                self._latency = latency
+            else:
+                self._latency += self.smoothing * (latency - self._latency)
+
+            if self._latency > self.latency_tolerance * min(self._baseline):
+                self._decrease("latency")
+            elif in_flight >= self.limit and self._limit < self.max_limit:
+                # Additive increase: about +1 per round of `limit` calls
+                self._change(min(float(self.max_limit), self._limit + 1.0 / self._limit), "increase")
+
+    def acquire(self, timeout: Optional[float] = None) -> bool:
+        """Wait for a free slot; return False if timeout expires first."""
+        with self._condition:
+            if not self._condition.wait_for(lambda: self._in_flight < self.limit, timeout):
+                return False
+            self._in_flight += 1
+            return True
+
+    def release(self, latency: float, error: Optional[BaseException] = None) -> None:
+        """Free a slot taken with acquire() and record the call's outcome."""
+        with self._condition:
+            in_flight = self._in_flight
+            self._in_flight -= 1
+            self.record(latency, error, in_flight)
+            self._condition.notify()
+
+    def stats(self) -> Dict[str, Any]:
+        """Current limit, latency estimates and decision counts."""
+        with self._condition:
+            return {
+                "limit": self.limit,
+                "min_limit": self.min_limit,
+                "max_limit": self.max_limit,
+                "in_flight": self._in_flight,
+                "latency": self._latency,
+                "baseline_latency": min(self._baseline) if self._baseline else None,
+                "decisions": dict(self._decisions),
+                "recent_decisions": list(self._history),
+            }
@@ -0,0 +1,140 @@
+"""
+Factored Chain-of-Verification, executed as separate model calls.
+
+Instead of one long generation following COVE_PROMPT, the procedure runs as:
+
+1. a plan call drafting an answer and listing verification questions,
+2. one short call per verification question, all in flight at once, each
+   seeing only its question so the draft cannot bias the checks,
+3. a short revision call producing the final answer from the draft and the
+   verification answers.
+
+compare() runs this next to the single-prompt variant and reports wall-clock
+time, calls and tokens of both.
+"""
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from ..tools.prompts import (
+    COVE_DRAFT_START, COVE_PLAN_PROMPT, COVE_QUESTIONS_START, COVE_REVISE_PROMPT, COVE_VERIFY_PROMPT
+)
+
+
+_QUESTION = re.compile(r"^\s*(?:\d+[.)]|[-*])\s*(.+?)\s*$")
+
+
+def parse_verification_plan(text: str, max_questions: int = 5) -> Tuple[str, List[str]]:
+    """Split a plan response into the draft answer and its verification questions."""
+    draft_part, _, questions_part = text.partition(COVE_QUESTIONS_START)
+    draft = draft_part.split(COVE_DRAFT_START, 1)[-1].strip()
+    questions = [match.group(1) for match in map(_QUESTION.match, questions_part.splitlines()) if match]
+    return draft, questions[:max_questions]
+
+
+class FactoredCoVe:
+    """Runs Chain-of-Verification as a plan call, parallel checks and a revision call."""
+
+    def __init__(self, model, max_questions: int = 5, verification_max_tokens: int = 150):
+        """Initialize factored CoVe.
+
+        Args:
+            model: LLMModel making the calls; its scheduler, if any, queues them
+            max_questions: Most verification questions checked
+            verification_max_tokens: Output budget of each verification call
+        """
+        self.model = model
+        self.max_questions = max_questions
+        self.verification_max_tokens = verification_max_tokens
+
+    def _verify(self, questions: List[str], context: str, priority: Optional[str],
+                tenant: Optional[str]) -> List[str]:
+        prompts = [COVE_VERIFY_PROMPT.format(question=question) for question in questions]
+        if not prompts:
+            return []
+        if self.model.scheduler is not None:
+            futures = [self.model.submit(prompt, self.verification_max_tokens, context, priority, tenant)
+                       for prompt in prompts]
+            return [future.result() for future in futures]
+        with ThreadPoolExecutor(max_workers=len(prompts)) as executor:
+            return list(executor.map(
+                lambda prompt: self.model.call_llm(prompt, self.verification_max_tokens, context),
+                prompts))
+
+    def run(self, prompt: str, max_tokens: int = 1000, context: str = "",
+            priority: Optional[str] = None, tenant: Optional[str] = None) -> Dict[str, Any]:
+        """Answer a prompt with factored verification.
+
+        Args:
+            prompt: The (already optimized) prompt
+            max_tokens: Output budget of the plan and revision calls
+            context: Optional shared context sent with every call
+            priority: Scheduler priority class of the calls
+            tenant: Scheduler tenant of the calls
+
+        Returns:
+            Dictionary with the draft, the verification questions and answers, the
+            final answer, the final response text and call statistics
+        """
+        count = self.model.count_tokens
+        started = time.perf_counter()
+        stages = {}
+
+        plan_prompt = COVE_PLAN_PROMPT.format(prompt=prompt, max_questions=self.max_questions)
+        plan = self.model.call_llm(plan_prompt, max_tokens, context, priority, tenant)
+        draft, questions = parse_verification_plan(plan, self.max_questions)
+        stages["plan"] = time.perf_counter() - started
+
+        answers = self._verify(questions, context, priority, tenant)
+        stages["verify"] = time.perf_counter() - started - stages["plan"]
+
+        verifications = "\n".join(f"Q: {question}\nA: {answer}" for question, answer in zip(questions, answers))
+        revise_prompt = COVE_REVISE_PROMPT.format(prompt=prompt, draft=draft,
+                                                  verifications=verifications or "(no questions)")
+        final_answer = self.model.call_for_final_answer(revise_prompt, max_tokens, context, priority, tenant)
+        response = final_answer.pop("text")
+        final_answer.pop("llm_response")
+        stages["revise"] = time.perf_counter() - started - stages["plan"] - stages["verify"]
+
+        verify_prompts = [COVE_VERIFY_PROMPT.format(question=question) for question in questions]
+        context_tokens = count(context) if context else 0
+        return {
+            "draft": draft,
+            "verifications": [{"question": q, "answer": a} for q, a in zip(questions, answers)],
+            "final_answer": final_answer,
+            "response": response,
+            "stats": {
+                "calls": 2 + len(questions),
+                "input_tokens": (count(plan_prompt) + count(revise_prompt) + sum(map(count, verify_prompts))
+                                 + context_tokens * (2 + len(questions))),
+                "output_tokens": count(plan) + sum(map(count, answers)) + count(response),
+                "wall_time": time.perf_counter() - started,
+                "stages": stages,
+            },
+        }
+
+    def compare(self, prompt: str, max_tokens: int = 1000, context: str = "") -> Dict[str, Any]:
+        """Run the single-prompt and the factored variant and report both.
+
+        Returns:
+            Dictionary with "single" and "factored" results, each with calls,
+            input and output tokens, wall-clock time and the response
+        """
+        count = self.model.count_tokens
+
+        started = time.perf_counter()
+        single = self.model.optimize_and_call(prompt, ["cove"], max_tokens, context=context)
+        single_time = time.perf_counter() - started
+
+        factored = self.run(prompt, max_tokens, context)
+        return {
+            "single": {
+                "calls": 1,
+                "input_tokens": count(single["optimized_prompt"]) + (count(context) if context else 0),
+                "output_tokens": count(single["llm_response"]),
+                "wall_time": single_time,
+                "response": single["llm_response"],
+            },
+            "factored": dict(factored["stats"], response=factored["response"]),
+        }
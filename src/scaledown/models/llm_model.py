@@ -1,37 +1,78 @@
 """
 LLM Model implementation that integrates with the tools/llms.py providers.
 """
-from typing import Dict, Any, List, Optional
-try:
-    import tiktoken
-except ImportError:
-    tiktoken = None
+import asyncio
+import hashlib
+import threading
+import time
+from concurrent.futures import Future
+from typing import Dict, Any, List, Optional, Union
 
 from .base_model import BaseModel
+from ..templates.prompt_document import PromptDocument
+from ..tools.final_answer import FinalAnswerParser
+from ..tools.llm_response import LLMResponse
 from ..tools.llms import LLMProviderFactory, LLM
+from ..tools.prompts import FINAL_ANSWER_START
+from ..utils.metrics import LLM_ERRORS, LLM_INPUT_TOKENS, LLM_LATENCY, LLM_OUTPUT_TOKENS, LLM_REQUESTS
+from ..utils.token_counter import count_tokens
+from ..utils.tracing import span
+from .model_catalog import LLM_PROVIDERS, ModelCatalog, get_model_catalog
+from .output_budget import OutputBudgetPredictor, get_output_budget_predictor
+from .scheduler import RequestScheduler
+
+# Configuration entries holding each provider's API key
+_API_KEY_SETTINGS = {
+    "scaledown": "SCALEDOWN_API_KEY",
+    "google": "GOOGLE_API_KEY",
+}
 
 
 class LLMModel(BaseModel):
     """Model implementation that wraps the LLM providers from tools/llms.py."""
 
-    def __init__(self, model_name: str, temperature: float = 0.0, configuration: Optional[Dict[str, str]] = None, **kwargs):
+    def __init__(self, model_name: str, temperature: float = 0.0, configuration: Optional[Dict[str, str]] = None,
+                 scheduler: Optional[RequestScheduler] = None, priority: str = "default",
+                 tenant: str = "default", output_budget: Optional[OutputBudgetPredictor] = None,
+                 catalog: Optional[ModelCatalog] = None, **kwargs):
         """Initialize LLM model.
 
         Args:
             model_name: Name/identifier of the model
             temperature: Temperature setting for the model
             configuration: Configuration dict for API keys etc.
+            scheduler: Optional scheduler that queues calls to the provider
+            priority: Default priority class of scheduled calls
+            tenant: Default tenant of scheduled calls
+            output_budget: Predictor of max_tokens for optimize_and_call (the global one if None)
+            catalog: Catalog the model is resolved in (the global one if None)
             **kwargs: Additional model-specific configuration
         """
         super().__init__(model_name, **kwargs)
         self.temperature = temperature
         self.configuration = configuration or {}
+        self.scheduler = scheduler
+        self.priority = priority
+        self.tenant = tenant
+        self.output_budget = output_budget or get_output_budget_predictor()
+        self.catalog = catalog or get_model_catalog()
+        self._sampling_providers: Dict[float, LLM] = {}
+        self._providers_lock = threading.Lock()
+        spec = self.catalog.resolve(model_name)
+        self.provider_name = spec.provider if spec is not None else model_name
+        # Scheduler queue: each provider and API key has its own limits
+        self.provider_key = self.provider_name
+        api_key = self.configuration.get(_API_KEY_SETTINGS.get(self.provider_name, ""))
+        if api_key:
+            digest = hashlib.blake2b(api_key.encode("utf-8"), digest_size=4).hexdigest()
+            self.provider_key = f"{self.provider_name}:{digest}"
 
         # Create the underlying LLM provider
         self.llm_provider = LLMProviderFactory.create_provider(
             model_id=model_name,
             temperature=temperature,
-            configuration=self.configuration
+            configuration=self.configuration,
+            catalog=self.catalog
         )
 
     def optimize_prompt(self, prompt: str) -> str:
@@ -45,40 +86,226 @@ class LLMModel(BaseModel):
             return prompt.replace("Please ", "").replace("Could you ", "")
 
     def count_tokens(self, text: str) -> int:
-        """Count tokens using tiktoken for OpenAI models or approximation for others."""
-        try:
-            if tiktoken and "gpt" in self.model_name.lower():
-                # Use tiktoken for OpenAI models if available
-                encoding = tiktoken.encoding_for_model("gpt-3.5-turbo")
-                return len(encoding.encode(text))
-            else:
-                # Approximation: 1 token ≈ 4 characters
-                return len(text) // 4
-        except Exception:
-            # Fallback: word count approximation
-            return len(text.split())
+        """Count tokens with the model's tokenizer from the model catalog."""
+        spec = self.catalog.resolve(self.model_name)
+        return count_tokens(text, spec.tokenizer if spec is not None else "approx")
 
     def get_token_limit(self) -> int:
-        """Get the token limit for this model."""
-        model_limits = {
-            "gpt-4": 8192,
-            "gpt-3.5-turbo": 4096,
-            "gemini-1.5-flash": 1048576,
-            "gemini-2.5-flash-lite": 1048576,
-            "scaledown-gpt-4o": 128000
-        }
+        """Get the token limit (context window) for this model."""
+        return self.catalog.get_context_window(self.model_name)
+
+    def _record_call(self, started: float, prompt: str, context: str, response: Optional[str],
+                     error: Optional[Exception] = None, status: str = "ok",
+                     input_tokens: Optional[int] = None, output_tokens: Optional[int] = None) -> None:
+        labels = (self.provider_name, self.model_name)
+        LLM_LATENCY.observe(time.perf_counter() - started, labels)
+        if error is not None:
+            LLM_REQUESTS.inc(labels + ("error",))
+            LLM_ERRORS.inc(labels + (type(error).__name__,))
+            return
+        LLM_REQUESTS.inc(labels + (status,))
+        # Usage reported by the provider, else approximate counts: tokenizing
+        # again would cost more than the metric is worth
+        if input_tokens is None:
+            input_tokens = count_tokens(prompt) + count_tokens(context)
+        if output_tokens is None:
+            output_tokens = count_tokens(response)
+        LLM_INPUT_TOKENS.inc(labels, input_tokens)
+        LLM_OUTPUT_TOKENS.inc(labels, output_tokens)
+
+    def _generate(self, prompt: str, max_tokens: int, context: str, stop: Optional[List[str]] = None,
+                  raw: bool = False, submitted: Optional[float] = None) -> LLMResponse:
+        started = time.perf_counter()
+        with span("scaledown.llm_call", model=self.model_name, provider=self.provider_name,
+                  max_tokens=max_tokens):
+            try:
+                response = self.llm_provider.generate(prompt, max_tokens, context=context, stop=stop, raw=raw)
+            except Exception as error:
+                self._record_call(started, prompt, context, None, error)
+                raise
+        self._record_call(started, prompt, context, response.text,
+                          input_tokens=response.input_tokens, output_tokens=response.output_tokens)
+        if submitted is not None:
+            # Time spent in the scheduler queue before the provider was called
+            response = response.replace(queue_time=response.queue_time + started - submitted)
+        return response
+
+    def _call_provider(self, prompt: str, max_tokens: int, context: str,
+                       stop: Optional[List[str]] = None) -> str:
+        return self._generate(prompt, max_tokens, context, stop).text
+
+    def _stream_final_answer(self, prompt: str, max_tokens: int, context: str,
+                             provider: Optional[LLM] = None,
+                             cancel: Optional[threading.Event] = None,
+                             submitted: Optional[float] = None) -> Dict[str, Any]:
+        parser = FinalAnswerParser()
+        # Providers that support it stop at the end delimiter themselves
+        provider = provider or self.llm_provider
+        stream = provider.stream_llm(prompt, max_tokens, context=context, stop=[parser.end])
+        stopped_early = cancelled = at_stop = False
+        started = time.perf_counter()
+        first_chunk = None
+        with span("scaledown.llm_call", model=self.model_name, provider=self.provider_name,
+                  max_tokens=max_tokens, stream=True) as call_span:
+            try:
+                while True:
+                    try:
+                        chunk = next(stream)
+                    except StopIteration as finished:
+                        # Whether the provider stopped at the end delimiter rather than max_tokens
+                        at_stop = bool(finished.value)
+                        break
+                    if first_chunk is None:
+                        first_chunk = time.perf_counter()
+                    if parser.feed(chunk):
+                        stopped_early = True
+                        break
+                    if cancel is not None and cancel.is_set():
+                        cancelled = True
+                        break
+            except Exception as error:
+                self._record_call(started, prompt, context, None, error)
+                raise
+            finally:
+                # Cancels the rest of the generation
+                stream.close()
+            call_span.set_attribute("stopped_early", stopped_early)
+
+        completed = time.perf_counter()
+        result = parser.result(stopped=at_stop)
+        # Streams report no usage, so count it with the model's tokenizer
+        input_tokens = self.count_tokens(prompt) + (self.count_tokens(context) if context else 0)
+        output_tokens = self.count_tokens(result["text"])
+        self._record_call(started, prompt, context, result["text"], status="cancelled" if cancelled else "ok",
+                          input_tokens=input_tokens, output_tokens=output_tokens)
+        first_chunk = first_chunk or completed
+        result["llm_response"] = LLMResponse(
+            result["text"], self.model_name, self.provider_name,
+            input_tokens=input_tokens, output_tokens=output_tokens,
+            queue_time=started - submitted if submitted is not None else 0.0,
+            connect_time=first_chunk - started, generation_time=completed - first_chunk,
+        )
+        result["stopped_early"] = stopped_early
+        if cancel is not None:
+            result["cancelled"] = cancelled
+        return result
+
+    def sampling_provider(self, temperature: float) -> LLM:
+        """Provider for this model at another temperature, created once per temperature."""
+        if temperature == self.temperature:
+            return self.llm_provider
+        with self._providers_lock:
+            provider = self._sampling_providers.get(temperature)
+            if provider is None:
+                provider = LLMProviderFactory.create_provider(self.model_name, temperature, self.configuration,
+                                                              catalog=self.catalog)
+                self._sampling_providers[temperature] = provider
+        return provider
+
+    def _dispatch(self, fn, prompt: Union[str, PromptDocument], max_tokens: int, context: str,
+                  priority: Optional[str], tenant: Optional[str], *args) -> Future:
+        if isinstance(prompt, PromptDocument):
+            # Provider boundary: join the segments once
+            prompt = prompt.render()
 
-        # Find matching model
-        for model_key, limit in model_limits.items():
-            if model_key in self.model_name.lower():
-                return limit
+        if self.scheduler is None:
+            future = Future()
+            try:
+                future.set_result(fn(prompt, max_tokens, context, *args))
+            except Exception as error:
+                future.set_exception(error)
+            return future
 
-        # Default limit
-        return 4096
+        # Fair shares are measured in tokens, the unit of the providers' budgets
+        cost = count_tokens(prompt + context) + max_tokens
+        return self.scheduler.submit(self.provider_key, fn, prompt, max_tokens, context, *args,
+                                     priority=priority or self.priority, tenant=tenant or self.tenant,
+                                     cost=cost)
 
-    def call_llm(self, prompt: str, max_tokens: int = 1000) -> str:
-        """Call the underlying LLM provider."""
-        return self.llm_provider.call_llm(prompt, max_tokens)
+    def submit(self, prompt: Union[str, PromptDocument], max_tokens: int = 1000, context: str = "",
+               priority: Optional[str] = None, tenant: Optional[str] = None,
+               stop: Optional[List[str]] = None) -> Future:
+        """Queue a call to the provider and return a Future of the response.
+
+        Without a scheduler the call runs immediately and a completed Future is returned.
+
+        Args:
+            prompt: The prompt or question, as a string or PromptDocument
+            max_tokens: Maximum tokens for response
+            context: Optional shared context sent separately from the prompt
+            priority: Priority class (defaults to the model's)
+            tenant: Tenant the call is accounted to (defaults to the model's)
+            stop: Optional sequences at which generation stops
+        """
+        return self._dispatch(self._call_provider, prompt, max_tokens, context, priority, tenant, stop)
+
+    async def call_llm_async(self, prompt: Union[str, PromptDocument], max_tokens: int = 1000, context: str = "",
+                             priority: Optional[str] = None, tenant: Optional[str] = None,
+                             stop: Optional[List[str]] = None) -> str:
+        """Awaitable version of call_llm(); provider calls run off the event loop."""
+        if self.scheduler is None:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(None, self.call_llm, prompt, max_tokens, context,
+                                              priority, tenant, stop)
+        return await asyncio.wrap_future(self.submit(prompt, max_tokens, context, priority, tenant, stop))
+
+    def call_llm(self, prompt: Union[str, PromptDocument], max_tokens: int = 1000, context: str = "",
+                 priority: Optional[str] = None, tenant: Optional[str] = None,
+                 stop: Optional[List[str]] = None) -> str:
+        """Call the underlying LLM provider, through the scheduler if there is one.
+
+        Args:
+            prompt: The prompt or question, as a string or PromptDocument
+            max_tokens: Maximum tokens for response
+            context: Optional shared context sent separately from the prompt
+            priority: Priority class (defaults to the model's)
+            tenant: Tenant the call is accounted to (defaults to the model's)
+            stop: Optional sequences at which generation stops
+        """
+        if self.scheduler is None:
+            if isinstance(prompt, PromptDocument):
+                # Provider boundary: join the segments once
+                prompt = prompt.render()
+            return self._call_provider(prompt, max_tokens, context, stop)
+        return self.submit(prompt, max_tokens, context, priority, tenant, stop).result()
+
+    def generate(self, prompt: Union[str, PromptDocument], max_tokens: int = 1000, context: str = "",
+                 priority: Optional[str] = None, tenant: Optional[str] = None,
+                 stop: Optional[List[str]] = None, raw: bool = False) -> LLMResponse:
+        """Call the provider like call_llm(), but return the structured response.
+
+        The response carries the token usage and compression statistics reported
+        by the provider and the latency split into queue (scheduler and rate
+        limiting), connect and generation time.
+
+        Args:
+            prompt: The prompt or question, as a string or PromptDocument
+            max_tokens: Maximum tokens for response
+            context: Optional shared context sent separately from the prompt
+            priority: Priority class (defaults to the model's)
+            tenant: Tenant the call is accounted to (defaults to the model's)
+            stop: Optional sequences at which generation stops
+            raw: Keep the raw provider payload in the response
+        """
+        return self._dispatch(self._generate, prompt, max_tokens, context, priority, tenant,
+                              stop, raw, time.perf_counter()).result()
+
+    def call_for_final_answer(self, prompt: Union[str, PromptDocument], max_tokens: int = 1000,
+                              context: str = "", priority: Optional[str] = None,
+                              tenant: Optional[str] = None) -> Dict[str, Any]:
+        """Stream a response and stop as soon as its final answer section is complete.
+
+        For prompts using the "=== FINAL ANSWER ===" / "=== END FINAL ANSWER ==="
+        format. The end delimiter is sent as a stop sequence, and the stream is
+        closed once it arrives, so nothing after the answer is generated.
+
+        Returns:
+            Dictionary with the answer, its numbered items, whether it is complete,
+            the response text up to the end delimiter, the LLMResponse of the
+            streamed call ("llm_response") and whether generation was cancelled early
+        """
+        return self._dispatch(self._stream_final_answer, prompt, max_tokens, context, priority, tenant,
+                              None, None, time.perf_counter()).result()
 
     def get_model_info(self) -> Dict[str, Any]:
         """Get model information."""
@@ -90,33 +317,116 @@ class LLMModel(BaseModel):
         })
         return base_info
 
-    def optimize_and_call(self, prompt: str, optimizers: List[str], max_tokens: int = 1000) -> Dict[str, Any]:
+    def optimize_and_call(self, prompt: Union[str, PromptDocument], optimizers: List[str],
+                          max_tokens: Optional[int] = None, context: str = "",
+                          priority: Optional[str] = None, tenant: Optional[str] = None,
+                          style: Optional[str] = None, template: Optional[str] = None,
+                          extract_final_answer: Optional[bool] = None,
+                          cove_mode: str = "prompt", samples: int = 1, consensus: float = 0.5,
+                          sample_temperature: float = 0.7) -> Dict[str, Any]:
         """Optimize prompt with pipeline and call LLM.
 
         Args:
-            prompt: Original prompt
+            prompt: Original prompt, as a string or PromptDocument
             optimizers: List of optimizer names to apply
-            max_tokens: Maximum tokens for response
+            max_tokens: Maximum tokens for response; if None, a budget learned from
+                past outputs of this model, optimizers, style and template
+            context: Optional shared context, sent as-is next to the optimized prompt
+            priority: Priority class of the call if the model has a scheduler
+            tenant: Tenant of the call if the model has a scheduler
+            style: Style ID of the prompt, for output budgets
+            template: Template ID of the prompt, for output budgets
+            extract_final_answer: Stream the response and stop at the end of its final
+                answer section (see call_for_final_answer); by default, whenever the
+                optimized prompt asks for the final answer format
+            cove_mode: "prompt" adds the cove procedure to the prompt; "factored"
+                runs it as separate plan, parallel verification and revision calls
+                (see models.cove.FactoredCoVe)
+            samples: With more than one, sample the prompt this many times at once and
+                vote on the normalized answers (see models.self_consistency)
+            consensus: Fraction of the samples that must agree to stop sampling early
+            sample_temperature: Temperature of the samples
 
         Returns:
             Dictionary with optimization info and LLM response
         """
+        if cove_mode not in ("prompt", "factored"):
+            raise ValueError(f"Unknown cove_mode: {cove_mode}")
+        factored = cove_mode == "factored" and "cove" in optimizers
+        if factored and samples > 1:
+            raise ValueError("Self-consistency sampling does not support factored CoVe")
+        # Factored CoVe produces far shorter outputs, so its budgets are learned separately
+        budget_labels = [name if not factored or name != "cove" else "cove:factored" for name in optimizers]
+
         # Get optimization report
-        optimization_report = self.get_optimization_report(prompt, optimizers)
+        pipeline = [name for name in optimizers if name != "cove"] if factored else optimizers
+        optimization_report = self.get_optimization_report(prompt, pipeline)
         optimized_prompt = optimization_report["optimized_prompt"]
 
+        budget = max_tokens
+        if budget is None:
+            budget = self.output_budget.predict(self.model_name, budget_labels, style, template)
+
+        if extract_final_answer is None:
+            extract_final_answer = FINAL_ANSWER_START in optimized_prompt
+
         # Call LLM with optimized prompt
-        response = self.call_llm(optimized_prompt, max_tokens)
+        final_answer = None
+        llm_response = None
+        cove = None
+        consistency = None
+        if samples > 1:
+            from .self_consistency import SelfConsistency
+            consistency = SelfConsistency(self, samples, consensus, sample_temperature).run(
+                optimized_prompt, budget, context, priority, tenant)
+            final_answer = consistency.pop("final_answer")
+            response = consistency.pop("response")
+        elif factored:
+            from .cove import FactoredCoVe
+            cove = FactoredCoVe(self).run(optimized_prompt, budget, context, priority, tenant)
+            final_answer = cove.pop("final_answer")
+            response = cove.pop("response")
+        elif extract_final_answer:
+            final_answer = self.call_for_final_answer(optimized_prompt, budget, context=context,
+                                                      priority=priority, tenant=tenant)
+            llm_response = final_answer.pop("llm_response")
+            response = final_answer.pop("text")
+        else:
+            llm_response = self.generate(optimized_prompt, budget, context=context,
+                                         priority=priority, tenant=tenant)
+            response = llm_response.text
+        self.output_budget.record(self.model_name, self.count_tokens(response), budget_labels,
+                                  style, template, budget)
 
         # Return comprehensive result
-        return {
-            "original_prompt": prompt,
+        result = {
+            "original_prompt": optimization_report["original_prompt"],
             "optimized_prompt": optimized_prompt,
             "optimizers_applied": optimizers,
             "optimization_metrics": optimization_report,
             "llm_response": response,
+            "max_tokens": budget,
+            "max_tokens_predicted": max_tokens is None,
             "model_info": self.get_model_info()
         }
+        if llm_response is not None:
+            result["response_stats"] = llm_response.stats()
+        if final_answer is not None:
+            result["final_answer"] = final_answer
+        if cove is not None:
+            result["cove"] = cove
+        if consistency is not None:
+            result["self_consistency"] = consistency
+        return result
+
+    def compare_cove(self, prompt: Union[str, PromptDocument], max_tokens: int = 1000,
+                     context: str = "") -> Dict[str, Any]:
+        """Run single-prompt and factored CoVe on a prompt and report time, calls and tokens of both."""
+        from .cove import FactoredCoVe
+
+        if isinstance(prompt, PromptDocument):
+            prompt = prompt.render()
+        return FactoredCoVe(self).compare(prompt, max_tokens, context)
 
 
 class LLMModelFactory:
@@ -124,30 +434,33 @@ class LLMModelFactory:
 
     @staticmethod
     def create_model(model_name: str, temperature: float = 0.0,
-                    configuration: Optional[Dict[str, str]] = None) -> LLMModel:
+                    configuration: Optional[Dict[str, str]] = None,
+                    scheduler: Optional[RequestScheduler] = None) -> BaseModel:
         """Create an LLM model instance.
 
         Args:
-            model_name: Name/identifier of the model
+            model_name: Name/identifier of the model, or "router[:policy]" for a
+                RouterModel choosing a model per call ("cheapest" or "fastest")
             temperature: Temperature setting
             configuration: Configuration dict
+            scheduler: Optional scheduler that queues calls to the provider
 
         Returns:
-            LLMModel instance
+            LLMModel instance, or RouterModel for router names
         """
+        if model_name == "router" or model_name.startswith("router:"):
+            from .router import RouterModel
+            return RouterModel(policy=model_name.partition(":")[2] or "cheapest", temperature=temperature,
+                               configuration=configuration, scheduler=scheduler)
+
         return LLMModel(
             model_name=model_name,
             temperature=temperature,
-            configuration=configuration
+            configuration=configuration,
+            scheduler=scheduler
         )
 
     @staticmethod
     def list_supported_models() -> List[str]:
         """List supported model names."""
-        return [
-            "scaledown-gpt-4o",
-            "gpt-4",
-            "gpt-3.5-turbo",
-            "gemini-1.5-flash",
-            "gemini-2.5-flash-lite"
-        ]
\ No newline at end of file
+        return [spec.name for spec in get_model_catalog().iter_models() if spec.provider in LLM_PROVIDERS]
@@ -0,0 +1,239 @@
+"""
+Data-driven catalog of model capabilities, used for provider selection,
+token limits and routing.
+
+Each model has one ModelSpec: the provider that serves it, its context
+window, tokenizer, rate limits, prices and typical latency. Names resolve
+through an exact map first and then through a prefix trie of model families
+(longest prefix wins), and resolutions are cached. Provider modules are only
+imported when a provider class is first requested.
+"""
+import importlib
+import threading
+from typing import Any, Dict, Iterator, List, Optional
+
+
+class ModelSpec:
+    """Capabilities and pricing of one model or model family."""
+
+    __slots__ = ("name", "provider", "vendor", "context_window", "tokenizer",
+                 "requests_per_minute", "tokens_per_minute",
+                 "input_price", "output_price", "typical_latency")
+
+    def __init__(self, name: str, provider: str, vendor: str, context_window: int,
+                 tokenizer: str = "approx", requests_per_minute: Optional[int] = None,
+                 tokens_per_minute: Optional[int] = None, input_price: float = 0.0,
+                 output_price: float = 0.0, typical_latency: float = 1.0):
+        """Initialize model spec.
+
+        Args:
+            name: Model name, or family prefix for family specs
+            provider: API that serves the model in ScaleDown ("scaledown", "google", "anthropic", "mock")
+            vendor: Company that makes the model ("openai", "google", "anthropic", "mock")
+            context_window: Maximum prompt plus output tokens
+            tokenizer: tiktoken encoding name, or "approx"
+            requests_per_minute: Default request rate limit, if any
+            tokens_per_minute: Default token rate limit, if any
+            input_price: USD per million prompt tokens
+            output_price: USD per million output tokens
+            typical_latency: Typical seconds per call
+        """
+        set_field = object.__setattr__
+        set_field(self, "name", name)
+        set_field(self, "provider", provider)
+        set_field(self, "vendor", vendor)
+        set_field(self, "context_window", context_window)
+        set_field(self, "tokenizer", tokenizer)
+        set_field(self, "requests_per_minute", requests_per_minute)
+        set_field(self, "tokens_per_minute", tokens_per_minute)
+        set_field(self, "input_price", input_price)
+        set_field(self, "output_price", output_price)
+        set_field(self, "typical_latency", typical_latency)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("ModelSpec is immutable; use with_name() or register a new spec")
+
+    def with_name(self, name: str) -> 'ModelSpec':
+        """Copy of this spec under another name (e.g. a dated model version)."""
+        fields = self.to_dict()
+        fields["name"] = name
+        return ModelSpec(**fields)
+
+    def cost(self, input_tokens: int, output_tokens: int = 0) -> float:
+        """Price of a call in USD."""
+        return (input_tokens * self.input_price + output_tokens * self.output_price) / 1_000_000
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert spec to dictionary."""
+        return {field: getattr(self, field) for field in self.__slots__}
+
+    def __repr__(self):
+        return f"ModelSpec({self.name!r}, provider={self.provider!r}, context_window={self.context_window})"
+
+
+class _TrieNode:
+    __slots__ = ("children", "spec")
+
+    def __init__(self):
+        self.children: Dict[str, '_TrieNode'] = {}
+        self.spec: Optional[ModelSpec] = None
+
+
+class ModelCatalog:
+    """Resolves model names to ModelSpecs."""
+
+    def __init__(self, specs: Optional[List[ModelSpec]] = None,
+                 families: Optional[List[ModelSpec]] = None, cache_size: int = 1024):
+        """Initialize model catalog.
+
+        Args:
+            specs: Specs matched by exact (case-insensitive) name
+            families: Specs whose name is a prefix matching whole model families
+            cache_size: Number of prefix resolutions remembered
+        """
+        self._exact: Dict[str, ModelSpec] = {}
+        self._root = _TrieNode()
+        self._cache: Dict[str, Optional[ModelSpec]] = {}
+        self._cache_size = cache_size
+        self._lock = threading.Lock()
+
+        for spec in specs or ():
+            self.register(spec)
+        for spec in families or ():
+            self.register_family(spec)
+
+    def register(self, spec: ModelSpec) -> None:
+        """Add or replace a model matched by exact name."""
+        with self._lock:
+            self._exact[spec.name.lower()] = spec
+            self._cache.clear()
+
+    def register_family(self, spec: ModelSpec) -> None:
+        """Add or replace a family matched by name prefix."""
+        with self._lock:
+            node = self._root
+            for char in spec.name.lower():
+                node = node.children.setdefault(char, _TrieNode())
+            node.spec = spec
+            self._cache.clear()
+
+    def _longest_prefix(self, key: str) -> Optional[ModelSpec]:
+        node, match = self._root, None
+        for char in key:
+            node = node.children.get(char)
+            if node is None:
+                break
+            if node.spec is not None:
+                match = node.spec
+        return match
+
+    def resolve(self, model_name: str) -> Optional[ModelSpec]:
+        """Get the spec for a model name, or None if no model or family matches.
+
+        Family matches are returned under the requested name.
+        """
+        key = model_name.lower()
+        spec = self._exact.get(key)
+        if spec is not None:
+            return spec
+
+        try:
+            return self._cache[key]
+        except KeyError:
+            pass
+
+        family = self._longest_prefix(key)
+        spec = family.with_name(model_name) if family is not None else None
+        with self._lock:
+            if len(self._cache) >= self._cache_size:
+                self._cache.clear()
+            self._cache[key] = spec
+        return spec
+
+    def get_context_window(self, model_name: str, default: int = 4096) -> int:
+        """Context window of a model, or default if it is unknown."""
+        spec = self.resolve(model_name)
+        return spec.context_window if spec is not None else default
+
+    def iter_models(self, provider: Optional[str] = None) -> Iterator[ModelSpec]:
+        """Iterate exactly named models, optionally only those of one provider."""
+        for spec in list(self._exact.values()):
+            if provider is None or spec.provider == provider:
+                yield spec
+
+    def list_models(self, provider: Optional[str] = None) -> List[str]:
+        """List exactly named models, optionally only those of one provider."""
+        return [spec.name for spec in self.iter_models(provider)]
+
+
+# Provider classes by provider name, as "module:attribute", imported on first use
+LLM_PROVIDERS = {
+    "scaledown": "scaledown.tools.llms:ScaledownLLM",
+    "google": "scaledown.tools.llms:GoogleLLM",
+    "mock": "scaledown.tools.llms:MockLLM",
+}
+
+# SDK-backed BaseModel implementations by vendor
+MODEL_CLASSES = {
+    "anthropic": "scaledown.models.claude_model:ClaudeModel",
+    "openai": "scaledown.models.openai_model:OpenAIModel",
+}
+
+
+def load_class(path: str):
+    """Import a class given as "module:attribute"."""
+    module_name, _, attribute = path.partition(":")
+    return getattr(importlib.import_module(module_name), attribute)
+
+
+def _default_specs() -> List[ModelSpec]:
+    # Prices in USD per million tokens; rate limits match the providers' client-side throttles
+    return [
+        ModelSpec("scaledown-gpt-4o", "scaledown", "openai", 128000, "o200k_base", 60, None, 2.5, 10.0, 1.5),
+        ModelSpec("gpt-4o", "scaledown", "openai", 128000, "o200k_base", 60, None, 2.5, 10.0, 1.5),
+        ModelSpec("gpt-4-turbo", "scaledown", "openai", 128000, "cl100k_base", 60, None, 10.0, 30.0, 3.0),
+        ModelSpec("gpt-4-vision", "scaledown", "openai", 128000, "cl100k_base", 60, None, 10.0, 30.0, 3.0),
+        ModelSpec("gpt-4", "scaledown", "openai", 8192, "cl100k_base", 60, None, 30.0, 60.0, 4.0),
+        ModelSpec("gpt-3.5-turbo", "scaledown", "openai", 4096, "cl100k_base", 60, None, 0.5, 1.5, 1.0),
+        ModelSpec("gemini-2.5-flash-lite", "google", "google", 1048576, "approx", 15, 250000, 0.1, 0.4, 0.8),
+        ModelSpec("gemini-1.5-flash", "google", "google", 1048576, "approx", 15, 1000000, 0.075, 0.3, 1.0),
+        ModelSpec("gemini-1.5-pro", "google", "google", 2097152, "approx", 2, 32000, 1.25, 5.0, 3.0),
+        ModelSpec("claude-3-5-sonnet-20240620", "anthropic", "anthropic", 200000, "approx", 50, 40000, 3.0, 15.0, 2.5),
+        ModelSpec("claude-3-opus-20240229", "anthropic", "anthropic", 200000, "approx", 50, 20000, 15.0, 75.0, 5.0),
+        ModelSpec("claude-3-sonnet-20240229", "anthropic", "anthropic", 200000, "approx", 50, 40000, 3.0, 15.0, 2.5),
+        ModelSpec("claude-3-haiku-20240307", "anthropic", "anthropic", 200000, "approx", 50, 50000, 0.25, 1.25, 1.0),
+        ModelSpec("claude-2.1", "anthropic", "anthropic", 200000, "approx", 50, 40000, 8.0, 24.0, 4.0),
+        ModelSpec("claude-2.0", "anthropic", "anthropic", 100000, "approx", 50, 40000, 8.0, 24.0, 4.0),
+        ModelSpec("mock", "mock", "mock", 128000, "approx", None, None, 0.0, 0.0, 0.05),
+    ]
+
+
+def _default_families() -> List[ModelSpec]:
+    return [
+        ModelSpec("scaledown", "scaledown", "openai", 128000, "o200k_base", 60, None, 2.5, 10.0, 1.5),
+        ModelSpec("gpt-4o", "scaledown", "openai", 128000, "o200k_base", 60, None, 2.5, 10.0, 1.5),
+        ModelSpec("gpt-4-turbo", "scaledown", "openai", 128000, "cl100k_base", 60, None, 10.0, 30.0, 3.0),
+        ModelSpec("gpt-4", "scaledown", "openai", 8192, "cl100k_base", 60, None, 30.0, 60.0, 4.0),
+        ModelSpec("gpt-3.5", "scaledown", "openai", 4096, "cl100k_base", 60, None, 0.5, 1.5, 1.0),
+        ModelSpec("gpt", "scaledown", "openai", 8192, "cl100k_base", 60, None, 30.0, 60.0, 4.0),
+        ModelSpec("openai", "scaledown", "openai", 8192, "cl100k_base", 60, None, 30.0, 60.0, 4.0),
+        ModelSpec("gemini", "google", "google", 1048576, "approx", 15, None, 0.1, 0.4, 1.0),
+        ModelSpec("claude", "anthropic", "anthropic", 200000, "approx", 50, None, 3.0, 15.0, 2.5),
+        ModelSpec("mock", "mock", "mock", 128000, "approx", None, None, 0.0, 0.0, 0.05),
+    ]
+
+
+# Global catalog instance
+_global_catalog = None
+
+def get_model_catalog() -> ModelCatalog:
+    """Get the global model catalog instance."""
+    global _global_catalog
+    if _global_catalog is None:
+        _global_catalog = ModelCatalog(_default_specs(), _default_families())
+    return _global_catalog
+
+
+def resolve_model(model_name: str) -> Optional[ModelSpec]:
+    """Resolve a model name with the global catalog."""
+    return get_model_catalog().resolve(model_name)
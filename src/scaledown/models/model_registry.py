@@ -4,12 +4,33 @@ from typing import Dict, Type, List, Optional
 import os
 
 from .base_model import BaseModel
-from .claude_model import ClaudeModel
-from .openai_model import OpenAIModel
+from .model_catalog import MODEL_CLASSES, get_model_catalog, load_class
+
+
+# Environment variables holding each vendor's API key
+API_KEY_VARIABLES = {
+    "anthropic": "ANTHROPIC_API_KEY",
+    "openai": "OPENAI_API_KEY",
+}
+
+
+def _vendor_api_name(spec) -> bool:
+    """Whether a model is known to its vendor's API by its catalog name.
+
+    Names prefixed with their provider ("scaledown-gpt-4o", the "scaledown"
+    family) are that provider's own and mean nothing to the vendor's SDK.
+    """
+    return spec.name.partition("-")[0] != spec.provider
 
 
 class ModelRegistry:
-    """Registry for AI model implementations."""
+    """Registry for AI model implementations.
+    
+    Model names resolve through the model catalog to a vendor, whose
+    implementation (and SDK) is imported on first use. Names that only a
+    provider knows, such as "scaledown-gpt-4o", do not resolve to the
+    vendor's SDK. Classes registered explicitly take precedence.
+    """
     
     def __init__(self):
         """Initialize model registry."""
@@ -18,35 +39,11 @@ class ModelRegistry:
         self._register_default_models()
     
     def _register_default_models(self):
-        """Register default model implementations."""
-        # Register model families
-        self.register_model_class("claude", ClaudeModel)
-        self.register_model_class("gpt", OpenAIModel)
-        self.register_model_class("openai", OpenAIModel)  # Alias
-        
-        # Register Claude models
-        claude_models = [
-            "claude-3-opus-20240229", 
-            "claude-3-sonnet-20240229",
-            "claude-3-haiku-20240307",
-            "claude-3-5-sonnet-20240620",
-            "claude-2.0",
-            "claude-2.1",
-        ]
-        for model in claude_models:
-            self.register_model_class(model, ClaudeModel)
+        """Register the default model groups from the model catalog."""
+        specs = [spec for spec in get_model_catalog().iter_models() if _vendor_api_name(spec)]
+        claude_models = [spec.name for spec in specs if spec.vendor == "anthropic"]
+        openai_models = [spec.name for spec in specs if spec.vendor == "openai"]
         self._model_groups["claude"] = claude_models
-            
-        # Register OpenAI models
-        openai_models = [
-            "gpt-3.5-turbo", 
-            "gpt-4",
-            "gpt-4-turbo", 
-            "gpt-4o",
-            "gpt-4-vision",
-        ]
-        for model in openai_models:
-            self.register_model_class(model, OpenAIModel)
         self._model_groups["openai"] = openai_models
         self._model_groups["gpt"] = openai_models
     
@@ -59,6 +56,12 @@ class ModelRegistry:
         """
         self._model_classes[model_name.lower()] = model_class
     
+    def _resolve_vendor(self, model_name: str) -> Optional[str]:
+        spec = get_model_catalog().resolve(model_name)
+        if spec is None or spec.vendor not in MODEL_CLASSES or not _vendor_api_name(spec):
+            return None
+        return spec.vendor
+    
     def get_model_class(self, model_name: str) -> Optional[Type[BaseModel]]:
         """Get the model class for a given model name.
         
@@ -70,16 +73,13 @@ class ModelRegistry:
         """
         model_key = model_name.lower()
         
-        # Try exact match first
         if model_key in self._model_classes:
             return self._model_classes[model_key]
         
-        # Try prefix match
-        for registered_name, model_class in self._model_classes.items():
-            if model_key.startswith(registered_name):
-                return model_class
-        
-        return None
+        vendor = self._resolve_vendor(model_name)
+        if vendor is None:
+            return None
+        return load_class(MODEL_CLASSES[vendor])
     
     def create_model(self, model_name: str, **kwargs) -> BaseModel:
         """Create a model instance.
@@ -101,10 +101,9 @@ class ModelRegistry:
         
         # Look for API keys in environment if not provided
         if "api_key" not in kwargs:
-            if model_class == ClaudeModel:
-                kwargs["api_key"] = os.environ.get("ANTHROPIC_API_KEY")
-            elif model_class == OpenAIModel:
-                kwargs["api_key"] = os.environ.get("OPENAI_API_KEY")
+            variable = API_KEY_VARIABLES.get(self._resolve_vendor(model_name))
+            if variable:
+                kwargs["api_key"] = os.environ.get(variable)
         
         return model_class(model_name, **kwargs)
     
@@ -120,7 +119,10 @@ class ModelRegistry:
         if group and group.lower() in self._model_groups:
             return self._model_groups[group.lower()]
         
-        return list(sorted(self._model_classes.keys()))
+        models = set(self._model_classes)
+        for names in self._model_groups.values():
+            models.update(names)
+        return sorted(models)
 
 
 # Create a singleton instance
@@ -0,0 +1,124 @@
+"""
+Learned max_tokens budgets from the output lengths of past calls.
+
+Output lengths are recorded per model, optimizers, style and template. A
+budget is predicted at a percentile of the most specific group with enough
+samples: (model, optimizers, style, template), then (model, optimizers,
+style), (model, optimizers) and (model). Until any group has enough samples
+the default budget is used. Outputs that used their whole budget were
+probably truncated, so they are recorded at twice their length to let the
+budget grow again.
+"""
+import threading
+from collections import deque
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+
+class OutputBudgetPredictor:
+    """Predicts max_tokens per model, optimizers, style and template."""
+
+    def __init__(self, percentile: float = 0.95, headroom: float = 1.1, min_samples: int = 20,
+                 sample_size: int = 500, default_budget: int = 1000,
+                 min_budget: int = 16, max_budget: int = 4096):
+        """Initialize predictor.
+
+        Args:
+            percentile: Fraction of past outputs the budget should cover
+            headroom: Factor applied on top of the percentile
+            min_samples: Outputs a group needs before it is used for predictions
+            sample_size: Recent outputs kept per group
+            default_budget: Budget used while no group has enough samples
+            min_budget: Smallest budget predicted
+            max_budget: Largest budget predicted
+        """
+        if not 0 < percentile <= 1:
+            raise ValueError("percentile must be in (0, 1]")
+
+        self.percentile = percentile
+        self.headroom = headroom
+        self.min_samples = min_samples
+        self.sample_size = sample_size
+        self.default_budget = default_budget
+        self.min_budget = min_budget
+        self.max_budget = max_budget
+        self._samples: Dict[Tuple, deque] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _keys(model: str, optimizers: Iterable[str], style: Optional[str],
+              template: Optional[str]) -> List[Tuple]:
+        # Most specific group first
+        optimizers = tuple(sorted(optimizers or ()))
+        return [
+            (model, optimizers, style, template),
+            (model, optimizers, style),
+            (model, optimizers),
+            (model,),
+        ]
+
+    def record(self, model: str, output_tokens: int, optimizers: Iterable[str] = (),
+               style: Optional[str] = None, template: Optional[str] = None,
+               budget: Optional[int] = None) -> None:
+        """Record the output length of a call.
+
+        Args:
+            model: Model name
+            output_tokens: Tokens in the response
+            optimizers: Optimizers applied to the prompt
+            style: Style ID of the prompt, if any
+            template: Template ID of the prompt, if any
+            budget: max_tokens of the call, to detect truncated outputs
+        """
+        if budget is not None and output_tokens >= budget:
+            output_tokens *= 2
+        with self._lock:
+            for key in self._keys(model, optimizers, style, template):
+                samples = self._samples.get(key)
+                if samples is None:
+                    samples = self._samples[key] = deque(maxlen=self.sample_size)
+                samples.append(output_tokens)
+
+    def predict(self, model: str, optimizers: Iterable[str] = (), style: Optional[str] = None,
+                template: Optional[str] = None) -> int:
+        """Predict a max_tokens budget for a call."""
+        with self._lock:
+            for key in self._keys(model, optimizers, style, template):
+                samples = self._samples.get(key)
+                if samples is not None and len(samples) >= self.min_samples:
+                    ordered = sorted(samples)
+                    break
+            else:
+                return self.default_budget
+
+        value = ordered[min(len(ordered) - 1, int(len(ordered) * self.percentile))]
+        return max(self.min_budget, min(self.max_budget, int(value * self.headroom) + 1))
+
+    def stats(self) -> Dict[str, Any]:
+        """Sample counts and predicted budgets of the fully specified groups."""
+        with self._lock:
+            keys = [key for key in self._samples if len(key) == 4]
+            counts = {key: len(self._samples[key]) for key in keys}
+        return {
+            "groups": [
+                {
+                    "model": key[0],
+                    "optimizers": list(key[1]),
+                    "style": key[2],
+                    "template": key[3],
+                    "samples": counts[key],
+                    "budget": self.predict(*key),
+                }
+                for key in keys
+            ]
+        }
+
+
+# Global predictor instance
+_global_predictor = None
+
+def get_output_budget_predictor() -> OutputBudgetPredictor:
+    """Get the global output budget predictor instance."""
+    global _global_predictor
+    if _global_predictor is None:
+        _global_predictor = OutputBudgetPredictor()
+    return _global_predictor
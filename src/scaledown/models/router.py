@@ -0,0 +1,273 @@
+"""
+Router model that sends each prompt to the best-fitting catalog model.
+
+After optimization, the prompt's tokens are counted with each candidate's
+tokenizer. Candidates whose context window cannot hold the prompt plus the
+requested output are skipped, and the rest are ranked by the routing policy:
+"cheapest" (estimated cost of the call) or "fastest" (typical latency). As
+prompts grow, routes fall back to models with larger context windows. A
+candidate that cannot be created (missing API key or SDK) or that is rate
+limited or times out is skipped in favour of the next one.
+"""
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from .base_model import BaseModel
+from .model_catalog import LLM_PROVIDERS, ModelCatalog, ModelSpec, get_model_catalog
+from .output_budget import OutputBudgetPredictor, get_output_budget_predictor
+from ..templates.prompt_document import PromptDocument
+from ..tools.llm_response import LLMResponse
+from ..tools.llms import ProviderTimeoutError, RateLimitError
+from ..utils.metrics import LLM_RETRIES
+from ..utils.token_counter import count_tokens
+
+
+ROUTING_POLICIES = ("cheapest", "fastest")
+
+
+class RouterModel(BaseModel):
+    """Model that routes every call to the cheapest or fastest model that fits."""
+
+    def __init__(self, candidates: Optional[List[str]] = None, policy: str = "cheapest",
+                 temperature: float = 0.0, configuration: Optional[Dict[str, str]] = None,
+                 scheduler=None, output_budget: Optional[OutputBudgetPredictor] = None,
+                 catalog: Optional[ModelCatalog] = None, **kwargs):
+        """Initialize router model.
+
+        Args:
+            candidates: Model names to route between (defaults to every supported
+                catalog model except the mock provider)
+            policy: "cheapest" or "fastest"
+            temperature: Temperature of the routed models
+            configuration: Configuration dict for API keys etc.
+            scheduler: Optional RequestScheduler used by the routed models
+            output_budget: Predictor of max_tokens for optimize_and_call (the global one if None)
+            catalog: Catalog the candidates are resolved in (the global one if None)
+            **kwargs: Additional model-specific configuration
+        """
+        if policy not in ROUTING_POLICIES:
+            raise ValueError(f"Unknown routing policy: {policy}")
+
+        super().__init__(f"router:{policy}", **kwargs)
+        catalog = catalog or get_model_catalog()
+        if candidates is None:
+            candidates = [spec.name for spec in catalog.iter_models()
+                          if spec.provider in LLM_PROVIDERS and spec.provider != "mock"]
+
+        self.catalog = catalog
+        self.specs: List[ModelSpec] = []
+        for name in candidates:
+            spec = catalog.resolve(name)
+            if spec is None or spec.provider not in LLM_PROVIDERS:
+                raise ValueError(f"Unsupported model: {name}")
+            self.specs.append(spec)
+        if not self.specs:
+            raise ValueError("A router needs at least one candidate model")
+
+        self.policy = policy
+        self.temperature = temperature
+        self.configuration = configuration or {}
+        self.scheduler = scheduler
+        self.output_budget = output_budget or get_output_budget_predictor()
+        self._models: Dict[str, Any] = {}
+        self._unavailable: Dict[str, str] = {}
+        self._stats: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def optimize_prompt(self, prompt: str) -> str:
+        """Basic optimization, as done by the routed models."""
+        return prompt.replace("Please ", "").replace("Could you ", "")
+
+    def count_tokens(self, text: str) -> int:
+        """Count tokens with the tokenizer of the first candidate."""
+        return count_tokens(text, self.specs[0].tokenizer)
+
+    def get_token_limit(self) -> int:
+        """Largest context window among the candidates."""
+        return max(spec.context_window for spec in self.specs)
+
+    def route(self, prompt: str, max_tokens: int = 1000, context: str = "") -> List[Tuple[ModelSpec, int]]:
+        """Rank the candidates that fit a prompt, best first.
+
+        Returns:
+            (spec, prompt tokens) pairs for every candidate whose context window
+            holds the prompt, context and max_tokens, ordered by the policy
+        """
+        text = f"{context}\n\n{prompt}" if context else prompt
+        tokens_by_tokenizer: Dict[str, int] = {}
+        fitting = []
+        for spec in self.specs:
+            if spec.name in self._unavailable:
+                continue
+            tokens = tokens_by_tokenizer.get(spec.tokenizer)
+            if tokens is None:
+                tokens = tokens_by_tokenizer[spec.tokenizer] = count_tokens(text, spec.tokenizer)
+            if tokens + max_tokens <= spec.context_window:
+                fitting.append((spec, tokens))
+
+        if self.policy == "fastest":
+            fitting.sort(key=lambda item: (item[0].typical_latency, item[0].cost(item[1], max_tokens)))
+        else:
+            fitting.sort(key=lambda item: (item[0].cost(item[1], max_tokens), item[0].typical_latency))
+        return fitting
+
+    def _get_model(self, spec: ModelSpec):
+        model = self._models.get(spec.name)
+        if model is None:
+            from .llm_model import LLMModel
+            with self._lock:
+                model = self._models.get(spec.name)
+                if model is None:
+                    model = LLMModel(spec.name, temperature=self.temperature,
+                                     configuration=self.configuration, scheduler=self.scheduler,
+                                     catalog=self.catalog)
+                    self._models[spec.name] = model
+        return model
+
+    def _record(self, spec: ModelSpec, field: str, input_tokens: int = 0, output_tokens: int = 0,
+                latency: float = 0.0) -> None:
+        with self._lock:
+            stats = self._stats.get(spec.name)
+            if stats is None:
+                stats = self._stats[spec.name] = {"calls": 0, "fallbacks": 0, "input_tokens": 0,
+                                                  "output_tokens": 0, "latency": 0.0, "cost": 0.0}
+            stats[field] += 1
+            if field == "calls":
+                stats["input_tokens"] += input_tokens
+                stats["output_tokens"] += output_tokens
+                stats["latency"] += latency
+                stats["cost"] += spec.cost(input_tokens, output_tokens)
+
+    def generate_routed(self, prompt: Union[str, PromptDocument], max_tokens: int = 1000, context: str = "",
+                        priority: Optional[str] = None, tenant: Optional[str] = None,
+                        raw: bool = False) -> Tuple[LLMResponse, ModelSpec]:
+        """Call the best-fitting model, falling back to the next on congestion.
+
+        Returns:
+            The structured response, whose retries count the fallbacks, and the
+            spec of the model that produced it
+
+        Raises:
+            ValueError: If no candidate fits or none is available
+        """
+        if isinstance(prompt, PromptDocument):
+            prompt = prompt.render()
+
+        routes = self.route(prompt, max_tokens, context)
+        if not routes:
+            raise ValueError(f"No candidate model fits a prompt of {self.count_tokens(prompt + context)} "
+                             f"tokens plus {max_tokens} output tokens")
+
+        last_error: Optional[Exception] = None
+        retries = 0
+        for spec, tokens in routes:
+            try:
+                model = self._get_model(spec)
+            except (ValueError, ImportError) as error:
+                # Missing API key or SDK: never route here again
+                with self._lock:
+                    self._unavailable[spec.name] = str(error)
+                last_error = error
+                continue
+
+            start = time.perf_counter()
+            try:
+                response = model.generate(prompt, max_tokens, context=context, priority=priority,
+                                          tenant=tenant, raw=raw)
+            except (RateLimitError, ProviderTimeoutError) as error:
+                self._record(spec, "fallbacks")
+                LLM_RETRIES.inc((spec.provider, spec.name, type(error).__name__))
+                last_error = error
+                retries += 1
+                continue
+            output_tokens = response.output_tokens
+            if output_tokens is None:
+                output_tokens = count_tokens(response.text, spec.tokenizer)
+            self._record(spec, "calls", tokens if response.input_tokens is None else response.input_tokens,
+                         output_tokens, time.perf_counter() - start)
+            return response.replace(retries=response.retries + retries), spec
+
+        raise ValueError(f"No candidate model available: {last_error}")
+
+    def call_llm_routed(self, prompt: Union[str, PromptDocument], max_tokens: int = 1000, context: str = "",
+                        priority: Optional[str] = None, tenant: Optional[str] = None) -> Tuple[str, ModelSpec]:
+        """Call the best-fitting model, falling back to the next on congestion.
+
+        Returns:
+            The response and the spec of the model that produced it
+
+        Raises:
+            ValueError: If no candidate fits or none is available
+        """
+        response, spec = self.generate_routed(prompt, max_tokens, context, priority, tenant)
+        return response.text, spec
+
+    def generate(self, prompt: Union[str, PromptDocument], max_tokens: int = 1000, context: str = "",
+                 priority: Optional[str] = None, tenant: Optional[str] = None,
+                 raw: bool = False) -> LLMResponse:
+        """Call the best-fitting model and return its structured response."""
+        return self.generate_routed(prompt, max_tokens, context, priority, tenant, raw)[0]
+
+    def call_llm(self, prompt: Union[str, PromptDocument], max_tokens: int = 1000, context: str = "",
+                 priority: Optional[str] = None, tenant: Optional[str] = None) -> str:
+        """Call the best-fitting model and return its response."""
+        return self.call_llm_routed(prompt, max_tokens, context, priority, tenant)[0]
+
+    def optimize_and_call(self, prompt: Union[str, PromptDocument], optimizers: List[str],
+                          max_tokens: Optional[int] = None, context: str = "",
+                          priority: Optional[str] = None, tenant: Optional[str] = None,
+                          style: Optional[str] = None, template: Optional[str] = None) -> Dict[str, Any]:
+        """Optimize prompt with pipeline, then route and call it.
+
+        Routing uses the optimized prompt, so optimizers that add text can move
+        a prompt to a model with a larger context window. If max_tokens is None,
+        the budget is learned from past outputs of this router's calls.
+        """
+        optimization_report = self.get_optimization_report(prompt, optimizers)
+        optimized_prompt = optimization_report["optimized_prompt"]
+
+        budget = max_tokens
+        if budget is None:
+            budget = self.output_budget.predict(self.model_name, optimizers, style, template)
+
+        llm_response, spec = self.generate_routed(optimized_prompt, budget, context, priority, tenant)
+        response = llm_response.text
+        self.output_budget.record(self.model_name, count_tokens(response, spec.tokenizer), optimizers,
+                                  style, template, budget)
+
+        return {
+            "original_prompt": optimization_report["original_prompt"],
+            "optimized_prompt": optimized_prompt,
+            "optimizers_applied": optimizers,
+            "optimization_metrics": optimization_report,
+            "llm_response": response,
+            "max_tokens": budget,
+            "max_tokens_predicted": max_tokens is None,
+            "response_stats": llm_response.stats(),
+            "model_info": self.get_model_info(spec)
+        }
+
+    def get_model_info(self, spec: Optional[ModelSpec] = None) -> Dict[str, Any]:
+        """Get router information, and the routed model's if given."""
+        info = {
+            "model_id": self.model_name,
+            "provider": self.__class__.__name__,
+            "policy": self.policy,
+            "candidates": [candidate.name for candidate in self.specs],
+            "token_limit": self.get_token_limit(),
+            "temperature": self.temperature,
+        }
+        if spec is not None:
+            info["routed_to"] = spec.name
+            info["routed_provider"] = spec.provider
+        return info
+
+    def route_stats(self) -> Dict[str, Dict[str, float]]:
+        """Calls, fallbacks, tokens, total latency and cost per routed model."""
+        with self._lock:
+            stats = {name: dict(values) for name, values in self._stats.items()}
+            unavailable = dict(self._unavailable)
+        for name, reason in unavailable.items():
+            stats.setdefault(name, {})["unavailable"] = reason
+        return stats
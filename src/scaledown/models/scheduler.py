@@ -0,0 +1,297 @@
+"""
+Priority scheduler for provider calls, with weighted fair queuing per tenant.
+
+Calls are queued per provider (the unit that shares a rate-limit budget) and
+run on a shared thread pool, at most ``limit`` at a time per provider. Within
+a provider, lower priority classes run first; within a priority class,
+tenants share the provider in proportion to their weights using weighted
+fair queuing: each call's virtual finish tag is its start tag plus its cost
+divided by the tenant's weight, and calls run in finish-tag order, so one
+tenant's backlog delays another's calls by at most about one call. Callers get a concurrent.futures.Future, or an asyncio
+awaitable from submit_async(). With adaptive=True each provider's limit is
+tuned by an AdaptiveConcurrencyLimiter from the calls' latency and errors.
+"""
+import asyncio
+import contextvars
+import heapq
+import itertools
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Union
+
+from .concurrency import AdaptiveConcurrencyLimiter
+from ..utils.tracing import span
+
+
+# Priority classes; lower values are served first
+PRIORITIES = {
+    "interactive": 0,
+    "default": 1,
+    "batch": 2,
+}
+
+
+def _priority_value(priority: Union[str, int]) -> int:
+    if isinstance(priority, int):
+        return priority
+    try:
+        return PRIORITIES[priority]
+    except KeyError:
+        raise ValueError(f"Unknown priority: {priority}") from None
+
+
+def _percentile(samples, fraction: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+class _Call:
+    __slots__ = ("future", "fn", "args", "kwargs", "priority", "tenant", "start_tag", "enqueued", "started",
+                 "context")
+
+    def __init__(self, future, fn, args, kwargs, priority, tenant, start_tag):
+        self.future = future
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.priority = priority
+        self.tenant = tenant
+        self.start_tag = start_tag
+        self.enqueued = time.monotonic()
+        self.started = None
+        # Runs the call in the submitter's context, so its trace spans nest under the caller's
+        self.context = contextvars.copy_context()
+
+
+class _ProviderQueue:
+    """Queued and running calls of one provider."""
+
+    def __init__(self, limit: int, limiter: Optional[AdaptiveConcurrencyLimiter] = None):
+        self.limit = limit
+        self.limiter = limiter
+        self.in_flight = 0
+        self.completed = 0
+        self.heap = []
+        # Per priority class: virtual time and each tenant's last finish tag
+        self.virtual_time: Dict[int, float] = {}
+        self.finish_tags: Dict[int, Dict[str, float]] = {}
+
+
+class RequestScheduler:
+    """Schedules provider calls by priority, tenant share and provider limit."""
+
+    def __init__(self, concurrency: int = 4, max_workers: int = 64,
+                 tenant_weights: Optional[Dict[str, float]] = None, sample_size: int = 1024,
+                 adaptive: bool = False, limiter_options: Optional[Dict[str, Any]] = None):
+        """Initialize scheduler.
+
+        Args:
+            concurrency: Default (or, if adaptive, initial) concurrent calls per provider
+            max_workers: Threads shared by all providers
+            tenant_weights: Relative shares of tenants (default weight 1)
+            sample_size: Queue times kept per priority class for percentiles
+            adaptive: Tune each provider's limit with an AdaptiveConcurrencyLimiter
+            limiter_options: Keyword arguments for the limiters (e.g. max_limit)
+        """
+        if concurrency <= 0 or max_workers <= 0:
+            raise ValueError("concurrency and max_workers must be positive")
+
+        self.concurrency = concurrency
+        self.tenant_weights: Dict[str, float] = dict(tenant_weights or {})
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="scaledown-scheduler")
+        self._queues: Dict[str, _ProviderQueue] = {}
+        self._lock = threading.Lock()
+        self._sequence = itertools.count()
+        self._sample_size = sample_size
+        self._queue_times: Dict[int, deque] = {}
+        self._waited: Dict[int, float] = {}
+        self._tenant_counts: Dict[str, Dict[str, int]] = {}
+        self._closed = False
+        self.adaptive = adaptive
+        self.limiter_options = dict(limiter_options or {})
+        self.limiter_options.setdefault("max_limit", max(max_workers, concurrency))
+
+    def _queue(self, provider: str) -> _ProviderQueue:
+        queue = self._queues.get(provider)
+        if queue is None:
+            limiter = None
+            if self.adaptive:
+                limiter = AdaptiveConcurrencyLimiter(initial_limit=self.concurrency, **self.limiter_options)
+            queue = self._queues[provider] = _ProviderQueue(self.concurrency, limiter)
+        return queue
+
+    def set_concurrency(self, provider: str, limit: int) -> None:
+        """Set how many calls to a provider may run at once.
+
+        With adaptive limits this sets the current limit, which keeps adapting.
+        """
+        if limit <= 0:
+            raise ValueError("limit must be positive")
+        with self._lock:
+            queue = self._queue(provider)
+            if queue.limiter is not None:
+                queue.limiter.set_limit(limit)
+                limit = queue.limiter.limit
+            queue.limit = limit
+            self._dispatch(provider)
+
+    def set_tenant_weight(self, tenant: str, weight: float) -> None:
+        """Set a tenant's relative share of each provider."""
+        if weight <= 0:
+            raise ValueError("weight must be positive")
+        with self._lock:
+            self.tenant_weights[tenant] = weight
+
+    def submit(self, provider: str, fn: Callable[..., Any], *args,
+               priority: Union[str, int] = "default", tenant: str = "default",
+               cost: float = 1.0, **kwargs) -> Future:
+        """Queue a call to fn(*args, **kwargs) against a provider.
+
+        Args:
+            provider: Queue to use; calls sharing a rate-limit budget share a provider
+            fn: Callable making the provider call
+            priority: Priority class name (see PRIORITIES) or number
+            tenant: Tenant the call is accounted to
+            cost: Work the call represents, e.g. its estimated tokens
+
+        Returns:
+            Future resolved with the call's result or exception
+        """
+        level = _priority_value(priority)
+        future = Future()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Scheduler has been shut down")
+            queue = self._queue(provider)
+            virtual_time = queue.virtual_time.get(level, 0.0)
+            finish_tags = queue.finish_tags.setdefault(level, {})
+            start_tag = max(virtual_time, finish_tags.get(tenant, 0.0))
+            finish_tags[tenant] = start_tag + cost / self.tenant_weights.get(tenant, 1.0)
+
+            call = _Call(future, fn, args, kwargs, level, tenant, start_tag)
+            heapq.heappush(queue.heap, (level, finish_tags[tenant], next(self._sequence), call))
+            self._count(tenant, "submitted")
+            self._dispatch(provider)
+        return future
+
+    def submit_async(self, provider: str, fn: Callable[..., Any], *args, **kwargs) -> 'asyncio.Future':
+        """Like submit(), but return an awaitable for the running event loop."""
+        return asyncio.wrap_future(self.submit(provider, fn, *args, **kwargs))
+
+    def _count(self, tenant: str, field: str) -> None:
+        counts = self._tenant_counts.setdefault(tenant, {"submitted": 0, "completed": 0})
+        counts[field] += 1
+
+    def _dispatch(self, provider: str) -> None:
+        # Caller holds self._lock
+        queue = self._queues[provider]
+        while queue.heap and queue.in_flight < queue.limit:
+            _, _, _, call = heapq.heappop(queue.heap)
+            if not call.future.set_running_or_notify_cancel():
+                continue
+            queue.virtual_time[call.priority] = call.start_tag
+            queue.in_flight += 1
+
+            waited = time.monotonic() - call.enqueued
+            samples = self._queue_times.get(call.priority)
+            if samples is None:
+                samples = self._queue_times[call.priority] = deque(maxlen=self._sample_size)
+            samples.append(waited)
+            self._waited[call.priority] = max(self._waited.get(call.priority, 0.0), waited)
+
+            call.started = time.monotonic()
+            self._executor.submit(self._run, provider, call)
+
+    @staticmethod
+    def _call(provider: str, call: _Call) -> Any:
+        with span("scaledown.scheduler.run", provider=provider, tenant=call.tenant,
+                  queue_time=call.started - call.enqueued):
+            return call.fn(*call.args, **call.kwargs)
+
+    def _run(self, provider: str, call: _Call) -> None:
+        result = error = None
+        try:
+            result = call.context.run(self._call, provider, call)
+        except BaseException as exception:
+            error = exception
+
+        # Book the call before resolving its future, so the stats are current
+        # by the time a caller waiting on the future reads them
+        latency = time.monotonic() - call.started
+        with self._lock:
+            queue = self._queues[provider]
+            if queue.limiter is not None:
+                queue.limiter.record(latency, error, queue.in_flight)
+                queue.limit = queue.limiter.limit
+            queue.in_flight -= 1
+            queue.completed += 1
+            self._count(call.tenant, "completed")
+            self._dispatch(provider)
+
+        if error is not None:
+            call.future.set_exception(error)
+        else:
+            call.future.set_result(result)
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue depths, limits, queue times per priority class and tenant counts."""
+        names = {value: name for name, value in PRIORITIES.items()}
+        with self._lock:
+            providers = {}
+            for provider, queue in self._queues.items():
+                providers[provider] = {
+                    "queued": len(queue.heap),
+                    "in_flight": queue.in_flight,
+                    "limit": queue.limit,
+                    "completed": queue.completed,
+                }
+                if queue.limiter is not None:
+                    providers[provider]["limiter"] = queue.limiter.stats()
+            queue_time = {}
+            for level, samples in self._queue_times.items():
+                queue_time[names.get(level, str(level))] = {
+                    "count": len(samples),
+                    "mean": sum(samples) / len(samples),
+                    "p50": _percentile(samples, 0.5),
+                    "p99": _percentile(samples, 0.99),
+                    "max": self._waited[level],
+                }
+            tenants = {tenant: dict(counts) for tenant, counts in self._tenant_counts.items()}
+        return {"providers": providers, "queue_time": queue_time, "tenants": tenants}
+
+    def shutdown(self, wait: bool = True, cancel_queued: bool = False) -> None:
+        """Stop accepting calls; optionally cancel queued ones, then stop the threads.
+
+        With wait=True, returns once queued (unless cancelled) and running calls finish.
+        """
+        with self._lock:
+            self._closed = True
+            if cancel_queued:
+                for queue in self._queues.values():
+                    for _, _, _, call in queue.heap:
+                        call.future.cancel()
+                    queue.heap.clear()
+        if wait:
+            while True:
+                with self._lock:
+                    busy = any(queue.heap or queue.in_flight for queue in self._queues.values())
+                if not busy:
+                    break
+                time.sleep(0.01)
+        self._executor.shutdown(wait=wait)
+
+
+# Global scheduler instance
+_global_scheduler = None
+_global_scheduler_lock = threading.Lock()
+
+def get_request_scheduler() -> RequestScheduler:
+    """Get the global request scheduler instance."""
+    global _global_scheduler
+    if _global_scheduler is None:
+        with _global_scheduler_lock:
+            if _global_scheduler is None:
+                _global_scheduler = RequestScheduler()
+    return _global_scheduler
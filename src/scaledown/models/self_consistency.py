@@ -0,0 +1,138 @@
+"""
+Self-consistency: sample a prompt several times and vote on the answers.
+
+All samples are sent at once at a sampling temperature. Each sample's final
+answer (or whole response, if the prompt does not ask for the final answer
+format) is normalized and counted as it arrives. As soon as one answer has
+the votes required by the consensus threshold, queued samples are cancelled
+and running ones are stopped at their next streamed chunk. The calls and
+output tokens saved by stopping early are reported. A sample that fails (a
+rate limit, say) is not a vote; the vote fails only if every sample does.
+"""
+import math
+import threading
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Dict, Optional
+
+from ..tools.final_answer import normalize_answer
+
+
+class SelfConsistency:
+    """Fans out samples of one prompt and stops once they agree."""
+
+    def __init__(self, model, samples: int = 5, threshold: float = 0.5, temperature: float = 0.7):
+        """Initialize self-consistency sampling.
+
+        Args:
+            model: LLMModel making the calls; its scheduler, if any, queues them
+            samples: Number of samples requested
+            threshold: Fraction of the samples that must agree to stop early
+            temperature: Sampling temperature
+        """
+        if samples < 1:
+            raise ValueError("samples must be at least 1")
+        if not 0 < threshold <= 1:
+            raise ValueError("threshold must be in (0, 1]")
+
+        self.model = model
+        self.samples = samples
+        self.threshold = threshold
+        self.temperature = temperature
+
+    @property
+    def votes_needed(self) -> int:
+        """Votes an answer needs to end sampling early."""
+        return max(1, math.ceil(self.threshold * self.samples))
+
+    def run(self, prompt: str, max_tokens: int = 1000, context: str = "",
+            priority: Optional[str] = None, tenant: Optional[str] = None) -> Dict[str, Any]:
+        """Sample a prompt and vote on the answers.
+
+        Returns:
+            Dictionary with the winning sample's final answer and response, the
+            votes per normalized answer, and sampling statistics
+
+        Raises:
+            Exception: The error of the first failed sample, if no sample completed
+        """
+        provider = self.model.sampling_provider(self.temperature)
+        cancel = threading.Event()
+        executor = None
+
+        if self.model.scheduler is not None:
+            futures = [self.model._dispatch(self.model._stream_final_answer, prompt, max_tokens, context,
+                                            priority, tenant, provider, cancel)
+                       for _ in range(self.samples)]
+        else:
+            executor = ThreadPoolExecutor(max_workers=self.samples)
+            futures = [executor.submit(self.model._stream_final_answer, prompt, max_tokens, context,
+                                       provider, cancel)
+                       for _ in range(self.samples)]
+
+        votes: Counter = Counter()
+        first_sample: Dict[str, Dict[str, Any]] = {}
+        completed = []
+        errors = []
+        winner = None
+        pending = set(futures)
+        try:
+            while pending and winner is None:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    if future.cancelled():
+                        continue
+                    if future.exception() is not None:
+                        errors.append(future.exception())
+                        continue
+                    sample = future.result()
+                    if sample.get("cancelled"):
+                        continue
+                    completed.append(sample)
+                    key = normalize_answer(sample["answer"] if sample["answer"] is not None else sample["text"])
+                    votes[key] += 1
+                    first_sample.setdefault(key, sample)
+                    if votes[key] >= self.votes_needed and winner is None:
+                        winner = key
+
+            never_started = sum(future.cancel() for future in pending)
+        finally:
+            # Also stops the running samples if the vote itself failed
+            cancel.set()
+            if executor is not None:
+                executor.shutdown(wait=True)
+
+        if not completed:
+            raise errors[0]
+
+        # Stopped samples still count the tokens they produced before stopping
+        partial_tokens = sum(self.model.count_tokens(future.result()["text"]) for future in futures
+                             if not future.cancelled() and future.exception() is None
+                             and future.result().get("cancelled"))
+        output_tokens = sum(self.model.count_tokens(sample["text"]) for sample in completed)
+        average = output_tokens / len(completed)
+        stopped = self.samples - len(completed) - len(errors)
+
+        if winner is None:
+            winner = votes.most_common(1)[0][0]
+        chosen = dict(first_sample[winner])
+        response = chosen.pop("text")
+        chosen.pop("cancelled", None)
+        chosen.pop("llm_response")
+        return {
+            "final_answer": chosen,
+            "response": response,
+            "votes": dict(votes),
+            "agreement": votes[winner] / len(completed),
+            "stats": {
+                "samples_requested": self.samples,
+                "samples_completed": len(completed),
+                "samples_stopped": stopped,
+                "samples_failed": len(errors),
+                "stopped_early": stopped > 0,
+                "calls_saved": never_started,
+                "output_tokens": output_tokens + partial_tokens,
+                "output_tokens_saved": max(0, int(average * stopped) - partial_tokens),
+                "temperature": self.temperature,
+            },
+        }
@@ -7,6 +7,7 @@ the new modular prompt optimization system.
 
 from .optimizer import *
 from .semantic_optimizer import SemanticOptimizer
+from .deduplication import Deduplicator
 from .token_optimizer import *
 from .prompt_optimizers import (
     PromptOptimizerRegistry,
@@ -19,11 +20,13 @@ from .prompt_optimizers import (
     ChainOfThoughtOptimizer,
     UncertaintyOptimizer,
     ChainOfVerificationOptimizer,
+    DeduplicationOptimizer,
     NoneOptimizer
 )
 
 __all__ = [
     'SemanticOptimizer',
+    'Deduplicator',
     'PromptOptimizerRegistry',
     'get_optimizer_registry',
     'optimize_prompt',
@@ -34,5 +37,6 @@ __all__ = [
     'ChainOfThoughtOptimizer',
     'UncertaintyOptimizer',
     'ChainOfVerificationOptimizer',
+    'DeduplicationOptimizer',
     'NoneOptimizer'
 ]
\ No newline at end of file
@@ -0,0 +1,197 @@
+"""
+Exact and near-duplicate detection for long prompts and contexts.
+
+Text is split into paragraphs or sentences. Exact duplicates are found through
+a normalized-text lookup. Near duplicates are found with one-permutation
+MinHash signatures over word shingles, bucketed by LSH bands so that only units
+sharing a band are compared. Both signatures and lookups are linear in the
+size of the text.
+"""
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from ..utils.token_counter import count_tokens
+
+
+_SEPARATORS = {
+    "paragraph": re.compile(r"(\n[ \t]*\n\s*)"),
+    "sentence": re.compile(r"(?<=[.!?])(\s+)"),
+}
+
+_WORD_RE = re.compile(r"\w+")
+
+_HASH_MASK = (1 << 64) - 1
+_NUM_BINS = 64
+_BIN_BITS = 6
+_EMPTY = _HASH_MASK
+_ROWS_PER_BAND = 4
+
+# Candidates compared per band bucket, bounds the work on repetitive text
+_MAX_BUCKET_CANDIDATES = 32
+
+
+def _minhash(words: List[str], shingle_size: int) -> List[int]:
+    """Compute a one-permutation MinHash signature over word shingles."""
+    if len(words) <= shingle_size:
+        shingles = [tuple(words)]
+    else:
+        shingles = [tuple(words[i:i + shingle_size])
+                    for i in range(len(words) - shingle_size + 1)]
+
+    # Python's hash is stable within a process, which is all a single prompt needs
+    signature = [_EMPTY] * _NUM_BINS
+    for shingle in shingles:
+        h = hash(shingle) & _HASH_MASK
+        index = h & (_NUM_BINS - 1)
+        value = h >> _BIN_BITS
+        if value < signature[index]:
+            signature[index] = value
+
+    # Densify: empty bins borrow from the next non-empty bin
+    for index in range(_NUM_BINS):
+        if signature[index] == _EMPTY:
+            for offset in range(1, _NUM_BINS):
+                value = signature[(index + offset) % _NUM_BINS]
+                if value != _EMPTY:
+                    signature[index] = value + offset
+                    break
+    return signature
+
+
+def _band_keys(signature: List[int]) -> List[Tuple[int, ...]]:
+    """Split a signature into LSH band keys."""
+    return [(start,) + tuple(signature[start:start + _ROWS_PER_BAND])
+            for start in range(0, _NUM_BINS, _ROWS_PER_BAND)]
+
+
+def _similarity(a: List[int], b: List[int]) -> float:
+    """Estimate the Jaccard similarity of two signatures."""
+    return sum(1 for x, y in zip(a, b) if x == y) / _NUM_BINS
+
+
+class Deduplicator:
+    """Removes exact and near-duplicate paragraphs or sentences, keeping order."""
+
+    def __init__(self, granularity: str = "paragraph", threshold: float = 0.8,
+                 min_length: int = 40, shingle_size: int = 3):
+        """Initialize deduplicator.
+
+        Args:
+            granularity: "paragraph" or "sentence"
+            threshold: Estimated Jaccard similarity above which a unit is a near
+                duplicate; 1.0 only removes exact duplicates
+            min_length: Units shorter than this many characters are always kept
+            shingle_size: Number of words per shingle
+        """
+        if granularity not in _SEPARATORS:
+            raise ValueError(f"Invalid granularity: {granularity}. Choose from: {', '.join(_SEPARATORS)}")
+        if not 0.0 < threshold <= 1.0:
+            raise ValueError("threshold must be in (0, 1]")
+
+        self.granularity = granularity
+        self.threshold = threshold
+        self.min_length = min_length
+        self.shingle_size = shingle_size
+
+    def split(self, text: str) -> List[Tuple[str, str]]:
+        """Split text into (unit, following separator) pairs."""
+        parts = _SEPARATORS[self.granularity].split(text)
+        # re.split with one capture group alternates unit, separator, unit, ...
+        parts.append("")
+        return [(parts[i], parts[i + 1]) for i in range(0, len(parts) - 1, 2)]
+
+    def find_duplicates(self, units: List[str], seen: Optional[Dict[str, Any]] = None) -> List[str]:
+        """Classify units as "unique", "exact" or "near" duplicates.
+
+        Args:
+            units: Units of text in order
+            seen: Optional state shared between calls, so duplicates are also
+                detected across several pieces of the same prompt
+
+        Returns:
+            One classification per unit
+        """
+        if seen is None:
+            seen = {}
+        exact = seen.setdefault("exact", set())
+        buckets = seen.setdefault("buckets", {})
+
+        result = []
+        for unit in units:
+            if len(unit.strip()) < self.min_length:
+                result.append("unique")
+                continue
+
+            words = _WORD_RE.findall(unit.lower())
+            normalized = " ".join(words)
+            if normalized in exact:
+                result.append("exact")
+                continue
+            exact.add(normalized)
+
+            if self.threshold >= 1.0:
+                result.append("unique")
+                continue
+
+            signature = _minhash(words, self.shingle_size)
+            keys = _band_keys(signature)
+
+            is_near = False
+            for key in keys:
+                for candidate in buckets.get(key, ()):
+                    if _similarity(signature, candidate) >= self.threshold:
+                        is_near = True
+                        break
+                if is_near:
+                    break
+
+            if is_near:
+                result.append("near")
+                continue
+
+            for key in keys:
+                bucket = buckets.setdefault(key, [])
+                if len(bucket) < _MAX_BUCKET_CANDIDATES:
+                    bucket.append(signature)
+            result.append("unique")
+
+        return result
+
+    def deduplicate(self, text: str, seen: Optional[Dict[str, Any]] = None) -> Tuple[str, Dict[str, Any]]:
+        """Remove duplicate units from text.
+
+        Args:
+            text: Text to deduplicate
+            seen: Optional state shared between calls (see ``find_duplicates``)
+
+        Returns:
+            Tuple of (deduplicated text, statistics)
+        """
+        pieces = self.split(text)
+        labels = self.find_duplicates([unit for unit, _ in pieces], seen)
+
+        kept = []
+        removed = []
+        for (unit, separator), label in zip(pieces, labels):
+            if label == "unique":
+                kept.append(unit)
+                kept.append(separator)
+            else:
+                removed.append((unit, label))
+
+        if removed and kept and labels[-1] != "unique":
+            # The trailing unit was dropped, don't leave its predecessor's separator dangling
+            kept[-1] = pieces[-1][1]
+
+        removed_text = "".join(unit for unit, _ in removed)
+        stats = {
+            "units": len(pieces),
+            "exact_duplicates": sum(1 for _, label in removed if label == "exact"),
+            "near_duplicates": sum(1 for _, label in removed if label == "near"),
+            "removed_chars": len(removed_text),
+            "tokens_saved": count_tokens(removed_text)
+        }
+
+        if not removed:
+            return text, stats
+        return "".join(kept), stats
@@ -1,7 +1,7 @@
 """
 Modular prompt optimization system integrating with ScaleDown framework.
 """
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 from abc import ABC, abstractmethod
 
 from ..tools.prompts import (
@@ -10,6 +10,11 @@ from ..tools.prompts import (
     UNCERTAINTY_PROMPT,
     COVE_PROMPT
 )
+from ..templates.prompt_document import PromptDocument, CONTENT_KINDS
+from ..utils.metrics import OPTIMIZER_OVERHEAD_TOKENS
+from ..utils.token_counter import count_tokens
+from ..utils.tracing import span
+from .deduplication import Deduplicator
 
 
 class BasePromptOptimizer(ABC):
@@ -24,6 +29,18 @@ class BasePromptOptimizer(ABC):
         """Apply optimization to the prompt."""
         pass
 
+    def apply_to_document(self, document: PromptDocument) -> PromptDocument:
+        """Apply optimization to a PromptDocument in place.
+
+        The default joins the document and rewrites it as one segment;
+        optimizers that only add text override this to avoid the copy.
+        """
+        text = document.render()
+        optimized = self.apply(text)
+        if optimized != text:
+            document.replace_all(optimized)
+        return document
+
     def get_info(self) -> Dict[str, str]:
         """Get optimizer information."""
         return {
@@ -44,6 +61,9 @@ class ExpertPersonaOptimizer(BasePromptOptimizer):
     def apply(self, prompt: str) -> str:
         return f"{EXPERT_PERSONA_PROMPT}\n\n{prompt}"
 
+    def apply_to_document(self, document: PromptDocument) -> PromptDocument:
+        return document.prepend("system", EXPERT_PERSONA_PROMPT, separator="\n\n")
+
 
 class ChainOfThoughtOptimizer(BasePromptOptimizer):
     """Chain-of-thought optimization - adds step-by-step reasoning."""
@@ -57,6 +77,9 @@ class ChainOfThoughtOptimizer(BasePromptOptimizer):
     def apply(self, prompt: str) -> str:
         return f"{prompt}\n\n{COT_PROMPT}"
 
+    def apply_to_document(self, document: PromptDocument) -> PromptDocument:
+        return document.append("instruction", COT_PROMPT, separator="\n\n")
+
 
 class UncertaintyOptimizer(BasePromptOptimizer):
     """Uncertainty quantification - adds confidence assessment."""
@@ -70,6 +93,9 @@ class UncertaintyOptimizer(BasePromptOptimizer):
     def apply(self, prompt: str) -> str:
         return f"{prompt}\n\n{UNCERTAINTY_PROMPT}"
 
+    def apply_to_document(self, document: PromptDocument) -> PromptDocument:
+        return document.append("instruction", UNCERTAINTY_PROMPT, separator="\n\n")
+
 
 class ChainOfVerificationOptimizer(BasePromptOptimizer):
     """Chain-of-verification optimization - adds verification process."""
@@ -83,6 +109,51 @@ class ChainOfVerificationOptimizer(BasePromptOptimizer):
     def apply(self, prompt: str) -> str:
         return f"{prompt}\n\n{COVE_PROMPT}"
 
+    def apply_to_document(self, document: PromptDocument) -> PromptDocument:
+        return document.append("instruction", COVE_PROMPT, separator="\n\n")
+
+
+class DeduplicationOptimizer(BasePromptOptimizer):
+    """Deduplication - removes exact and near-duplicate passages from long contexts."""
+
+    def __init__(self, granularity: str = "paragraph", threshold: float = 0.8):
+        super().__init__(
+            name="dedup",
+            description="Removes duplicate and near-duplicate paragraphs to save input tokens"
+        )
+        self.deduplicator = Deduplicator(granularity=granularity, threshold=threshold)
+
+    def apply(self, prompt: str) -> str:
+        deduplicated, _ = self.deduplicator.deduplicate(prompt)
+        return deduplicated
+
+    def apply_to_document(self, document: PromptDocument) -> PromptDocument:
+        return self.deduplicate_document(document)[0]
+
+    def deduplicate_document(self, document: PromptDocument) -> Tuple[PromptDocument, Dict[str, Any]]:
+        """Deduplicate a PromptDocument in place.
+
+        Returns:
+            Tuple of (the same document, statistics summed over its segments)
+        """
+        # Share duplicate state across segments so repeats in different values are found
+        seen = {}
+        totals = dict.fromkeys(("units", "exact_duplicates", "near_duplicates", "removed_chars",
+                                "tokens_saved"), 0)
+
+        def deduplicate(text: str) -> str:
+            deduplicated, stats = self.deduplicator.deduplicate(text, seen)
+            for key, value in stats.items():
+                totals[key] += value
+            return deduplicated
+
+        return document.map_segments(deduplicate, CONTENT_KINDS), totals
+
+    def analyze(self, prompt: str) -> Dict[str, Any]:
+        """Get deduplication statistics for a prompt without applying it."""
+        _, stats = self.deduplicator.deduplicate(prompt)
+        return stats
+
 
 class NoneOptimizer(BasePromptOptimizer):
     """No optimization - baseline prompt."""
@@ -96,6 +167,9 @@ class NoneOptimizer(BasePromptOptimizer):
     def apply(self, prompt: str) -> str:
         return prompt
 
+    def apply_to_document(self, document: PromptDocument) -> PromptDocument:
+        return document
+
 
 class PromptOptimizerRegistry:
     """Registry for managing prompt optimizers."""
@@ -106,6 +180,7 @@ class PromptOptimizerRegistry:
             "cot": ChainOfThoughtOptimizer(),
             "uncertainty": UncertaintyOptimizer(),
             "cove": ChainOfVerificationOptimizer(),
+            "dedup": DeduplicationOptimizer(),
             "none": NoneOptimizer()
         }
 
@@ -137,45 +212,86 @@ class PromptOptimizerRegistry:
 
         return optimizers
 
-    def apply_optimizers(self, prompt: str, optimizer_names: List[str]) -> str:
-        """Apply multiple optimizers in sequence to a prompt."""
+    def apply_optimizers(self, prompt: str, optimizer_names: List[str],
+                         stats: Optional[Dict[str, Any]] = None) -> str:
+        """Apply multiple optimizers in sequence to a prompt.
+
+        If stats is given, statistics of the passes are stored in it (see
+        apply_optimizers_to_document).
+        """
         if not optimizer_names:
             return prompt
 
-        result = prompt
-        applied_optimizers = []
+        document = self.apply_optimizers_to_document(PromptDocument.from_text(prompt), optimizer_names, stats)
+        return document.render()
+
+    def apply_optimizers_to_document(self, document: PromptDocument, optimizer_names: List[str],
+                                     stats: Optional[Dict[str, Any]] = None) -> PromptDocument:
+        """Apply multiple optimizers in sequence to a PromptDocument in place.
+
+        If stats is given, the deduplication statistics are stored in it under
+        "dedup", for get_optimization_report.
+        """
+        if not optimizer_names:
+            return document
+
+        # Deduplicate the prompt itself before any instructions are added
+        if "dedup" in optimizer_names:
+            with span("scaledown.optimizer", optimizer="dedup"):
+                document, dedup_stats = self.get_optimizer("dedup").deduplicate_document(document)
+            if stats is not None:
+                stats["dedup"] = dedup_stats
 
         # Handle expert_persona specially (always goes first)
         if "expert_persona" in optimizer_names:
-            expert_optimizer = self.get_optimizer("expert_persona")
-            result = expert_optimizer.apply(result)
-            applied_optimizers.append("expert_persona")
+            with span("scaledown.optimizer", optimizer="expert_persona"):
+                document = self.get_optimizer("expert_persona").apply_to_document(document)
 
         # Apply other optimizers in the order specified
         for optimizer_name in optimizer_names:
-            if optimizer_name in ["expert_persona", "none"]:
+            if optimizer_name in ["expert_persona", "dedup", "none"]:
                 continue
 
             optimizer = self.get_optimizer(optimizer_name)
             if optimizer:
-                result = optimizer.apply(result)
-                applied_optimizers.append(optimizer_name)
+                with span("scaledown.optimizer", optimizer=optimizer_name):
+                    document = optimizer.apply_to_document(document)
 
-        return result
+        return document
 
     def get_optimization_report(self, original_prompt: str, optimized_prompt: str,
-                              optimizer_names: List[str]) -> Dict[str, Any]:
-        """Generate a report about the optimization process."""
-        return {
+                              optimizer_names: List[str],
+                              stats: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Generate a report about the optimization process.
+
+        stats holds the statistics collected while the optimizers were applied;
+        those missing from it are computed again from original_prompt.
+        """
+        original_tokens = count_tokens(original_prompt)
+        optimized_tokens = count_tokens(optimized_prompt)
+        OPTIMIZER_OVERHEAD_TOKENS.observe(optimized_tokens - original_tokens)
+
+        report = {
             "original_prompt": original_prompt,
             "optimized_prompt": optimized_prompt,
             "optimizers_applied": optimizer_names,
             "original_length": len(original_prompt),
             "optimized_length": len(optimized_prompt),
             "length_change": len(optimized_prompt) - len(original_prompt),
+            "original_tokens": original_tokens,
+            "optimized_tokens": optimized_tokens,
+            "token_change": optimized_tokens - original_tokens,
             "optimization_count": len([opt for opt in optimizer_names if opt != "none"])
         }
 
+        if "dedup" in optimizer_names:
+            dedup_stats = (stats or {}).get("dedup")
+            if dedup_stats is None:
+                dedup_stats = self.get_optimizer("dedup").analyze(original_prompt)
+            report["dedup"] = dedup_stats
+
+        return report
+
 
 # Global registry instance
 _global_registry = None
@@ -216,5 +332,6 @@ OPTIMIZER_PROMPTS = {
     "cot": COT_PROMPT,
     "uncertainty": UNCERTAINTY_PROMPT,
     "cove": COVE_PROMPT,
+    "dedup": "",
     "none": ""
 }
\ No newline at end of file
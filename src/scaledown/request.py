@@ -0,0 +1,93 @@
+"""
+Immutable description of one prompt request for the stateless ScaleDown API.
+
+A PromptRequest carries everything needed to build a prompt and call a model,
+so ScaleDown.build() and ScaleDown.execute() never read or write instance
+state and one ScaleDown can serve many threads or async tasks at once.
+"""
+from types import MappingProxyType
+from typing import Any, Dict, Iterable, Mapping, Optional, Union
+
+from .templates import Template
+from .styles import Style
+
+
+class PromptRequest:
+    """A read-only prompt request."""
+
+    __slots__ = ("template", "values", "style", "optimizers", "question",
+                 "model", "temperature", "max_tokens", "context", "priority", "tenant")
+
+    def __init__(self, template: Union[str, Template, None] = None,
+                 values: Optional[Mapping[str, Any]] = None,
+                 style: Union[str, Style, None] = None,
+                 optimizers: Optional[Iterable[str]] = None,
+                 question: str = "",
+                 model: Any = None,
+                 temperature: float = 0.0,
+                 max_tokens: Optional[int] = None,
+                 context: str = "",
+                 priority: Optional[str] = None,
+                 tenant: Optional[str] = None):
+        """Initialize prompt request.
+
+        Args:
+            template: Template ID or Template; if None, question is the prompt
+            values: Values for the template placeholders
+            style: Optional style ID or Style
+            optimizers: Optional optimizer names applied to the prompt
+            question: Prompt text used when no template is given
+            model: Model name or a configured model instance (for execute)
+            temperature: Temperature for models created from a name
+            max_tokens: Maximum tokens for the response; if None, the model's
+                learned output budget is used
+            context: Optional shared context sent next to the prompt
+            priority: Scheduler priority class of the model call (see models.scheduler)
+            tenant: Tenant the model call is accounted to by the scheduler
+        """
+        if template is None and not question:
+            raise ValueError("A request needs a template or a question")
+
+        set_field = object.__setattr__
+        set_field(self, "template", template)
+        set_field(self, "values", MappingProxyType(dict(values or {})))
+        set_field(self, "style", style)
+        set_field(self, "optimizers", tuple(optimizers or ()))
+        set_field(self, "question", question)
+        set_field(self, "model", model)
+        set_field(self, "temperature", temperature)
+        set_field(self, "max_tokens", max_tokens)
+        set_field(self, "context", context)
+        set_field(self, "priority", priority)
+        set_field(self, "tenant", tenant)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("PromptRequest is immutable; use replace() to derive a new request")
+
+    def __delattr__(self, name):
+        raise AttributeError("PromptRequest is immutable; use replace() to derive a new request")
+
+    def replace(self, **changes) -> 'PromptRequest':
+        """Return a copy of this request with some fields changed."""
+        fields = {name: getattr(self, name) for name in self.__slots__}
+        fields.update(changes)
+        return PromptRequest(**fields)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert request to dictionary."""
+        return {
+            "template": getattr(self.template, "id", self.template),
+            "values": dict(self.values),
+            "style": getattr(self.style, "id", self.style),
+            "optimizers": list(self.optimizers),
+            "question": self.question,
+            "model": getattr(self.model, "model_name", self.model),
+            "temperature": self.temperature,
+            "max_tokens": self.max_tokens,
+            "context": self.context,
+            "priority": self.priority,
+            "tenant": self.tenant,
+        }
+
+    def __repr__(self):
+        return f"PromptRequest({self.to_dict()!r})"
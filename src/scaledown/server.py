@@ -0,0 +1,391 @@
+"""
+Embedded asyncio HTTP server exposing the stateless ScaleDown API.
+
+Endpoints (JSON in, JSON out):
+
+* ``POST /render`` - build a prompt from a template, values, style and optimizers
+* ``POST /optimize`` - run optimizers over a prompt and report the token change
+* ``POST /count-tokens`` - count the tokens in a text
+* ``POST /optimize-and-call`` - build, optimize and send a prompt to a model
+* ``GET /metrics`` - request, status, queue and latency counters
+* ``GET /metrics/prometheus`` - library metrics in the Prometheus text format
+* ``GET /healthz`` - liveness check
+
+Work is handed to a fixed pool of threads through a bounded queue. When the
+queue is full the server answers 503 with Retry-After instead of buffering
+without limit. Provider rate limits are answered with 429 and provider
+timeouts with 504. On shutdown it stops accepting connections, closes idle
+keep-alive connections, finishes the queued work and then exits.
+"""
+import asyncio
+import json
+import math
+import signal
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from typing import Any, Callable, Dict, Optional, Tuple, Union
+
+from .api import ScaleDown
+from .request import PromptRequest
+from .tools.llms import ProviderTimeoutError, RateLimitError
+from .utils.metrics import get_metrics_registry
+from .utils.token_counter import count_tokens
+
+
+_REQUEST_FIELDS = ("template", "values", "style", "optimizers", "question",
+                   "model", "temperature", "max_tokens", "context", "priority", "tenant")
+
+
+class HTTPError(Exception):
+    """An error answered with a specific HTTP status."""
+
+    def __init__(self, status: int, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+
+def _prompt_request(payload: Dict[str, Any]) -> PromptRequest:
+    """Build a PromptRequest from a JSON payload."""
+    unknown = set(payload) - set(_REQUEST_FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+    return PromptRequest(**payload)
+
+
+class ScaleDownServer:
+    """Asyncio HTTP server with bounded queueing and graceful shutdown."""
+
+    def __init__(self, scaledown: Optional[ScaleDown] = None, host: str = "127.0.0.1",
+                 port: int = 8080, workers: int = 8, queue_size: int = 64,
+                 max_body_size: int = 1024 * 1024, shutdown_timeout: float = 30.0):
+        """Initialize server.
+
+        Args:
+            scaledown: ScaleDown instance serving the requests (a new one if None)
+            host: Interface to bind
+            port: Port to bind (0 picks a free port)
+            workers: Threads rendering prompts and calling models
+            queue_size: Requests allowed to wait for a worker before 503s
+            max_body_size: Largest accepted request body, in bytes
+            shutdown_timeout: Seconds to wait for queued work and open connections on shutdown
+        """
+        if workers <= 0 or queue_size <= 0:
+            raise ValueError("workers and queue_size must be positive")
+
+        self.scaledown = scaledown or ScaleDown()
+        self.host = host
+        self.port = port
+        self.workers = workers
+        self.queue_size = queue_size
+        self.max_body_size = max_body_size
+        self.shutdown_timeout = shutdown_timeout
+
+        self.routes: Dict[Tuple[str, str], Callable[[Dict[str, Any]], Dict[str, Any]]] = {
+            ("POST", "/render"): self.handle_render,
+            ("POST", "/optimize"): self.handle_optimize,
+            ("POST", "/count-tokens"): self.handle_count_tokens,
+            ("POST", "/optimize-and-call"): self.handle_optimize_and_call,
+        }
+
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker_tasks = []
+        # Open connections, mapped to whether a request is being handled on them
+        self._connections: Dict[asyncio.StreamWriter, bool] = {}
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._stopping: Optional[asyncio.Event] = None
+        self._draining = False
+        self._started = time.monotonic()
+        self._in_flight = 0
+        self._requests: Dict[str, int] = {}
+        self._responses: Dict[int, int] = {}
+        self._latency: Dict[str, Dict[str, float]] = {}
+        self._rejected = 0
+
+    # Handlers run on worker threads and must not touch server state
+
+    def handle_render(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        request = _prompt_request(payload)
+        prompt = self.scaledown.build(request)
+        return {"prompt": prompt, "tokens": count_tokens(prompt)}
+
+    def handle_optimize(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        from .optimization.prompt_optimizers import get_optimizer_registry
+
+        prompt = payload.get("prompt")
+        if not isinstance(prompt, str):
+            raise ValueError("'prompt' must be a string")
+        optimizers = list(payload.get("optimizers") or [])
+        registry = get_optimizer_registry()
+        stats = {}
+        optimized = registry.apply_optimizers(prompt, optimizers, stats)
+        return registry.get_optimization_report(prompt, optimized, optimizers, stats)
+
+    def handle_count_tokens(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        text = payload.get("text")
+        if not isinstance(text, str):
+            raise ValueError("'text' must be a string")
+        encoding = payload.get("encoding", "approx")
+        return {"tokens": count_tokens(text, encoding), "encoding": encoding}
+
+    def handle_optimize_and_call(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        request = _prompt_request(payload)
+        result = self.scaledown.execute(request)
+        result.pop("optimization_metrics", None)
+        return result
+
+    # Metrics
+
+    def _endpoint(self, path: str) -> str:
+        """Metrics label of a request: its route, or "unknown" so clients can't add labels."""
+        if path in ("/healthz", "/metrics", "/metrics/prometheus"):
+            return path
+        if any(route_path == path for _, route_path in self.routes):
+            return path
+        return "unknown"
+
+    def _record(self, endpoint: str, status: int, seconds: float) -> None:
+        self._requests[endpoint] = self._requests.get(endpoint, 0) + 1
+        self._responses[status] = self._responses.get(status, 0) + 1
+        latency = self._latency.setdefault(endpoint, {"count": 0, "total": 0.0, "max": 0.0})
+        latency["count"] += 1
+        latency["total"] += seconds
+        latency["max"] = max(latency["max"], seconds)
+
+    def metrics(self) -> Dict[str, Any]:
+        """Snapshot of the server's counters."""
+        metrics = {
+            "uptime_seconds": time.monotonic() - self._started,
+            "in_flight": self._in_flight,
+            "queue_depth": self._queue.qsize() if self._queue else 0,
+            "queue_size": self.queue_size,
+            "workers": self.workers,
+            "rejected": self._rejected,
+            "requests": dict(self._requests),
+            "responses": {str(status): count for status, count in self._responses.items()},
+            "latency": {
+                endpoint: {
+                    "count": int(values["count"]),
+                    "mean_ms": values["total"] / values["count"] * 1000 if values["count"] else 0.0,
+                    "max_ms": values["max"] * 1000,
+                }
+                for endpoint, values in self._latency.items()
+            },
+            "prompt_cache": self.scaledown.prompt_cache_stats(),
+            "library": get_metrics_registry().snapshot(),
+        }
+        if self.scaledown.scheduler is not None:
+            metrics["scheduler"] = self.scaledown.scheduler.stats()
+        return metrics
+
+    # Request handling
+
+    async def _worker(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            handler, payload, future = await self._queue.get()
+            try:
+                if not future.cancelled():
+                    result = await loop.run_in_executor(self._executor, handler, payload)
+                    if not future.cancelled():
+                        future.set_result(result)
+            except Exception as e:
+                if not future.cancelled():
+                    future.set_exception(e)
+            finally:
+                self._queue.task_done()
+
+    async def _dispatch(self, method: str, path: str, body: bytes) -> Tuple[int, Union[Dict[str, Any], str]]:
+        """Route a request and return (status, JSON body or plain text)."""
+        if path == "/healthz":
+            return HTTPStatus.OK, {"status": "draining" if self._draining else "ok"}
+        if path == "/metrics" and method == "GET":
+            return HTTPStatus.OK, self.metrics()
+        if path == "/metrics/prometheus" and method == "GET":
+            return HTTPStatus.OK, get_metrics_registry().render_prometheus()
+
+        handler = self.routes.get((method, path))
+        if handler is None:
+            if any(route_path == path for _, route_path in self.routes):
+                raise HTTPError(HTTPStatus.METHOD_NOT_ALLOWED, f"{method} not allowed on {path}")
+            raise HTTPError(HTTPStatus.NOT_FOUND, f"Not found: {path}")
+
+        try:
+            payload = json.loads(body or b"{}")
+        except (ValueError, UnicodeDecodeError):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Request body must be JSON")
+        if not isinstance(payload, dict):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Request body must be a JSON object")
+
+        if self._draining:
+            raise HTTPError(HTTPStatus.SERVICE_UNAVAILABLE, "Server is shutting down")
+
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self._queue.put_nowait((handler, payload, future))
+        except asyncio.QueueFull:
+            self._rejected += 1
+            raise HTTPError(HTTPStatus.SERVICE_UNAVAILABLE, "Server is busy, retry later")
+
+        try:
+            return HTTPStatus.OK, await future
+        except ValueError as e:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, str(e))
+        except RateLimitError as e:
+            raise HTTPError(HTTPStatus.TOO_MANY_REQUESTS, str(e), e.retry_after or 1)
+        except ProviderTimeoutError as e:
+            raise HTTPError(HTTPStatus.GATEWAY_TIMEOUT, str(e))
+        except RuntimeError as e:
+            raise HTTPError(HTTPStatus.BAD_GATEWAY, str(e))
+
+    async def _read_request(self, reader: asyncio.StreamReader) -> Optional[Tuple[str, str, Dict[str, str], bytes]]:
+        """Read one HTTP request, or return None at end of stream."""
+        request_line = await reader.readline()
+        if not request_line:
+            return None
+
+        try:
+            method, target, _ = request_line.decode("latin-1").split()
+        except ValueError:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Malformed request line")
+
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        try:
+            length = int(headers.get("content-length", 0))
+        except ValueError:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Invalid Content-Length")
+        if length > self.max_body_size:
+            raise HTTPError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "Request body too large")
+
+        body = await reader.readexactly(length) if length else b""
+        return method.upper(), target.split("?", 1)[0], headers, body
+
+    @staticmethod
+    def _write_response(writer: asyncio.StreamWriter, status: int, body: Union[Dict[str, Any], str],
+                        keep_alive: bool, retry_after: Optional[float] = None) -> None:
+        if isinstance(body, str):
+            data = body.encode("utf-8")
+            content_type = "text/plain; version=0.0.4; charset=utf-8"
+        else:
+            data = json.dumps(body, ensure_ascii=False, default=str).encode("utf-8")
+            content_type = "application/json"
+        headers = [
+            f"HTTP/1.1 {status} {HTTPStatus(status).phrase}",
+            f"Content-Type: {content_type}",
+            f"Content-Length: {len(data)}",
+            f"Connection: {'keep-alive' if keep_alive else 'close'}",
+        ]
+        if status == HTTPStatus.SERVICE_UNAVAILABLE and retry_after is None:
+            retry_after = 1
+        if retry_after is not None:
+            headers.append(f"Retry-After: {math.ceil(retry_after)}")
+        writer.write(("\r\n".join(headers) + "\r\n\r\n").encode("latin-1") + data)
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self._connections[writer] = False
+        try:
+            while not self._draining:
+                try:
+                    request = await self._read_request(reader)
+                except HTTPError as e:
+                    self._write_response(writer, e.status, {"error": str(e)}, keep_alive=False)
+                    await writer.drain()
+                    break
+                if request is None:
+                    break
+
+                method, path, headers, body = request
+                self._connections[writer] = True
+                start = time.perf_counter()
+                self._in_flight += 1
+                retry_after = None
+                try:
+                    status, response = await self._dispatch(method, path, body)
+                except HTTPError as e:
+                    status, response, retry_after = e.status, {"error": str(e)}, e.retry_after
+                except Exception as e:
+                    status, response = HTTPStatus.INTERNAL_SERVER_ERROR, {"error": str(e)}
+                finally:
+                    self._in_flight -= 1
+                self._record(self._endpoint(path), int(status), time.perf_counter() - start)
+
+                # Shutdown may have started while the request was handled
+                keep_alive = headers.get("connection", "").lower() != "close" and not self._draining
+                self._write_response(writer, status, response, keep_alive, retry_after)
+                await writer.drain()
+                self._connections[writer] = False
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self._connections.pop(writer, None)
+            writer.close()
+
+    # Lifecycle
+
+    async def start(self) -> None:
+        """Start listening and start the worker pool."""
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._stopping = asyncio.Event()
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="scaledown-server")
+        self._worker_tasks = [asyncio.ensure_future(self._worker()) for _ in range(self.workers)]
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._started = time.monotonic()
+
+    async def shutdown(self) -> None:
+        """Stop accepting connections, finish queued work and stop the workers."""
+        if self._server is None:
+            return
+
+        self._draining = True
+        deadline = time.monotonic() + self.shutdown_timeout
+        self._server.close()
+        # Idle keep-alive connections would otherwise wait for their next request
+        for writer, busy in list(self._connections.items()):
+            if not busy:
+                writer.close()
+        try:
+            await asyncio.wait_for(self._queue.join(), self.shutdown_timeout)
+        except asyncio.TimeoutError:
+            pass
+
+        # Connections still answering get the rest of the timeout, then are dropped
+        try:
+            await asyncio.wait_for(self._server.wait_closed(), max(0.0, deadline - time.monotonic()))
+        except asyncio.TimeoutError:
+            for writer in list(self._connections):
+                writer.transport.abort()
+
+        for task in self._worker_tasks:
+            task.cancel()
+        await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+        self._executor.shutdown(wait=False)
+        self._server = None
+        self._stopping.set()
+
+    async def serve_forever(self) -> None:
+        """Start the server and run until SIGINT/SIGTERM, then shut down gracefully."""
+        await self.start()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, lambda: asyncio.ensure_future(self.shutdown()))
+            except (NotImplementedError, RuntimeError):
+                # Signal handlers are unavailable on some platforms and off the main thread
+                pass
+        await self._stopping.wait()
+
+    def run(self) -> None:
+        """Run the server in a new event loop until it is stopped."""
+        asyncio.run(self.serve_forever())
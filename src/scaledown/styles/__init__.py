@@ -1,39 +1,67 @@
 from .style import Style
-from .style_manager import StyleManager
+from .style_manager import StyleManager, style_from_dict
 from .default_styles import DEFAULT_STYLES, EXPERT_DOMAINS, EXPERT_ROLES
 from .optimization_style import (
     OptimizationStyle,
     create_default_optimization_styles,
+    get_default_optimization_styles,
     get_optimization_style_by_optimizers
 )
 
+_default_base = None
+_enhanced_base = None
+
 def get_default_style_manager() -> StyleManager:
-    """Get a style manager pre-loaded with default styles."""
-    manager = StyleManager()
-    manager.load_default_styles()
-    return manager
+    """Get a style manager pre-loaded with default styles.
+    
+    The defaults are built once per process and shared; the returned manager
+    is an overlay that stores only its own styles.
+    """
+    global _default_base
+    if _default_base is None:
+        manager = StyleManager()
+        manager.load_default_styles()
+        _default_base = manager.freeze()
+    return StyleManager(base=_default_base)
 
 def get_enhanced_style_manager() -> StyleManager:
     """Get a style manager with both default and optimization styles."""
-    manager = StyleManager()
-    manager.load_default_styles()
+    global _enhanced_base
+    if _enhanced_base is None:
+        manager = StyleManager()
+        manager.load_default_styles()
+
+        # Add optimization styles
+        for style in get_default_optimization_styles():
+            manager.add_style(style)
 
-    # Add optimization styles
-    optimization_styles = create_default_optimization_styles()
-    for style in optimization_styles:
-        manager.add_style(style)
+        _enhanced_base = manager.freeze()
+    return StyleManager(base=_enhanced_base)
 
+def load_style_catalog(path: str) -> StyleManager:
+    """Get a style manager backed by an on-disk catalog.
+    
+    Args:
+        path: Packed catalog file or directory of <id>.json files
+    """
+    from ..utils.catalog import open_catalog
+    
+    manager = StyleManager()
+    manager.attach_catalog(open_catalog(path))
     return manager
 
 __all__ = [
     'Style',
     'StyleManager',
+    'style_from_dict',
     'DEFAULT_STYLES',
     'EXPERT_DOMAINS',
     'EXPERT_ROLES',
     'OptimizationStyle',
     'create_default_optimization_styles',
+    'get_default_optimization_styles',
     'get_optimization_style_by_optimizers',
     'get_default_style_manager',
-    'get_enhanced_style_manager'
+    'get_enhanced_style_manager',
+    'load_style_catalog'
 ]
\ No newline at end of file
@@ -1,8 +1,9 @@
 """
 Optimization styles that integrate with the modular prompt optimization pipeline.
 """
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, FrozenSet, Optional, Tuple
 from .style import Style
+from ..utils.cache import LRUCache
 
 
 class OptimizationStyle(Style):
@@ -17,13 +18,14 @@ class OptimizationStyle(Style):
             id: Unique identifier for the style
             name: Display name
             description: Description of the optimization
-            optimizers: List of optimizer names to apply
+            optimizers: Optimizer names to apply, stored as a tuple so shared
+                styles cannot be changed in place
             icon: Icon for the style
             template_modifier: Additional template modifier
             system_prompt: System prompt if needed
         """
         super().__init__(id, name, description, icon, template_modifier, system_prompt)
-        self.optimizers = optimizers
+        self.optimizers = tuple(optimizers)
 
     def apply_to_prompt(self, prompt_text: str) -> str:
         """Apply optimization to the prompt."""
@@ -41,26 +43,40 @@ class OptimizationStyle(Style):
 
         return result
 
+    def apply_to_document(self, document):
+        """Apply the modifier and optimization pipeline to a PromptDocument in place."""
+        document = super().apply_to_document(document)
+
+        try:
+            from ..optimization.prompt_optimizers import get_optimizer_registry
+            registry = get_optimizer_registry()
+            document = registry.apply_optimizers_to_document(document, self.optimizers)
+        except ImportError:
+            # Fallback if optimization pipeline not available
+            pass
+
+        return document
+
     def get_optimization_info(self) -> Dict[str, Any]:
         """Get information about the optimizations applied."""
         try:
             from ..optimization.prompt_optimizers import get_optimizer_registry
             registry = get_optimizer_registry()
             return {
-                "optimizers": self.optimizers,
+                "optimizers": list(self.optimizers),
                 "optimizer_details": [
                     registry.get_optimizer_info(opt) for opt in self.optimizers
                     if registry.get_optimizer_info(opt)
                 ]
             }
         except ImportError:
-            return {"optimizers": self.optimizers}
+            return {"optimizers": list(self.optimizers)}
 
     def to_dict(self) -> Dict[str, Any]:
         """Convert to dictionary with optimization info."""
         base_dict = super().to_dict()
         base_dict.update({
-            "optimizers": self.optimizers,
+            "optimizers": list(self.optimizers),
             "style_type": "optimization"
         })
         return base_dict
@@ -141,22 +157,50 @@ def create_default_optimization_styles() -> List[OptimizationStyle]:
     ]
 
 
+# Built once, on first use
+_default_styles: Optional[Tuple[OptimizationStyle, ...]] = None
+_styles_by_optimizers: Dict[FrozenSet[str], OptimizationStyle] = {}
+
+# Custom styles are interned, so repeated lookups return the same object
+_custom_styles = LRUCache(maxsize=256, name="optimization_styles")
+
+
+def get_default_optimization_styles() -> Tuple[OptimizationStyle, ...]:
+    """Get the shared catalog of default optimization styles.
+
+    Unlike create_default_optimization_styles, the styles are built once per
+    process and shared; treat them as read-only.
+    """
+    global _default_styles
+    if _default_styles is None:
+        styles = tuple(create_default_optimization_styles())
+        for style in styles:
+            _styles_by_optimizers.setdefault(frozenset(style.optimizers), style)
+        _default_styles = styles
+    return _default_styles
+
+
 def get_optimization_style_by_optimizers(optimizers: List[str]) -> Optional[OptimizationStyle]:
     """Get an optimization style that matches the given optimizers."""
-    default_styles = create_default_optimization_styles()
+    get_default_optimization_styles()
 
-    for style in default_styles:
-        if set(style.optimizers) == set(optimizers):
-            return style
+    style = _styles_by_optimizers.get(frozenset(optimizers))
+    if style is not None:
+        return style
 
     # Create a custom style if no match found
     if optimizers and optimizers != ["none"]:
-        return OptimizationStyle(
-            id="custom_" + "_".join(optimizers),
-            name=f"Custom: {', '.join(optimizers)}",
-            description=f"Custom optimization with: {', '.join(optimizers)}",
-            optimizers=optimizers,
-            icon="🔧"
-        )
-
-    return None
\ No newline at end of file
+        key = tuple(optimizers)
+        style = _custom_styles.get(key)
+        if style is None:
+            style = OptimizationStyle(
+                id="custom_" + "_".join(optimizers),
+                name=f"Custom: {', '.join(optimizers)}",
+                description=f"Custom optimization with: {', '.join(optimizers)}",
+                optimizers=key,
+                icon="🔧"
+            )
+            _custom_styles.put(key, style)
+        return style
+
+    return None
@@ -16,6 +16,12 @@ class Style:
             return f"{self.template_modifier}{prompt_text}"
         return prompt_text
     
+    def apply_to_document(self, document):
+        """Apply this style to a PromptDocument in place."""
+        if self.template_modifier:
+            document.prepend("instruction", self.template_modifier)
+        return document
+    
     def to_dict(self):
         """Convert style to dictionary."""
         return {
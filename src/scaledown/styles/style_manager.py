@@ -1,29 +1,178 @@
+import threading
 from typing import Dict, List, Optional
 
 from .style import Style
+from .optimization_style import OptimizationStyle
 from .default_styles import DEFAULT_STYLES, create_expert_style, EXPERT_DOMAINS, EXPERT_ROLES
 
+def style_from_dict(data: Dict) -> Style:
+    """Create a Style, or an OptimizationStyle when the data lists optimizers."""
+    if "optimizers" in data:
+        return OptimizationStyle.from_dict(data)
+    return Style.from_dict(data)
+
 class StyleManager:
-    """Manager for style operations."""
+    """Manager for style operations.
+    
+    A manager can overlay a frozen base manager: self.styles then holds only
+    the overlay's own styles (such as create_expert_style results) and other
+    lookups fall through to the base.
+    """
     
-    def __init__(self):
-        """Initialize style manager."""
+    def __init__(self, base: Optional['StyleManager'] = None):
+        """Initialize style manager.
+        
+        Args:
+            base: Optional frozen manager to overlay
+        """
+        if base is not None and not base.frozen:
+            raise ValueError("The base style manager must be frozen")
+        
         self.styles: Dict[str, Style] = {}
+        self.catalog = None
+        self.frozen = False
+        self._base = base
+        self._fully_loaded = True
+        self._catalog_ids = set()
+        # Reentrant: add_style looks styles up while holding it
+        self._write_lock = threading.RLock()
+    
+    def freeze(self) -> 'StyleManager':
+        """Make this manager read-only so it can be shared as a base."""
+        self.frozen = True
+        return self
+    
+    def _check_writable(self) -> None:
+        if self.frozen:
+            raise RuntimeError("Style manager is frozen; create an overlay with StyleManager(base=...)")
+    
+    def _in_base(self, style_id: str) -> bool:
+        return self._base is not None and self._base.get_style(style_id) is not None
+    
+    def attach_catalog(self, catalog) -> None:
+        """Back this manager with an on-disk catalog.
+        
+        Styles already in the manager take precedence; catalog styles are
+        decoded lazily, on first access.
+        
+        Args:
+            catalog: A catalog from utils.catalog.open_catalog
+        """
+        self._check_writable()
+        self.catalog = catalog
+        self._fully_loaded = False
+    
+    def close(self) -> None:
+        """Close the backing catalog; styles not decoded by then are no longer available."""
+        with self._write_lock:
+            if self.catalog is not None:
+                self.catalog.close()
+            self._fully_loaded = True
+    
+    def reload_catalog(self, catalog) -> None:
+        """Swap in a new version of the backing catalog.
+        
+        All catalog styles are decoded into a new dictionary while readers
+        keep using the current one, then swapped in. Styles added directly on
+        this manager carry over. The previous catalog is closed.
+        
+        Args:
+            catalog: A catalog from utils.catalog.open_catalog
+        """
+        self._check_writable()
+        styles: Dict[str, Style] = {}
+        try:
+            for record in catalog.iter_records():
+                style = style_from_dict(record)
+                if not self._in_base(style.id):
+                    styles[style.id] = style
+        except BaseException:
+            catalog.close()
+            raise
+        catalog_ids = set(styles)
+        
+        with self._write_lock:
+            for style_id, style in self.styles.items():
+                if style_id not in self._catalog_ids:
+                    styles[style_id] = style
+                    catalog_ids.discard(style_id)
+            
+            # Point lookups that race with the swap decode from the new catalog
+            previous = self.catalog
+            self.catalog = catalog
+            self.styles = styles
+            self._catalog_ids = catalog_ids
+            self._fully_loaded = True
+        if previous is not None and previous is not catalog:
+            previous.close()
+    
+    def watch_catalog(self, path: str, interval: float = 1.0):
+        """Back this manager with a catalog and reload it whenever it changes.
+        
+        Args:
+            path: Packed catalog file or directory of <id>.json files
+            interval: Seconds between checks for changes
+        
+        Returns:
+            The started CatalogWatcher; call stop() on it to stop watching
+        """
+        from ..utils.catalog import open_catalog
+        from ..utils.catalog_watcher import CatalogWatcher
+        
+        self.reload_catalog(open_catalog(path))
+        return CatalogWatcher(path, self.reload_catalog, interval).start()
+    
+    def ensure_loaded(self) -> None:
+        """Decode every catalog style not loaded yet."""
+        if self._fully_loaded:
+            return
+        
+        with self._write_lock:
+            if self._fully_loaded:
+                return
+            for record in self.catalog.iter_records():
+                if record.get("id") not in self.styles and not self._in_base(record.get("id")):
+                    style = style_from_dict(record)
+                    self.styles[style.id] = style
+                    self._catalog_ids.add(style.id)
+            self._fully_loaded = True
     
     def add_style(self, style: Style) -> None:
         """Add a style to the manager."""
-        if style.id in self.styles:
-            raise ValueError(f"Style with ID '{style.id}' already exists")
+        self._check_writable()
         
-        self.styles[style.id] = style
+        with self._write_lock:
+            if self.get_style(style.id) is not None:
+                raise ValueError(f"Style with ID '{style.id}' already exists")
+            
+            self.styles[style.id] = style
     
     def get_style(self, style_id: str) -> Optional[Style]:
-        """Get a style by ID."""
-        return self.styles.get(style_id)
+        """Get a style by ID, decoding it from the catalog on first access."""
+        style = self.styles.get(style_id)
+        if style is None and self._base is not None:
+            style = self._base.get_style(style_id)
+        if style is None and not self._fully_loaded:
+            with self._write_lock:
+                # Another thread may have decoded it in the meantime
+                style = self.styles.get(style_id)
+                if style is None and not self._fully_loaded:
+                    record = self.catalog.get_record(style_id)
+                    if record is not None:
+                        style = style_from_dict(record)
+                        self.styles[style.id] = style
+                        self._catalog_ids.add(style.id)
+        return style
     
     def list_styles(self) -> List[Style]:
         """List all available styles."""
-        return list(self.styles.values())
+        self.ensure_loaded()
+        if self._base is None:
+            return list(self.styles.values())
+        
+        styles = {style.id: style for style in self._base.list_styles()}
+        styles.update(self.styles)
+        return list(styles.values())
     
     def load_default_styles(self) -> None:
         """Load the default styles."""
@@ -1,9 +1,38 @@
 from .template import Template
 from .template_manager import TemplateManager
+from .prompt_document import PromptDocument, Segment
 from .default_templates import DEFAULT_TEMPLATES
 
+_base_manager = None
+
+def get_base_manager() -> TemplateManager:
+    """Get the shared, frozen manager holding the default templates."""
+    global _base_manager
+    if _base_manager is None:
+        manager = TemplateManager()
+        manager.load_default_templates()
+        _base_manager = manager.freeze()
+    return _base_manager
+
 def get_default_manager() -> TemplateManager:
-    """Get a template manager pre-loaded with default templates."""
+    """Get a template manager pre-loaded with default templates.
+    
+    The defaults are built once per process and shared; the returned manager
+    is an overlay that stores only its own changes.
+    """
+    return TemplateManager(base=get_base_manager())
+
+def load_template_catalog(path: str) -> TemplateManager:
+    """Get a template manager backed by an on-disk catalog.
+    
+    Only the catalog's index is read up front; templates are decoded on first
+    access, so startup does not grow with the catalog.
+    
+    Args:
+        path: Packed catalog file or directory of <id>.json files
+    """
+    from ..utils.catalog import open_catalog
+    
     manager = TemplateManager()
-    manager.load_default_templates()
+    manager.attach_catalog(open_catalog(path))
     return manager
\ No newline at end of file
@@ -0,0 +1,109 @@
+"""
+Segment-based prompt representation used inside the prompt pipeline.
+
+Rendering, styles and optimizers add or rewrite individual segments instead of
+copying the whole prompt at every stage. The final string is joined once, at
+the provider boundary.
+"""
+from typing import Callable, Iterable, List, Optional
+
+from ..utils.token_counter import count_tokens
+
+
+SEGMENT_KINDS = ("system", "instruction", "template", "value", "question", "context")
+
+# Segments holding user content, as opposed to text added by the pipeline
+CONTENT_KINDS = ("template", "value", "question", "context")
+
+
+class Segment:
+    """An immutable piece of a prompt with a lazily cached token count."""
+
+    __slots__ = ("kind", "text", "_token_count")
+
+    def __init__(self, kind: str, text: str):
+        if kind not in SEGMENT_KINDS:
+            raise ValueError(f"Invalid segment kind: {kind}. Choose from: {', '.join(SEGMENT_KINDS)}")
+
+        self.kind = kind
+        self.text = text
+        self._token_count = None
+
+    @property
+    def token_count(self) -> int:
+        """Number of tokens in this segment (counted once)."""
+        if self._token_count is None:
+            self._token_count = count_tokens(self.text)
+        return self._token_count
+
+    def __repr__(self):
+        return f"Segment({self.kind!r}, {self.text[:40]!r})"
+
+
+class PromptDocument:
+    """A prompt made of typed segments."""
+
+    def __init__(self, segments: Optional[Iterable[Segment]] = None):
+        """Initialize prompt document.
+
+        Args:
+            segments: Initial segments, in order
+        """
+        self.segments: List[Segment] = list(segments) if segments else []
+        self._rendered: Optional[str] = None
+
+    @classmethod
+    def from_text(cls, text: str, kind: str = "question") -> 'PromptDocument':
+        """Create a document holding a single segment."""
+        return cls([Segment(kind, text)])
+
+    def prepend(self, kind: str, text: str, separator: str = "") -> 'PromptDocument':
+        """Insert a segment at the start, followed by separator."""
+        self.segments.insert(0, Segment(kind, f"{text}{separator}"))
+        self._rendered = None
+        return self
+
+    def append(self, kind: str, text: str, separator: str = "") -> 'PromptDocument':
+        """Add a segment at the end, preceded by separator."""
+        self.segments.append(Segment(kind, f"{separator}{text}"))
+        self._rendered = None
+        return self
+
+    def replace_all(self, text: str, kind: str = "question") -> 'PromptDocument':
+        """Replace the whole document with a single segment."""
+        self.segments = [Segment(kind, text)]
+        self._rendered = text
+        return self
+
+    def map_segments(self, func: Callable[[str], str],
+                     kinds: Iterable[str] = CONTENT_KINDS) -> 'PromptDocument':
+        """Rewrite the text of every segment of the given kinds.
+
+        Segments whose text is unchanged are kept as-is, along with their
+        cached token counts.
+        """
+        kinds = set(kinds)
+        for index, segment in enumerate(self.segments):
+            if segment.kind not in kinds:
+                continue
+            text = func(segment.text)
+            if text != segment.text:
+                self.segments[index] = Segment(segment.kind, text)
+                self._rendered = None
+        return self
+
+    def token_count(self) -> int:
+        """Total number of tokens, summed from per-segment counts."""
+        return sum(segment.token_count for segment in self.segments)
+
+    def render(self) -> str:
+        """Join the segments into the final prompt string."""
+        if self._rendered is None:
+            self._rendered = "".join(segment.text for segment in self.segments)
+        return self._rendered
+
+    def __str__(self):
+        return self.render()
+
+    def __len__(self):
+        return sum(len(segment.text) for segment in self.segments)
@@ -1,5 +1,8 @@
+import hashlib
 import re
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Iterable, Iterator
+
+from .prompt_document import PromptDocument, Segment
 
 class Template:
     """Base class for all prompt templates."""
@@ -12,26 +15,81 @@ class Template:
         self.subcategory = subcategory
         self.metadata = metadata or {}
         self.placeholders = self._extract_placeholders()
+        self._compile()
     
     def _extract_placeholders(self) -> List[str]:
         """Extract all placeholders from the template text."""
         return re.findall(r'\[(.*?)\]', self.template_text)
     
-    def render(self, **kwargs):
-        """Render the template with provided values."""
-        filled_template = self.template_text
+    def _compile(self) -> None:
+        """Compile the template text into literal and slot parts.
+        
+        re.split alternates literal text (even indices) and placeholder names
+        (odd indices). The parts are also compiled into a positional format
+        string, so rendering is a single pass over the template in C.
+        Compiling also records a short content hash as the template's version.
+        """
+        self.version = hashlib.blake2b(self.template_text.encode("utf-8"), digest_size=8).hexdigest()
+        self._parts = re.split(r'\[(.*?)\]', self.template_text)
+        self._slot_index: Dict[str, List[int]] = {}
+        for position in range(1, len(self._parts), 2):
+            self._slot_index.setdefault(self._parts[position], []).append(position)
         
-        # Check for missing required placeholders
-        missing = [p for p in self.placeholders if p not in kwargs]
+        slot_numbers = {name: number for number, name in enumerate(self._slot_index)}
+        self._format = "".join(
+            "{%d}" % slot_numbers[part] if index % 2 else part.replace("{", "{{").replace("}", "}}")
+            for index, part in enumerate(self._parts)
+        )
+        self._slot_names = tuple(self._slot_index)
+    
+    def _check_values(self, values: Dict[str, Any]) -> None:
+        """Raise if any placeholder has no value."""
+        missing = [p for p in self._slot_index if p not in values]
         if missing:
             raise ValueError(f"Missing required placeholders: {', '.join(missing)}")
+    
+    def _fill(self, values: Dict[str, Any]) -> str:
+        """Fill every slot in one pass; values are never re-scanned for placeholders."""
+        try:
+            filled = [str(values[name]) for name in self._slot_names]
+        except KeyError:
+            self._check_values(values)
+            raise
+        return self._format.format(*filled)
+    
+    def render(self, **kwargs):
+        """Render the template with provided values."""
+        return self._fill(kwargs)
+    
+    def render_many(self, rows: Iterable[Dict[str, Any]]) -> Iterator[str]:
+        """Render the template for each dictionary of values.
+        
+        Args:
+            rows: List or iterator of value dictionaries
+            
+        Returns:
+            Iterator of rendered prompts, produced lazily in input order
+        """
+        fill = self._fill
+        for row in rows:
+            yield fill(row)
+    
+    def render_document(self, **kwargs) -> PromptDocument:
+        """Render the template into a segmented prompt document.
+        
+        Literal template text becomes "template" segments and each filled
+        placeholder a "value" segment, so later stages never copy the values.
+        """
+        self._check_values(kwargs)
         
-        # Replace placeholders with values
-        for placeholder, value in kwargs.items():
-            if placeholder in self.placeholders:
-                filled_template = filled_template.replace(f"[{placeholder}]", str(value))
+        segments = []
+        for index, part in enumerate(self._parts):
+            if index % 2:
+                segments.append(Segment("value", str(kwargs[part])))
+            elif part:
+                segments.append(Segment("template", part))
         
-        return filled_template
+        return PromptDocument(segments)
     
     def to_dict(self):
         """Convert template to dictionary representation."""
@@ -0,0 +1,364 @@
+"""
+Secondary and full-text indexes over a template collection.
+"""
+import heapq
+import math
+import re
+import threading
+from collections import Counter
+from itertools import islice
+from typing import Collection, Dict, Iterator, List, Optional, Tuple
+
+from .template import Template
+
+
+_TERM_RE = re.compile(r"\w+")
+
+# BM25 parameters
+_K1 = 1.2
+_B = 0.75
+
+# Title terms count this many times as much as template text terms
+_TITLE_WEIGHT = 2
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Split text into lowercase search terms."""
+    return _TERM_RE.findall(text.lower()) if text else []
+
+
+class TemplateIndex:
+    """Templates keyed by id, with category, subcategory and full-text indexes.
+
+    The category and subcategory indexes map each value to an insertion-ordered
+    set of template ids (a dict with None values), so filtered listings keep
+    the order templates were added in. The full-text index is built on the
+    first search and maintained incrementally from then on.
+
+    An index can be backed by an on-disk catalog (see utils.catalog): point
+    lookups decode single records on first access, unfiltered counts and
+    pages decode only what they return, and anything else that needs the
+    whole collection loads the rest of the catalog once. Decoding from the
+    catalog is locked, since readers on several threads may trigger it.
+
+    Templates are listed in catalog order, followed by the templates added
+    directly, whether or not the catalog has been loaded yet.
+    """
+
+    def __init__(self, catalog=None):
+        """Initialize an index.
+
+        Args:
+            catalog: Optional PackedCatalog or DirectoryCatalog of template records
+        """
+        self.catalog = catalog
+        self._fully_loaded = catalog is None
+        self._removed = set()
+        self._lock = threading.RLock()
+        self._clear()
+
+    def _clear(self) -> None:
+        """Drop all templates and index entries (but not the removed catalog ids)."""
+        self._from_catalog = set()
+        self.templates: Dict[str, Template] = {}
+        self._by_category: Dict[str, Dict[str, None]] = {}
+        self._by_subcategory: Dict[str, Dict[str, None]] = {}
+        self._subcategory_counts: Dict[str, Dict[str, int]] = {}
+        self._postings: Optional[Dict[str, Dict[str, int]]] = None
+        self._doc_lengths: Dict[str, int] = {}
+        self._total_length = 0
+
+    def __len__(self) -> int:
+        self.ensure_loaded()
+        return len(self.templates)
+
+    def __contains__(self, template_id: str) -> bool:
+        return self.get(template_id) is not None
+
+    def get(self, template_id: str) -> Optional[Template]:
+        """Get a template by ID, decoding it from the catalog on first access."""
+        template = self.templates.get(template_id)
+        if template is None and not self._fully_loaded and template_id not in self._removed:
+            with self._lock:
+                # Another thread may have decoded it in the meantime
+                template = self.templates.get(template_id)
+                if template is None and not self._fully_loaded and template_id not in self._removed:
+                    record = self.catalog.get_record(template_id)
+                    if record is not None:
+                        template = Template.from_dict(record)
+                        self.add(template)
+                        self._from_catalog.add(template_id)
+        return template
+
+    def ensure_loaded(self) -> None:
+        """Decode every catalog record not loaded yet."""
+        if self._fully_loaded:
+            return
+
+        with self._lock:
+            if self._fully_loaded:
+                return
+            local = self.local_templates()
+            decoded = {template_id: self.templates[template_id] for template_id in self._from_catalog}
+            loaded = []
+            for record in self.catalog.iter_records():
+                template_id = record.get("id")
+                if template_id in decoded:
+                    loaded.append(decoded[template_id])
+                elif template_id not in self.templates and template_id not in self._removed:
+                    loaded.append(Template.from_dict(record))
+
+            # Rebuild in listing order, whatever order records were first decoded in
+            text_index = self._postings is not None
+            self._clear()
+            for template in loaded:
+                self.add(template)
+                self._from_catalog.add(template.id)
+            for template in local:
+                self.add(template)
+            if text_index:
+                self.build_text_index()
+            self._fully_loaded = True
+
+    def close(self) -> None:
+        """Close the backing catalog; templates not decoded by then are no longer available."""
+        with self._lock:
+            if self.catalog is not None:
+                self.catalog.close()
+            self._fully_loaded = True
+
+    def _catalog_skips(self, exclude: Collection[str] = ()) -> List[int]:
+        """Sorted catalog positions of records that are removed, replaced or excluded."""
+        positions = set()
+        for template_id in {*self._removed, *exclude,
+                            *(template.id for template in self.local_templates())}:
+            position = self.catalog.record_position(template_id)
+            if position is not None:
+                positions.add(position)
+        return sorted(positions)
+
+    def page(self, offset: int = 0, limit: Optional[int] = None,
+             exclude: Collection[str] = ()) -> List[Template]:
+        """A page of all templates in listing order, decoding only the catalog records on it.
+
+        Args:
+            offset: Number of templates to skip
+            limit: Maximum number of templates to return
+            exclude: Ids to leave out of the listing
+
+        Returns:
+            List of templates
+        """
+        stop = offset + limit if limit is not None else None
+        if self._fully_loaded:
+            return list(islice((template for template_id, template in self.templates.items()
+                                if template_id not in exclude), offset, stop))
+
+        with self._lock:
+            if self._fully_loaded:
+                return self.page(offset, limit, exclude)
+
+            # Catalog position of the first template on the page
+            skips = self._catalog_skips(exclude)
+            position = offset
+            for skipped in skips:
+                if skipped > position:
+                    break
+                position += 1
+
+            positions = []
+            skipped = set(skips)
+            while position < len(self.catalog) and (limit is None or len(positions) < limit):
+                if position not in skipped:
+                    positions.append(position)
+                position += 1
+
+            page = []
+            for record in self.catalog.records_at(positions):
+                template = self.templates.get(record.get("id"))
+                if template is None:
+                    template = Template.from_dict(record)
+                    self.add(template)
+                    self._from_catalog.add(template.id)
+                page.append(template)
+
+            # Templates added directly come after the catalog
+            if limit is None or len(page) < limit:
+                catalog_count = len(self.catalog) - len(skips)
+                local = [template for template in self.local_templates() if template.id not in exclude]
+                local_stop = stop - catalog_count if stop is not None else None
+                page += local[max(0, offset - catalog_count):local_stop]
+            return page
+
+    def local_templates(self) -> List[Template]:
+        """Templates added directly rather than decoded from the catalog."""
+        return [template for template_id, template in self.templates.items()
+                if template_id not in self._from_catalog]
+
+    def removed_ids(self) -> List[str]:
+        """Ids of catalog templates that were removed."""
+        return list(self._removed)
+
+    def build_text_index(self) -> None:
+        """Build the full-text index now rather than on the first search."""
+        if self._postings is None:
+            self._postings = {}
+            for template in self.templates.values():
+                self._index_text(template)
+
+    def add(self, template: Template) -> None:
+        """Add (or replace) a template and index it."""
+        if template.id in self.templates:
+            self.remove(template.id)
+
+        self.templates[template.id] = template
+        self._by_category.setdefault(template.category, {})[template.id] = None
+        if template.subcategory:
+            self._by_subcategory.setdefault(template.subcategory, {})[template.id] = None
+            counts = self._subcategory_counts.setdefault(template.category, {})
+            counts[template.subcategory] = counts.get(template.subcategory, 0) + 1
+
+        if self._postings is not None:
+            self._index_text(template)
+
+    def _index_text(self, template: Template) -> None:
+        """Add a template to the full-text index."""
+        frequencies = self._term_frequencies(template)
+        for term, frequency in frequencies.items():
+            self._postings.setdefault(term, {})[template.id] = frequency
+        length = sum(frequencies.values())
+        self._doc_lengths[template.id] = length
+        self._total_length += length
+
+    def remove(self, template_id: str) -> Optional[Template]:
+        """Remove a template and its index entries."""
+        template = self.get(template_id)
+        if template is None:
+            return None
+        del self.templates[template_id]
+        if template_id in self._from_catalog:
+            # Don't decode it again from the catalog
+            self._from_catalog.discard(template_id)
+            self._removed.add(template_id)
+
+        self._discard(self._by_category, template.category, template_id)
+        if template.subcategory:
+            self._discard(self._by_subcategory, template.subcategory, template_id)
+            counts = self._subcategory_counts[template.category]
+            counts[template.subcategory] -= 1
+            if not counts[template.subcategory]:
+                del counts[template.subcategory]
+            if not counts:
+                del self._subcategory_counts[template.category]
+
+        if self._postings is not None:
+            for term in self._term_frequencies(template):
+                self._discard(self._postings, term, template_id)
+            self._total_length -= self._doc_lengths.pop(template_id)
+
+        return template
+
+    @staticmethod
+    def _discard(index: Dict[str, Dict[str, int]], key: str, template_id: str) -> None:
+        """Remove an id from an index entry, dropping the entry when empty."""
+        entry = index.get(key)
+        if entry is not None:
+            entry.pop(template_id, None)
+            if not entry:
+                del index[key]
+
+    @staticmethod
+    def _term_frequencies(template: Template) -> Dict[str, int]:
+        """Count the weighted search terms of a template."""
+        frequencies = Counter(tokenize(template.template_text))
+        for term in tokenize(template.title):
+            frequencies[term] += _TITLE_WEIGHT
+        return frequencies
+
+    def iter_ids(self, category: Optional[str] = None,
+                 subcategory: Optional[str] = None) -> Iterator[str]:
+        """Iterate template ids in insertion order, optionally filtered.
+
+        An empty category or subcategory does not filter.
+        """
+        self.ensure_loaded()
+        if not category and not subcategory:
+            return iter(self.templates)
+
+        by_category = self._by_category.get(category, {}) if category else None
+        by_subcategory = self._by_subcategory.get(subcategory, {}) if subcategory else None
+
+        if by_subcategory is None:
+            return iter(by_category)
+        if by_category is None:
+            return iter(by_subcategory)
+
+        # Walk the smaller set and probe the larger one
+        smaller, larger = sorted((by_category, by_subcategory), key=len)
+        return (template_id for template_id in smaller if template_id in larger)
+
+    def count(self, category: Optional[str] = None, subcategory: Optional[str] = None) -> int:
+        """Count templates, optionally filtered (an empty filter does not filter)."""
+        category, subcategory = category or None, subcategory or None
+        if category is None and subcategory is None and not self._fully_loaded:
+            with self._lock:
+                if not self._fully_loaded:
+                    return len(self.catalog) - len(self._catalog_skips()) + len(self.local_templates())
+        self.ensure_loaded()
+        if subcategory is None:
+            return len(self._by_category.get(category, {})) if category is not None else len(self.templates)
+        if category is None:
+            return len(self._by_subcategory.get(subcategory, {}))
+        return self._subcategory_counts.get(category, {}).get(subcategory, 0)
+
+    def categories(self) -> List[str]:
+        """List all categories."""
+        self.ensure_loaded()
+        return list(self._by_category)
+
+    def subcategories(self, category: Optional[str] = None) -> List[str]:
+        """List subcategories, optionally only those within a category."""
+        self.ensure_loaded()
+        if category is not None:
+            return list(self._subcategory_counts.get(category, {}))
+        return list(self._by_subcategory)
+
+    def search(self, query: str, limit: int = 10, offset: int = 0,
+               category: Optional[str] = None) -> List[Tuple[float, Template]]:
+        """Rank templates against a free-text query with BM25.
+
+        Args:
+            query: Search terms, matched against titles and template text
+            limit: Maximum number of results
+            offset: Number of top results to skip (for pagination)
+            category: Optional category filter
+
+        Returns:
+            List of (score, template) pairs, best first
+        """
+        self.ensure_loaded()
+        terms = set(tokenize(query))
+        if not terms or not self.templates:
+            return []
+
+        self.build_text_index()
+
+        allowed = self._by_category.get(category, {}) if category else None
+        total = len(self.templates)
+        average_length = self._total_length / total if total else 0.0
+
+        scores: Dict[str, float] = {}
+        for term in terms:
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (total - len(postings) + 0.5) / (len(postings) + 0.5))
+            for template_id, frequency in postings.items():
+                if allowed is not None and template_id not in allowed:
+                    continue
+                length = self._doc_lengths[template_id]
+                norm = _K1 * (1 - _B + _B * length / average_length) if average_length else _K1
+                scores[template_id] = scores.get(template_id, 0.0) + idf * frequency * (_K1 + 1) / (frequency + norm)
+
+        best = heapq.nlargest(offset + limit, scores.items(), key=lambda item: item[1])
+        return [(score, self.templates[template_id]) for template_id, score in best[offset:]]
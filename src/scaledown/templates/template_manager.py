@@ -1,49 +1,246 @@
-from typing import Dict, List, Optional
+import heapq
+import threading
+from itertools import islice
+from types import MappingProxyType
+from typing import Iterator, List, Mapping, Optional
 from .template import Template
+from .template_index import TemplateIndex
 
 class TemplateManager:
-    """Manager for template operations."""
+    """Manager for template operations.
     
-    def __init__(self):
-        """Initialize template manager."""
-        self.templates: Dict[str, Template] = {}
+    A manager can overlay a frozen base manager. The overlay stores only its
+    own additions and removals and falls through to the base for everything
+    else, so per-request or per-tenant managers cost almost nothing to create.
+    """
+    
+    def __init__(self, base: Optional['TemplateManager'] = None):
+        """Initialize template manager.
+        
+        Args:
+            base: Optional frozen manager to overlay
+        """
+        if base is not None and not base.frozen:
+            raise ValueError("The base template manager must be frozen")
+        
+        self._base = base
+        self._hidden = set()
+        self._index = TemplateIndex()
+        self._write_lock = threading.Lock()
+        self.frozen = False
+    
+    def freeze(self) -> 'TemplateManager':
+        """Make this manager read-only so it can be shared as a base."""
+        self.frozen = True
+        return self
+    
+    def _check_writable(self) -> None:
+        if self.frozen:
+            raise RuntimeError("Template manager is frozen; create an overlay with TemplateManager(base=...)")
+    
+    def _base_get(self, template_id: str) -> Optional[Template]:
+        """Get a template from the base, unless this overlay removed it."""
+        if self._base is None or template_id in self._hidden:
+            return None
+        return self._base.get_template(template_id)
+    
+    def _shadowed_ids(self, index: TemplateIndex, category: Optional[str] = None,
+                      subcategory: Optional[str] = None) -> List[str]:
+        """Ids in an index that are hidden behind a base template with the same ID."""
+        if self._base is None:
+            return []
+        if not category and not subcategory:
+            # Probe the index for each base template rather than load the whole catalog
+            return [template.id for template in self._base.iter_templates()
+                    if template.id not in self._hidden and template.id in index]
+        return [template_id for template_id in index.iter_ids(category, subcategory)
+                if self._base_get(template_id) is not None]
+    
+    @property
+    def templates(self) -> Mapping[str, Template]:
+        """All templates keyed by ID, read-only; use add_template/remove_template to change them."""
+        self._index.ensure_loaded()
+        if self._base is None:
+            return MappingProxyType(self._index.templates)
+        return MappingProxyType({template.id: template for template in self.iter_templates()})
+    
+    def attach_catalog(self, catalog) -> None:
+        """Back this manager with an on-disk catalog.
+        
+        Templates already in the manager take precedence; catalog templates
+        are decoded lazily, on first access.
+        
+        Args:
+            catalog: A catalog from utils.catalog.open_catalog
+        """
+        self.reload_catalog(catalog, preload=False)
+    
+    def reload_catalog(self, catalog, preload: bool = True) -> None:
+        """Swap in a new version of the backing catalog.
+        
+        The new index (and, with preload, every compiled template) is built
+        off to the side while readers keep using the current one, then
+        swapped in with a single assignment. Templates added or removed
+        directly on this manager carry over. The previous catalog is closed.
+        
+        Args:
+            catalog: A catalog from utils.catalog.open_catalog
+            preload: Decode the whole catalog before swapping, so no request
+                pays for decoding after a reload
+        """
+        self._check_writable()
+        fresh = TemplateIndex(catalog)
+        try:
+            if preload:
+                fresh.ensure_loaded()
+                if self._index._postings is not None:
+                    fresh.build_text_index()
+        except BaseException:
+            fresh.close()
+            raise
+        
+        with self._write_lock:
+            current = self._index
+            for template_id in current.removed_ids():
+                fresh.remove(template_id)
+            for template in current.local_templates():
+                fresh.add(template)
+            self._index = fresh
+        if current.catalog is not catalog:
+            current.close()
+    
+    def watch_catalog(self, path: str, interval: float = 1.0, preload: bool = True):
+        """Back this manager with a catalog and reload it whenever it changes.
+        
+        Args:
+            path: Packed catalog file or directory of <id>.json files
+            interval: Seconds between checks for changes
+            preload: Decode the whole catalog on each reload (see reload_catalog)
+        
+        Returns:
+            The started CatalogWatcher; call stop() on it to stop watching
+        """
+        from ..utils.catalog import open_catalog
+        from ..utils.catalog_watcher import CatalogWatcher
+        
+        self._check_writable()
+        self.reload_catalog(open_catalog(path), preload=preload)
+        watcher = CatalogWatcher(path, lambda catalog: self.reload_catalog(catalog, preload), interval)
+        return watcher.start()
         
     def add_template(self, template: Template) -> None:
         """Add a template to the manager."""
-        if template.id in self.templates:
-            raise ValueError(f"Template with ID '{template.id}' already exists")
-        
-        self.templates[template.id] = template
+        self._check_writable()
+        with self._write_lock:
+            if self.get_template(template.id) is not None:
+                raise ValueError(f"Template with ID '{template.id}' already exists")
+            
+            self._index.add(template)
+    
+    def remove_template(self, template_id: str) -> Optional[Template]:
+        """Remove a template by ID, returning it if it existed."""
+        self._check_writable()
+        with self._write_lock:
+            template = self._base_get(template_id)
+            if template is not None:
+                self._hidden.add(template_id)
+                return template
+            return self._index.remove(template_id)
         
     def get_template(self, template_id: str) -> Optional[Template]:
         """Get a template by ID."""
-        return self.templates.get(template_id)
+        template = self._base_get(template_id)
+        if template is None:
+            template = self._index.get(template_id)
+        return template
+    
+    def iter_templates(self, category: Optional[str] = None,
+                       subcategory: Optional[str] = None) -> Iterator[Template]:
+        """Iterate templates lazily, optionally filtered by category/subcategory."""
+        if self._base is not None:
+            for template in self._base.iter_templates(category, subcategory):
+                if template.id not in self._hidden:
+                    yield template
+        
+        # Hold on to one index so a catalog reload mid-iteration is not observed
+        index = self._index
+        for template_id in index.iter_ids(category, subcategory):
+            if self._base_get(template_id) is None:
+                yield index.templates[template_id]
     
     def list_templates(self, category: Optional[str] = None, 
-                      subcategory: Optional[str] = None) -> List[Template]:
-        """List templates, optionally filtered by category/subcategory."""
-        results = list(self.templates.values())
+                      subcategory: Optional[str] = None,
+                      offset: int = 0, limit: Optional[int] = None) -> List[Template]:
+        """List templates, optionally filtered by category/subcategory and paginated.
         
-        if category:
-            results = [t for t in results if t.category == category]
-            
-        if subcategory:
-            results = [t for t in results if t.subcategory == subcategory]
-            
+        Unfiltered pages decode only the catalog templates on the page.
+        """
+        stop = offset + limit if limit is not None else None
+        if category or subcategory:
+            return list(islice(self.iter_templates(category, subcategory), offset, stop))
+        
+        index = self._index
+        page = []
+        base_count = 0
+        if self._base is not None:
+            base_templates = [template for template in self._base.list_templates()
+                              if template.id not in self._hidden]
+            base_count = len(base_templates)
+            page = base_templates[offset:stop]
+        if limit is None or len(page) < limit:
+            own_limit = limit - len(page) if limit is not None else None
+            page += index.page(max(0, offset - base_count), own_limit, set(self._shadowed_ids(index)))
+        return page
+    
+    def count_templates(self, category: Optional[str] = None,
+                        subcategory: Optional[str] = None) -> int:
+        """Count templates, optionally filtered by category/subcategory."""
+        index = self._index
+        count = index.count(category, subcategory)
+        if self._base is not None:
+            count -= len(self._shadowed_ids(index, category, subcategory))
+            count += self._base.count_templates(category, subcategory)
+            for template_id in self._hidden:
+                template = self._base.get_template(template_id)
+                if ((category is None or template.category == category)
+                        and (subcategory is None or template.subcategory == subcategory)):
+                    count -= 1
+        return count
+    
+    def _search(self, query: str, count: int, category: Optional[str]) -> List[tuple]:
+        """Top (score, template) pairs from this manager and its base."""
+        index = self._index
+        shadowed = set(self._shadowed_ids(index, category))
+        results = [(score, template) for score, template in index.search(query, count + len(shadowed), 0, category)
+                   if template.id not in shadowed]
+        if self._base is not None:
+            base_results = self._base._search(query, count + len(self._hidden), category)
+            results += [(score, template) for score, template in base_results
+                        if template.id not in self._hidden]
+            results = heapq.nlargest(count, results, key=lambda result: result[0])
         return results
     
+    def search_templates(self, query: str, limit: int = 10, offset: int = 0,
+                         category: Optional[str] = None) -> List[Template]:
+        """Search titles and template text, best matches first."""
+        return [template for _, template in self._search(query, offset + limit, category)[offset:]]
+    
     def list_categories(self) -> List[str]:
         """Get a list of all unique categories."""
-        return list(set(t.category for t in self.templates.values()))
+        if self._base is None:
+            return self._index.categories()
+        
+        return [category for category in dict.fromkeys(self._base.list_categories() + self._index.categories())
+                if self.count_templates(category)]
     
     def list_subcategories(self, category: Optional[str] = None) -> List[str]:
         """Get a list of all unique subcategories."""
-        templates = self.templates.values()
+        if self._base is None:
+            return self._index.subcategories(category)
         
-        if category:
-            templates = [t for t in templates if t.category == category]
-            
-        return list(set(t.subcategory for t in templates if t.subcategory))
+        subcategories = self._base.list_subcategories(category) + self._index.subcategories(category)
+        return [subcategory for subcategory in dict.fromkeys(subcategories)
+                if self.count_templates(category, subcategory)]
     
     def load_default_templates(self) -> None:
         """Load the default templates."""
@@ -0,0 +1,61 @@
+"""
+Local cache for contexts that have already been sent to the Scaledown API.
+
+RAG workloads pair the same large context with many different questions. The
+cache remembers, per context hash and compression rate, either the compressed
+context returned by the server or a server-side handle for it, so repeated
+contexts are not recompressed or reuploaded on every question.
+"""
+import hashlib
+from typing import Any, Dict, Optional
+
+from ..utils.cache import LRUCache
+
+
+class ContextCache:
+    """Cache of compressed contexts keyed by context hash and compression rate."""
+
+    def __init__(self, maxsize: int = 256):
+        """Initialize context cache.
+
+        Args:
+            maxsize: Maximum number of contexts remembered
+        """
+        self._cache = LRUCache(maxsize, name="context")
+
+    @staticmethod
+    def make_key(context: str, rate: float) -> tuple:
+        """Build the cache key for a context and compression rate."""
+        digest = hashlib.sha256(context.encode("utf-8")).hexdigest()
+        return (digest, float(rate))
+
+    def get(self, context: str, rate: float) -> Optional[Dict[str, Any]]:
+        """Get the cached entry for a context.
+
+        Returns:
+            Dictionary with a ``context_id`` and/or ``compressed_context``, or None
+        """
+        return self._cache.get(self.make_key(context, rate))
+
+    def put(self, context: str, rate: float, context_id: Optional[str] = None,
+            compressed_context: Optional[str] = None) -> None:
+        """Remember the server-side handle and/or compressed form of a context."""
+        if context_id is None and compressed_context is None:
+            return
+
+        self._cache.put(self.make_key(context, rate), {
+            "context_id": context_id,
+            "compressed_context": compressed_context
+        })
+
+    def invalidate(self, context: str, rate: float) -> None:
+        """Forget a cached context, e.g. after the server rejected its handle."""
+        self._cache.pop(self.make_key(context, rate))
+
+    def clear(self) -> None:
+        """Forget all cached contexts."""
+        self._cache.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Get cache statistics."""
+        return self._cache.stats()
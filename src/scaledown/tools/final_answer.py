@@ -0,0 +1,141 @@
+"""
+Incremental extraction of the delimited final answer from streamed output.
+
+The SimpleQA and Wikidata formats end every response with::
+
+    === FINAL ANSWER ===
+    ...
+    === END FINAL ANSWER ===
+
+FinalAnswerParser is fed chunks as they arrive and reports when the end
+delimiter has been seen, so the caller can cancel generation right away
+instead of paying for the rest of the completion.
+"""
+import re
+import string
+from typing import Any, Dict, Iterable, List, Optional
+
+from .prompts import FINAL_ANSWER_END, FINAL_ANSWER_START
+
+
+_LIST_ITEM = re.compile(r"^\s*\d+[.)]\s*(.+?)\s*$")
+_ARTICLES = re.compile(r"\b(a|an|the)\b")
+_PUNCTUATION = str.maketrans("", "", string.punctuation)
+
+
+def parse_answer_items(answer: str) -> List[str]:
+    """Split a final answer into its numbered items, or the whole answer if unnumbered."""
+    lines = [line for line in answer.splitlines() if line.strip()]
+    items = [match.group(1) for match in map(_LIST_ITEM.match, lines) if match]
+    if items:
+        return items
+    return [answer.strip()] if answer.strip() else []
+
+
+def normalize_answer(answer: str) -> str:
+    """Normalize an answer for comparison: case, punctuation, articles and spacing.
+    
+    Numbered lists are compared as sets of items.
+    """
+    def normalize(text: str) -> str:
+        text = _ARTICLES.sub(" ", text.lower().translate(_PUNCTUATION))
+        return " ".join(text.split())
+
+    items = parse_answer_items(answer)
+    if len(items) > 1:
+        return "\n".join(sorted({normalize(item) for item in items}))
+    return normalize(answer)
+
+
+class FinalAnswerParser:
+    """Streaming parser for a delimited final answer section."""
+
+    def __init__(self, start: str = FINAL_ANSWER_START, end: str = FINAL_ANSWER_END):
+        """Initialize parser.
+
+        Args:
+            start: Delimiter opening the final answer
+            end: Delimiter closing the final answer
+        """
+        self.start = start
+        self.end = end
+        self._text = ""
+        self._answer_start: Optional[int] = None
+        self._answer_end: Optional[int] = None
+        self._scanned = 0
+
+    @property
+    def complete(self) -> bool:
+        """Whether the end delimiter has been seen."""
+        return self._answer_end is not None
+
+    def feed(self, chunk: str) -> bool:
+        """Add a chunk of output; return True once the final answer is complete.
+
+        Text after the end delimiter is ignored.
+        """
+        if self.complete or not chunk:
+            return self.complete
+
+        self._text += chunk
+        if self._answer_start is None:
+            # Delimiters may be split across chunks, so rescan the overlap
+            index = self._text.find(self.start, max(0, self._scanned - len(self.start)))
+            if index < 0:
+                self._scanned = len(self._text)
+                return False
+            self._answer_start = index + len(self.start)
+            self._scanned = self._answer_start
+
+        index = self._text.find(self.end, max(self._answer_start, self._scanned - len(self.end)))
+        if index < 0:
+            self._scanned = len(self._text)
+            return False
+        self._answer_end = index
+        self._text = self._text[:index + len(self.end)]
+        return True
+
+    def feed_all(self, chunks: Iterable[str]) -> bool:
+        """Feed chunks until the final answer is complete; return whether it is."""
+        for chunk in chunks:
+            if self.feed(chunk):
+                return True
+        return self.complete
+
+    @property
+    def answer(self) -> Optional[str]:
+        """The final answer so far, or None before the start delimiter."""
+        if self._answer_start is None:
+            return None
+        end = self._answer_end if self._answer_end is not None else len(self._text)
+        return self._text[self._answer_start:end].strip()
+
+    def result(self, stopped: bool = False) -> Dict[str, Any]:
+        """Structured result.
+
+        Args:
+            stopped: The provider stopped at the end delimiter (a stop sequence),
+                so an open answer section is complete
+
+        Returns:
+            Dictionary with the answer, its items, whether it is complete, and
+            the output text (ending with the end delimiter when complete)
+        """
+        answer = self.answer
+        complete = self.complete or (stopped and answer is not None)
+        text = self._text
+        if complete and not self.complete:
+            text = text.rstrip() + "\n" + self.end
+        return {
+            "answer": answer,
+            "items": parse_answer_items(answer) if answer else [],
+            "complete": complete,
+            "text": text,
+        }
+
+
+def extract_final_answer(text: str) -> Dict[str, Any]:
+    """Parse the final answer section of a complete response."""
+    parser = FinalAnswerParser()
+    parser.feed(text)
+    return parser.result()
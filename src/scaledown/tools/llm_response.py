@@ -0,0 +1,105 @@
+"""
+Structured result of a provider call.
+
+LLM.generate() returns an LLMResponse carrying the text together with the
+token usage and compression statistics reported by the provider, the
+latency split into time spent waiting, connecting and generating, the
+number of retries and, when requested, the raw provider payload.
+LLM.call_llm() remains the plain-text shim returning only the text.
+"""
+from typing import Any, Dict, Mapping, Optional
+
+
+class LLMResponse:
+    """Text, usage and timing of one provider call."""
+
+    __slots__ = ("text", "model", "provider", "input_tokens", "output_tokens", "cached_tokens",
+                 "compression", "queue_time", "connect_time", "generation_time", "retries", "raw")
+
+    def __init__(self, text: str, model: str = "", provider: str = "",
+                 input_tokens: Optional[int] = None, output_tokens: Optional[int] = None,
+                 cached_tokens: Optional[int] = None, compression: Optional[Mapping[str, Any]] = None,
+                 queue_time: float = 0.0, connect_time: float = 0.0, generation_time: float = 0.0,
+                 retries: int = 0, raw: Any = None):
+        """Initialize response.
+
+        Args:
+            text: Response text
+            model: Model that produced the response
+            provider: Provider name, as in the model catalog
+            input_tokens: Prompt and context tokens billed (counted with the model's
+                tokenizer for streamed calls), or None if not reported
+            output_tokens: Response tokens billed (counted likewise), or None if not reported
+            cached_tokens: Input tokens served from the provider's cache, or None if not reported
+            compression: Compression statistics reported by the server
+            queue_time: Seconds waiting before the request was sent (scheduler
+                queue and client-side rate limiting)
+            connect_time: Seconds until the first chunk of a streamed response; 0
+                for calls that are not streamed, whose response only arrives once
+                it is generated
+            generation_time: Remaining seconds until the response was complete
+            retries: Calls retried before this response
+            raw: Raw provider payload, if requested
+        """
+        set_field = object.__setattr__
+        set_field(self, "text", text)
+        set_field(self, "model", model)
+        set_field(self, "provider", provider)
+        set_field(self, "input_tokens", input_tokens)
+        set_field(self, "output_tokens", output_tokens)
+        set_field(self, "cached_tokens", cached_tokens)
+        set_field(self, "compression", dict(compression or {}))
+        set_field(self, "queue_time", queue_time)
+        set_field(self, "connect_time", connect_time)
+        set_field(self, "generation_time", generation_time)
+        set_field(self, "retries", retries)
+        set_field(self, "raw", raw)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("LLMResponse is immutable; use replace()")
+
+    @property
+    def latency(self) -> float:
+        """Total seconds from submission to the complete response."""
+        return self.queue_time + self.connect_time + self.generation_time
+
+    def replace(self, **changes) -> 'LLMResponse':
+        """Copy of this response with some fields changed."""
+        fields = {name: getattr(self, name) for name in self.__slots__}
+        fields.update(changes)
+        return LLMResponse(**fields)
+
+    def stats(self) -> Dict[str, Any]:
+        """Usage, compression, latency and retries, without the text and raw payload."""
+        return {
+            "model": self.model,
+            "provider": self.provider,
+            "usage": {
+                "input_tokens": self.input_tokens,
+                "output_tokens": self.output_tokens,
+                "cached_tokens": self.cached_tokens,
+            },
+            "compression": dict(self.compression),
+            "latency": {
+                "queue": self.queue_time,
+                "connect": self.connect_time,
+                "generation": self.generation_time,
+                "total": self.latency,
+            },
+            "retries": self.retries,
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert response to dictionary."""
+        result = self.stats()
+        result["text"] = self.text
+        if self.raw is not None:
+            result["raw"] = self.raw
+        return result
+
+    def __str__(self):
+        return self.text
+
+    def __repr__(self):
+        return (f"LLMResponse({self.text[:40]!r}, model={self.model!r}, "
+                f"input_tokens={self.input_tokens}, output_tokens={self.output_tokens})")
@@ -1,49 +1,186 @@
 import time
-import sys
-import requests
 import json
-from typing import Dict, Any, Optional
+import itertools
+import threading
+from typing import Dict, Any, Iterator, List, Optional
 
-try:
-    import google.generativeai as genai
-except ImportError:
-    genai = None
+from .context_cache import ContextCache
+from .llm_response import LLMResponse
+from .prompts import COVE_DRAFT_START, COVE_QUESTIONS_START, FINAL_ANSWER_END, FINAL_ANSWER_START
+from ..utils.metrics import RATE_LIMIT_WAIT
+from ..utils.tracing import span
+
+
+# Provider SDKs are imported on first use, not when this module is imported
+def _import_genai():
+    """Import the Google Generative AI SDK, or return None if it is not installed."""
+    try:
+        import google.generativeai as genai
+    except ImportError:
+        return None
+    return genai
+
+
+def __getattr__(name):
+    # Module-level access to the lazily imported SDKs (PEP 562)
+    if name == "requests":
+        import requests
+        return requests
+    if name == "genai":
+        return _import_genai()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+class ProviderError(RuntimeError):
+    """A provider call failed."""
+
+
+class RateLimitError(ProviderError):
+    """The provider rejected a call for exceeding a rate limit or quota (HTTP 429)."""
+
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class ProviderTimeoutError(ProviderError):
+    """A provider call timed out."""
+
+
+# Top-level compression statistics of a Scaledown API response
+_COMPRESSION_FIELDS = ("original_prompt_tokens", "compressed_prompt_tokens", "original_context_tokens",
+                       "compressed_context_tokens", "compression_ratio", "tokens_saved")
+
+
+def truncate_at_stop(text: str, stop: Optional[List[str]]) -> str:
+    """Cut text at the first stop sequence, for providers without native stop support."""
+    for sequence in stop or ():
+        index = text.find(sequence)
+        if index >= 0:
+            text = text[:index]
+    return text
 
 
 class LLMProviderFactory:
     """Simple LLM provider that auto-detects based on model name."""
     
     @staticmethod
-    def create_provider(model_id: str, temperature: float = 0.0, configuration: Dict[str, str] = None) -> 'LLM':
-        """Create LLM provider based on model name."""
+    def create_provider(model_id: str, temperature: float = 0.0, configuration: Dict[str, str] = None,
+                        catalog=None) -> 'LLM':
+        """Create LLM provider based on the model catalog entry for the model name.
+        
+        The name is resolved in catalog, or in the global model catalog if None.
+        """
+        from ..models.model_catalog import LLM_PROVIDERS, load_class, resolve_model
+        
         if configuration is None:
             configuration = {}
-            
-        if "gemini" in model_id.lower():
-            return GoogleLLM(model_id, temperature, configuration)
-        elif "scaledown" in model_id.lower() or "gpt" in model_id.lower():
-            return ScaledownLLM(model_id, temperature, configuration)
-        else:
+        
+        spec = catalog.resolve(model_id) if catalog is not None else resolve_model(model_id)
+        if spec is None or spec.provider not in LLM_PROVIDERS:
             raise ValueError(f"Unsupported model: {model_id}")
+        
+        provider_class = load_class(LLM_PROVIDERS[spec.provider])
+        return provider_class(model_id, temperature, configuration)
 
 
 class LLM:
     """Base LLM interface."""
     
+    # Provider name, as in the model catalog
+    provider = "custom"
+    
+    # Client-side rate limiting, see _throttle()
+    last_request_time = 0.0
+    min_request_interval = 0.0
+    
     def __init__(self, model_id: str, temperature: float, configuration: Dict[str, str]):
         self.model_id = model_id
         self.temperature = temperature
         self.configuration = configuration
+        self._throttle_lock = threading.Lock()
         self.configure()
     
     def configure(self):
         """Configure the provider."""
         pass
     
-    def call_llm(self, prompt: str, max_tokens: int) -> str:
-        """Call the LLM."""
+    def generate(self, prompt: str, max_tokens: int, context: str = "",
+                 stop: Optional[List[str]] = None, raw: bool = False) -> LLMResponse:
+        """Call the LLM and return the response with its usage and timing.
+
+        Args:
+            prompt: The prompt or question
+            max_tokens: Maximum tokens for the response
+            context: Optional shared context (e.g. retrieved documents) sent
+                separately from the prompt
+            stop: Optional sequences at which generation stops (not included
+                in the response)
+            raw: Keep the raw provider payload in the response
+
+        The default implementation times call_llm(), for providers that only
+        implement the plain-text interface; usage is then not reported.
+        """
+        started = time.perf_counter()
+        if stop:
+            text = self.call_llm(prompt, max_tokens, context=context, stop=stop)
+        elif context:
+            text = self.call_llm(prompt, max_tokens, context=context)
+        else:
+            text = self.call_llm(prompt, max_tokens)
+        return LLMResponse(text, self.model_id, self.provider, generation_time=time.perf_counter() - started)
+    
+    def call_llm(self, prompt: str, max_tokens: int, context: str = "",
+                 stop: Optional[List[str]] = None) -> str:
+        """Call the LLM and return the response text.
+
+        Args:
+            prompt: The prompt or question
+            max_tokens: Maximum tokens for the response
+            context: Optional shared context (e.g. retrieved documents) sent
+                separately from the prompt
+            stop: Optional sequences at which generation stops (not included
+                in the response)
+        """
         raise NotImplementedError
     
+    def stream_llm(self, prompt: str, max_tokens: int, context: str = "",
+                   stop: Optional[List[str]] = None) -> Iterator[str]:
+        """Call the LLM and yield the response in chunks as they arrive.
+        
+        Closing the iterator early cancels the rest of the generation where the
+        provider supports it. The generator returns True when generation ended
+        at one of the stop sequences, and False when it ended for another reason
+        (such as max_tokens) or the provider cannot tell. The default
+        implementation yields the whole response of call_llm() as one chunk.
+        """
+        if stop:
+            yield self.call_llm(prompt, max_tokens, context=context, stop=stop)
+        elif context:
+            yield self.call_llm(prompt, max_tokens, context=context)
+        else:
+            yield self.call_llm(prompt, max_tokens)
+        return False
+    
+    def _throttle(self) -> float:
+        """Wait until min_request_interval has passed since the previous request.
+
+        Returns:
+            Seconds waited
+        """
+        # Rate limiting; concurrent callers take their turns one interval apart
+        sleep_time = 0.0
+        with self._throttle_lock:
+            current_time = time.time()
+            time_since_last = current_time - self.last_request_time
+            if time_since_last < self.min_request_interval:
+                sleep_time = self.min_request_interval - time_since_last
+                with span("scaledown.rate_limit_wait", provider=self.provider, wait=sleep_time):
+                    time.sleep(sleep_time)
+                RATE_LIMIT_WAIT.observe(sleep_time, (self.provider,))
+            self.last_request_time = time.time()
+        return sleep_time
+    
     def get_model_info(self) -> Dict[str, Any]:
         """Get model information."""
         return {
@@ -56,9 +193,13 @@ class LLM:
 class GoogleLLM(LLM):
     """Google Gemini LLM."""
     
+    provider = "google"
+    
     def configure(self):
+        genai = _import_genai()
         if genai is None:
             raise ImportError("google-generativeai not installed")
+        self.genai = genai
             
         api_key = self.configuration.get("GOOGLE_API_KEY")
         if not api_key:
@@ -78,43 +219,90 @@ class GoogleLLM(LLM):
         self.last_request_time = 0
         self.min_request_interval = 4.0  # Rate limiting
     
-    def call_llm(self, prompt: str, max_tokens: int) -> str:
-        # Rate limiting
-        current_time = time.time()
-        time_since_last = current_time - self.last_request_time
-        if time_since_last < self.min_request_interval:
-            sleep_time = self.min_request_interval - time_since_last
-            time.sleep(sleep_time)
-        self.last_request_time = time.time()
+    def _generate(self, prompt: str, max_tokens: int, context: str, stop: Optional[List[str]], stream: bool):
+        # Gemini has no separate context channel
+        if context:
+            prompt = f"{context}\n\n{prompt}"
         
-        try:
-            generation_config = genai.types.GenerationConfig(
-                temperature=self.temperature,
-                max_output_tokens=max_tokens,
-            )
-            
-            response = self.model.generate_content(
+        generation_config = self.genai.types.GenerationConfig(
+            temperature=self.temperature,
+            max_output_tokens=max_tokens,
+            stop_sequences=stop or None,
+        )
+        
+        with span("scaledown.http", provider="google", model=self.model_id, stream=stream):
+            return self.model.generate_content(
                 prompt,
                 generation_config=generation_config,
+                stream=stream,
             )
+    
+    @staticmethod
+    def _provider_error(e: Exception) -> Exception:
+        error_msg = str(e).lower()
+        if "quota" in error_msg or "rate limit" in error_msg or "429" in error_msg:
+            return RateLimitError(f"Google API quota exceeded: {e}")
+        if "deadline" in error_msg or "timed out" in error_msg or "504" in error_msg:
+            return ProviderTimeoutError(f"Google API request timed out: {e}")
+        return e
+    
+    def generate(self, prompt: str, max_tokens: int, context: str = "",
+                 stop: Optional[List[str]] = None, raw: bool = False) -> LLMResponse:
+        waited = self._throttle()
+        started = time.perf_counter()
+        try:
+            response = self._generate(prompt, max_tokens, context, stop, stream=False)
             
             if response.candidates and response.candidates[0].content.parts:
-                return response.candidates[0].content.parts[0].text.strip()
+                text = response.candidates[0].content.parts[0].text.strip()
             else:
-                return "No response generated"
+                text = "No response generated"
                 
         except Exception as e:
-            error_msg = str(e).lower()
-            if "quota" in error_msg or "rate limit" in error_msg or "429" in error_msg:
-                print(f"\n❌ API quota exceeded: {e}")
-                sys.exit(1)
-            else:
-                raise e
+            error = self._provider_error(e)
+            if error is e:
+                raise
+            raise error from e
+        
+        usage = getattr(response, "usage_metadata", None)
+        return LLMResponse(
+            text, self.model_id, self.provider,
+            input_tokens=getattr(usage, "prompt_token_count", None),
+            output_tokens=getattr(usage, "candidates_token_count", None),
+            cached_tokens=getattr(usage, "cached_content_token_count", None),
+            queue_time=waited,
+            generation_time=time.perf_counter() - started,
+            raw=response if raw else None,
+        )
+    
+    def call_llm(self, prompt: str, max_tokens: int, context: str = "",
+                 stop: Optional[List[str]] = None) -> str:
+        return self.generate(prompt, max_tokens, context, stop).text
+    
+    def stream_llm(self, prompt: str, max_tokens: int, context: str = "",
+                   stop: Optional[List[str]] = None) -> Iterator[str]:
+        self._throttle()
+        finish_reason = None
+        try:
+            for chunk in self._generate(prompt, max_tokens, context, stop, stream=True):
+                if chunk.candidates:
+                    finish_reason = chunk.candidates[0].finish_reason or finish_reason
+                if chunk.candidates and chunk.candidates[0].content.parts:
+                    yield chunk.candidates[0].content.parts[0].text
+        except Exception as e:
+            error = self._provider_error(e)
+            if error is e:
+                raise
+            raise error from e
+        # MAX_TOKENS, SAFETY and the like mean the output was cut short
+        return getattr(finish_reason, "name", finish_reason) in ("STOP", 1)
 
 
 class ScaledownLLM(LLM):
     """Scaledown API LLM."""
     
+    provider = "scaledown"
+    
     def configure(self):
         api_key = self.configuration.get("SCALEDOWN_API_KEY")
         if not api_key:
@@ -133,55 +321,268 @@ class ScaledownLLM(LLM):
         else:
             self.actual_model = self.model_id
         
+        self.compression_rate = float(self.configuration.get("SCALEDOWN_RATE", 0.0))
+        self.context_cache = ContextCache()
+        
         self.last_request_time = 0
         self.min_request_interval = 1.0  # Basic rate limiting
     
-    def call_llm(self, prompt: str, max_tokens: int) -> str:
-        # Rate limiting
-        current_time = time.time()
-        time_since_last = current_time - self.last_request_time
-        if time_since_last < self.min_request_interval:
-            sleep_time = self.min_request_interval - time_since_last
-            time.sleep(sleep_time)
-        self.last_request_time = time.time()
-        
+    def _build_payload(self, prompt: str, context: str, stop: Optional[List[str]] = None,
+                       max_tokens: Optional[int] = None) -> Dict[str, Any]:
+        """Build the request payload, reusing a cached context when possible."""
         payload = {
-            "context": "",
+            "context": context,
             "prompt": prompt,
             "model": self.actual_model,
             "scaledown": {
-                "rate": 0.0
+                "rate": self.compression_rate
             }
         }
         
+        cached = self.context_cache.get(context, self.compression_rate) if context else None
+        if cached:
+            if cached["context_id"]:
+                # The server already holds this context
+                payload["context"] = ""
+                payload["context_id"] = cached["context_id"]
+            else:
+                # Already compressed, don't compress it again
+                payload["context"] = cached["compressed_context"]
+                payload["scaledown"]["rate"] = 0.0
+        
         if self.temperature > 0:
             payload["temperature"] = self.temperature
+        if max_tokens:
+            payload["max_tokens"] = max_tokens
+        if stop:
+            payload["stop"] = list(stop)
+        
+        return payload
+    
+    def _remember_context(self, context: str, payload: Dict[str, Any], result: Dict[str, Any]) -> None:
+        """Cache the compressed context or server-side handle from a response."""
+        # Only contexts sent in full produce a new cache entry
+        if not context or payload["context"] is not context:
+            return
+        
+        self.context_cache.put(
+            context,
+            self.compression_rate,
+            context_id=result.get("context_id"),
+            compressed_context=result.get("compressed_context")
+        )
+    
+    @staticmethod
+    def _response_text(result: Dict[str, Any]) -> str:
+        # Handle different response formats
+        if "full_response" in result:
+            return result["full_response"]
+        if "response" in result:
+            return result["response"]
+        if "text" in result:
+            return result["text"]
+        if "choices" in result and len(result["choices"]) > 0:
+            return result["choices"][0]["message"]["content"]
+        return str(result)
+    
+    @staticmethod
+    def _usage(result: Dict[str, Any]) -> Dict[str, Optional[int]]:
+        # OpenAI-style usage ("prompt_tokens") or Anthropic-style ("input_tokens")
+        usage = result.get("usage") or {}
+        details = usage.get("prompt_tokens_details") or {}
+        return {
+            "input_tokens": usage.get("prompt_tokens", usage.get("input_tokens")),
+            "output_tokens": usage.get("completion_tokens", usage.get("output_tokens")),
+            "cached_tokens": details.get("cached_tokens", usage.get("cached_tokens")),
+        }
+    
+    @staticmethod
+    def _compression_stats(result: Dict[str, Any]) -> Dict[str, Any]:
+        stats = {field: result[field] for field in _COMPRESSION_FIELDS if field in result}
+        for field in ("compression", "scaledown"):
+            if isinstance(result.get(field), dict):
+                stats.update(result[field])
+        return stats
+    
+    def generate(self, prompt: str, max_tokens: int, context: str = "",
+                 stop: Optional[List[str]] = None, raw: bool = False) -> LLMResponse:
+        waited = self._throttle()
+        
+        payload = self._build_payload(prompt, context, stop, max_tokens)
         
+        import requests
         try:
-            response = requests.post(
-                self.endpoint,
-                headers=self.headers,
-                data=json.dumps(payload),
-                timeout=60
-            )
+            started = time.perf_counter()
+            with span("scaledown.http", provider="scaledown", model=self.actual_model,
+                      endpoint=self.endpoint) as http_span:
+                response = requests.post(
+                    self.endpoint,
+                    headers=self.headers,
+                    data=json.dumps(payload),
+                    timeout=60
+                )
+                http_span.set_attribute("status_code", response.status_code)
             
             if response.status_code == 200:
                 result = response.json()
+                total = time.perf_counter() - started
+                self._remember_context(context, payload, result)
                 
-                # Handle different response formats
-                if "full_response" in result:
-                    return result["full_response"].strip()
-                elif "response" in result:
-                    return result["response"].strip()
-                elif "text" in result:
-                    return result["text"].strip()
-                elif "choices" in result and len(result["choices"]) > 0:
-                    return result["choices"][0]["message"]["content"].strip()
-                else:
-                    return str(result).strip()
+                # The response is not streamed, so its headers only arrive once the
+                # answer is generated: connecting can't be told apart from generating
+                # The stop sequences are also applied here in case the upstream model ignored them
+                text = truncate_at_stop(self._response_text(result), stop).strip()
+                return LLMResponse(
+                    text, self.actual_model, self.provider,
+                    compression=self._compression_stats(result),
+                    queue_time=waited,
+                    generation_time=total,
+                    raw=result if raw else None,
+                    **self._usage(result)
+                )
             else:
+                if "context_id" in payload:
+                    # The server may have expired our handle; resend in full next time
+                    self.context_cache.invalidate(context, self.compression_rate)
                 error_msg = f"HTTP {response.status_code}: {response.text[:200]}"
+                if response.status_code == 429:
+                    retry_after = response.headers.get("Retry-After")
+                    raise RateLimitError(f"Scaledown API rate limit exceeded: {error_msg}",
+                                         float(retry_after) if retry_after and retry_after.isdigit() else None)
+                if response.status_code == 504:
+                    raise ProviderTimeoutError(f"Scaledown API request timed out: {error_msg}")
                 raise RuntimeError(f"Scaledown API request failed: {error_msg}")
                 
+        except requests.exceptions.Timeout as e:
+            raise ProviderTimeoutError(f"Scaledown API request timed out: {e}") from e
         except requests.exceptions.RequestException as e:
-            raise RuntimeError(f"Scaledown API request failed: {e}")
\ No newline at end of file
+            raise RuntimeError(f"Scaledown API request failed: {e}")
+    
+    def call_llm(self, prompt: str, max_tokens: int, context: str = "",
+                 stop: Optional[List[str]] = None) -> str:
+        return self.generate(prompt, max_tokens, context, stop).text
+    
+    def stream_llm(self, prompt: str, max_tokens: int, context: str = "",
+                   stop: Optional[List[str]] = None) -> Iterator[str]:
+        response = self.generate(prompt, max_tokens, context, stop, raw=True)
+        yield response.text
+        return self._stopped(response.raw, stop)
+    
+    @classmethod
+    def _stopped(cls, result: Dict[str, Any], stop: Optional[List[str]]) -> bool:
+        """Whether generation ended at a stop sequence rather than max_tokens."""
+        text = cls._response_text(result)
+        if stop and truncate_at_stop(text, stop) != text:
+            # The upstream model ran past the stop sequence and generate() cut it there
+            return True
+        finish_reason = result.get("finish_reason", result.get("stop_reason"))
+        if finish_reason is None and result.get("choices"):
+            finish_reason = result["choices"][0].get("finish_reason")
+        # OpenAI-style "stop" or Anthropic-style "stop_sequence"; "length" and
+        # "max_tokens" mean the output was cut short
+        return finish_reason in ("stop", "stop_sequence")
+
+
+class MockLLM(LLM):
+    """Offline stand-in provider for local testing and load tests.
+    
+    Responds to any "mock*" model id without network access, after a fixed
+    simulated latency (MOCK_LATENCY seconds in the configuration, plus
+    MOCK_TOKEN_LATENCY seconds per output token). To mimic a
+    loaded provider, MOCK_CAPACITY concurrent calls can be served before
+    latency grows in proportion to the load, and calls beyond
+    MOCK_RATE_LIMIT concurrent ones fail with RateLimitError. Prompts asking
+    for a delimited final answer get MOCK_ANSWER in that section, followed
+    by trailing text; "a|b|c" answers a, b and c on successive calls.
+    """
+    
+    provider = "mock"
+    
+    def configure(self):
+        self.latency = float(self.configuration.get("MOCK_LATENCY", 0.05))
+        self.token_latency = float(self.configuration.get("MOCK_TOKEN_LATENCY", 0.0))
+        self.capacity = int(self.configuration.get("MOCK_CAPACITY", 0))
+        self.rate_limit = int(self.configuration.get("MOCK_RATE_LIMIT", 0))
+        self._answers = itertools.cycle(self.configuration.get("MOCK_ANSWER", "Mock answer").split("|"))
+        self.streamed_chunks = 0
+        self._in_flight = 0
+        self._lock = threading.Lock()
+    
+    def _respond(self, prompt: str, max_tokens: int) -> str:
+        with self._lock:
+            answer = next(self._answers)
+        words = prompt.split()
+        if COVE_QUESTIONS_START in prompt:
+            # Verification plan of factored CoVe
+            questions = "\n".join(f"{i}. Mock verification question {i}?" for i in range(1, 4))
+            response = f"{COVE_DRAFT_START}\n{answer}\n{COVE_QUESTIONS_START}\n{questions}"
+        elif FINAL_ANSWER_START in prompt:
+            # Follow the requested final answer format, then keep talking
+            steps = min(len(words), 50)
+            response = (" ".join(["Mock reasoning."] * steps) + f"\n{FINAL_ANSWER_START}\n{answer}\n"
+                        f"{FINAL_ANSWER_END}\n" + " ".join(["Mock confidence note."] * steps))
+        else:
+            response = " ".join(["Mock response to:"] + words)
+        # Roughly 4 characters per token, like the approximate token counter
+        return response[:max_tokens * 4]
+    
+    def _acquire(self, response: str) -> float:
+        with self._lock:
+            self._in_flight += 1
+            load = self._in_flight
+        if self.rate_limit and load > self.rate_limit:
+            self._release()
+            raise RateLimitError(f"Mock rate limit of {self.rate_limit} concurrent calls exceeded")
+        # Roughly 4 characters per output token
+        latency = self.latency + self.token_latency * len(response) / 4
+        if self.capacity and load > self.capacity:
+            latency *= load / self.capacity
+        return latency
+    
+    def _release(self):
+        with self._lock:
+            self._in_flight -= 1
+    
+    def generate(self, prompt: str, max_tokens: int, context: str = "",
+                 stop: Optional[List[str]] = None, raw: bool = False) -> LLMResponse:
+        response = truncate_at_stop(self._respond(prompt, max_tokens), stop)
+        started = time.perf_counter()
+        latency = self._acquire(response)
+        try:
+            if latency > 0:
+                time.sleep(latency)
+        finally:
+            self._release()
+        # Roughly 4 characters per token, like the approximate token counter
+        usage = {"input_tokens": (len(prompt) + len(context)) // 4, "output_tokens": len(response) // 4,
+                 "cached_tokens": 0}
+        return LLMResponse(response, self.model_id, self.provider,
+                           generation_time=time.perf_counter() - started,
+                           raw={"text": response, "usage": usage} if raw else None, **usage)
+    
+    def call_llm(self, prompt: str, max_tokens: int, context: str = "",
+                 stop: Optional[List[str]] = None) -> str:
+        return self.generate(prompt, max_tokens, context, stop).text
+    
+    def stream_llm(self, prompt: str, max_tokens: int, context: str = "",
+                   stop: Optional[List[str]] = None) -> Iterator[str]:
+        # One chunk per word; the latency is spread over the whole response like
+        # generation time, so stopping early saves time
+        response = self._respond(prompt, max_tokens)
+        chunk_latency = 0.0
+        text = truncate_at_stop(response, stop)
+        chunks = [word + " " for word in text.split(" ")]
+        self.streamed_chunks = 0
+        latency = self._acquire(response)
+        if latency > 0:
+            chunk_latency = latency / len(response.split(" "))
+        try:
+            for chunk in chunks:
+                if chunk_latency > 0:
+                    time.sleep(chunk_latency)
+                self.streamed_chunks += 1
+                yield chunk
+        finally:
+            self._release()
+        # Only a stop sequence found within max_tokens ends generation there
+        return text != response
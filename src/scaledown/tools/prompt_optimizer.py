@@ -12,6 +12,7 @@ OPTIMIZER_PROMPTS = {
     "cot": COT_PROMPT, 
     "uncertainty": UNCERTAINTY_PROMPT,
     "cove": COVE_PROMPT,
+    "dedup": "",  # Removes duplicate passages, adds no instructions
     "none": "",  # Baseline prompt without optimization
 }
 
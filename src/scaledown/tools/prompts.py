@@ -29,11 +29,48 @@ COVE_PROMPT = """VERIFICATION PROCEDURE: Use the following verification approach
 
 IMPORTANT: Even if the task asks for a specific format (like numbered lists), you must still show the complete verification process first, then provide the final answer in the requested format."""
 
+# Factored Chain-of-Verification: the procedure above run as separate calls
+
+COVE_DRAFT_START = "=== DRAFT ANSWER ==="
+COVE_QUESTIONS_START = "=== VERIFICATION QUESTIONS ==="
+
+COVE_PLAN_PROMPT = """{prompt}
+
+VERIFICATION PLAN: Give a concise initial answer, then list up to {max_questions} short, specific questions that would verify the facts in it. Use exactly this format:
+
+=== DRAFT ANSWER ===
+[Your initial answer]
+=== VERIFICATION QUESTIONS ===
+1. [Question]
+2. [Question]"""
+
+COVE_VERIFY_PROMPT = """Answer the following question accurately and concisely, in one or two sentences.
+
+Question: {question}"""
+
+COVE_REVISE_PROMPT = """{prompt}
+
+An initial answer was drafted and its facts were checked independently.
+
+Initial answer:
+{draft}
+
+Verification:
+{verifications}
+
+Correct any errors the verification reveals and give the final answer in the requested format. If no final answer format was requested, end with:
+
+=== FINAL ANSWER ===
+[Your verified answer]
+=== END FINAL ANSWER ==="""
+
 
 ######################################
 # Task Final Answer Format
 ######################################
 
+FINAL_ANSWER_START = "=== FINAL ANSWER ==="
+FINAL_ANSWER_END = "=== END FINAL ANSWER ==="
 
 
 ######################################
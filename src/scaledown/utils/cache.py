@@ -0,0 +1,93 @@
+"""
+Small bounded caches shared across ScaleDown components.
+"""
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Dict, Hashable, Optional
+
+from .metrics import get_metrics_registry
+
+
+class LRUCache:
+    """Thread-safe, bounded least-recently-used cache with hit/miss statistics."""
+
+    def __init__(self, maxsize: int = 128, name: Optional[str] = None):
+        """Initialize the cache.
+
+        Args:
+            maxsize: Maximum number of entries kept before evicting the oldest
+            name: If given, the cache's statistics are reported by the metrics
+                registry under this name
+        """
+        if maxsize <= 0:
+            raise ValueError("maxsize must be a positive integer")
+
+        self.maxsize = maxsize
+        self._data: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = Lock()
+        # Kept apart from the cache so the metrics registry can read the final
+        # counts once the cache is collected
+        self._counts = {"hits": 0, "misses": 0, "evictions": 0}
+        if name is not None:
+            get_metrics_registry().register_cache(name, self, self._counts)
+
+    @property
+    def hits(self) -> int:
+        return self._counts["hits"]
+
+    @property
+    def misses(self) -> int:
+        return self._counts["misses"]
+
+    @property
+    def evictions(self) -> int:
+        return self._counts["evictions"]
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Get a cached value, marking it as recently used."""
+        with self._lock:
+            try:
+                value = self._data[key]
+            except KeyError:
+                self._counts["misses"] += 1
+                return default
+            self._data.move_to_end(key)
+            self._counts["hits"] += 1
+            return value
+
+    def put(self, key: Hashable, value: Any) -> None:
+        """Store a value, evicting the least recently used entry if full."""
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self._counts["evictions"] += 1
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        """Remove and return a cached value."""
+        with self._lock:
+            return self._data.pop(key, default)
+
+    def clear(self) -> None:
+        """Remove all entries (statistics are kept)."""
+        with self._lock:
+            self._data.clear()
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._data
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        """Get cache statistics."""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": (self.hits / lookups) if lookups > 0 else 0.0
+        }
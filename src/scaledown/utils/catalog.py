@@ -0,0 +1,272 @@
+"""
+On-disk catalogs of template and style records with lazy, per-record decoding.
+
+Two layouts are supported:
+
+* A directory holding one ``<id>.json`` file per record.
+* A single packed file: a JSON-lines data section followed by a compact index
+  of fixed-width ``(id hash, offset, length)`` entries sorted by hash, and a
+  footer locating the index. The file is memory-mapped, and a lookup is a
+  binary search over the index that decodes only the matching record, so
+  opening a catalog costs the same whatever its size.
+
+Both can also be read by position (the order records were written in, or
+file name order), which lets listings page through a catalog decoding only
+the records on the page. Catalogs are closed with close() or a with block.
+"""
+import bisect
+import hashlib
+import json
+import mmap
+import os
+import struct
+import tempfile
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+
+PACKED_MAGIC = b"SDCAT001"
+
+_ENTRY = struct.Struct("<QQI")    # id hash, record offset, record length
+_FOOTER = struct.Struct("<QQ8s")  # index offset, record count, magic
+
+
+def _key_hash(key: str) -> int:
+    """Stable 64-bit hash of a record id (unlike hash(), identical across processes)."""
+    return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def write_packed_catalog(records: Iterable[Dict[str, Any]], path: str, key: str = "id") -> int:
+    """Write records to a packed catalog file.
+
+    The file is written next to its destination and moved into place
+    atomically, so readers never see a partially written catalog.
+
+    Args:
+        records: Template or style dictionaries
+        path: Destination file
+        key: Record field holding the unique id
+
+    Returns:
+        Number of records written
+    """
+    entries: List[Tuple[int, int, int]] = []
+    seen = set()
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(PACKED_MAGIC)
+            offset = len(PACKED_MAGIC)
+
+            for record in records:
+                record_id = record[key]
+                if record_id in seen:
+                    raise ValueError(f"Duplicate catalog id: {record_id}")
+                seen.add(record_id)
+
+                data = json.dumps(record, ensure_ascii=False, separators=(",", ":")).encode("utf-8") + b"\n"
+                f.write(data)
+                entries.append((_key_hash(record_id), offset, len(data) - 1))
+                offset += len(data)
+
+            entries.sort()
+            for entry in entries:
+                f.write(_ENTRY.pack(*entry))
+            f.write(_FOOTER.pack(offset, len(entries), PACKED_MAGIC))
+
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+    return len(entries)
+
+
+class PackedCatalog:
+    """Read-only, memory-mapped packed catalog."""
+
+    def __init__(self, path: str, key: str = "id"):
+        """Open a packed catalog.
+
+        Args:
+            path: Catalog file written by write_packed_catalog
+            key: Record field holding the unique id
+        """
+        self.path = path
+        self.key = key
+        self._layout: Optional[List[Tuple[int, int]]] = None
+
+        with open(path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if size < len(PACKED_MAGIC) + _FOOTER.size:
+                raise ValueError(f"Not a ScaleDown catalog: {path}")
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        self._index_offset, self._count, magic = _FOOTER.unpack_from(self._mmap, size - _FOOTER.size)
+        if magic != PACKED_MAGIC or self._mmap[:len(PACKED_MAGIC)] != PACKED_MAGIC:
+            raise ValueError(f"Not a ScaleDown catalog: {path}")
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __contains__(self, record_id: str) -> bool:
+        return self.get_record(record_id) is not None
+
+    def __enter__(self) -> 'PackedCatalog':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Unmap the file; no records can be read afterwards."""
+        self._mmap.close()
+
+    def _entry(self, position: int) -> Tuple[int, int, int]:
+        return _ENTRY.unpack_from(self._mmap, self._index_offset + position * _ENTRY.size)
+
+    def _decode(self, offset: int, length: int) -> Dict[str, Any]:
+        return json.loads(self._mmap[offset:offset + length])
+
+    def get_record(self, record_id: str) -> Optional[Dict[str, Any]]:
+        """Decode the record with the given id, or return None."""
+        found = self._find(record_id)
+        return found[1] if found is not None else None
+
+    def _find(self, record_id: str) -> Optional[Tuple[int, Dict[str, Any]]]:
+        """Offset and decoded record of the record with the given id."""
+        target = _key_hash(record_id)
+
+        # Binary search for the first entry with the target hash
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            if self._entry(middle)[0] < target:
+                low = middle + 1
+            else:
+                high = middle
+
+        # Colliding hashes sit next to each other
+        while low < self._count:
+            key_hash, offset, length = self._entry(low)
+            if key_hash != target:
+                break
+            record = self._decode(offset, length)
+            if record.get(self.key) == record_id:
+                return offset, record
+            low += 1
+
+        return None
+
+    def _record_layout(self) -> List[Tuple[int, int]]:
+        """(offset, length) of every record in the order written, read from the index alone."""
+        if self._layout is None:
+            self._layout = sorted(self._entry(position)[1:] for position in range(self._count))
+        return self._layout
+
+    def record_position(self, record_id: str) -> Optional[int]:
+        """Position of a record in the order written, or None if there is no such record."""
+        found = self._find(record_id)
+        if found is None:
+            return None
+        return bisect.bisect_left(self._record_layout(), (found[0],))
+
+    def records_at(self, positions: Iterable[int]) -> List[Dict[str, Any]]:
+        """Decode the records at the given positions, and no others."""
+        layout = self._record_layout()
+        return [self._decode(*layout[position]) for position in positions]
+
+    def iter_records(self) -> Iterator[Dict[str, Any]]:
+        """Decode all records in the order they were written."""
+        position = len(PACKED_MAGIC)
+        while position < self._index_offset:
+            end = self._mmap.find(b"\n", position, self._index_offset)
+            yield json.loads(self._mmap[position:end])
+            position = end + 1
+
+
+class DirectoryCatalog:
+    """Read-only catalog of one ``<id>.json`` file per record."""
+
+    def __init__(self, path: str, key: str = "id"):
+        """Open a directory catalog.
+
+        Args:
+            path: Directory holding the record files
+            key: Record field holding the unique id
+        """
+        if not os.path.isdir(path):
+            raise ValueError(f"Not a directory: {path}")
+
+        self.path = path
+        self.key = key
+
+    def _record_path(self, record_id: str) -> Optional[str]:
+        if not record_id or os.sep in record_id or (os.altsep and os.altsep in record_id) or record_id.startswith("."):
+            return None
+        return os.path.join(self.path, f"{record_id}.json")
+
+    def _record_files(self) -> List[str]:
+        return sorted(entry.path for entry in os.scandir(self.path)
+                      if entry.name.endswith(".json") and entry.is_file())
+
+    def __len__(self) -> int:
+        return len(self._record_files())
+
+    def __contains__(self, record_id: str) -> bool:
+        record_path = self._record_path(record_id)
+        return record_path is not None and os.path.isfile(record_path)
+
+    def __enter__(self) -> 'DirectoryCatalog':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Nothing to release; files are opened per record."""
+
+    def get_record(self, record_id: str) -> Optional[Dict[str, Any]]:
+        """Decode the record with the given id, or return None."""
+        record_path = self._record_path(record_id)
+        if record_path is None or not os.path.isfile(record_path):
+            return None
+
+        with open(record_path, encoding="utf-8") as f:
+            record = json.load(f)
+        record.setdefault(self.key, record_id)
+        return record
+
+    def _read(self, record_path: str) -> Dict[str, Any]:
+        with open(record_path, encoding="utf-8") as f:
+            record = json.load(f)
+        record.setdefault(self.key, os.path.basename(record_path)[:-len(".json")])
+        return record
+
+    def iter_records(self) -> Iterator[Dict[str, Any]]:
+        """Decode all records, ordered by file name."""
+        for record_path in self._record_files():
+            yield self._read(record_path)
+
+    def record_position(self, record_id: str) -> Optional[int]:
+        """Position of a record in file name order, or None if there is no such record."""
+        record_path = self._record_path(record_id)
+        if record_path is None or not os.path.isfile(record_path):
+            return None
+        files = self._record_files()
+        position = bisect.bisect_left(files, record_path)
+        return position if position < len(files) and files[position] == record_path else None
+
+    def records_at(self, positions: Iterable[int]) -> List[Dict[str, Any]]:
+        """Decode the records at the given positions, and no others."""
+        files = self._record_files()
+        return [self._read(files[position]) for position in positions]
+
+
+def open_catalog(path: str, key: str = "id"):
+    """Open a packed catalog file or a directory catalog."""
+    if os.path.isdir(path):
+        return DirectoryCatalog(path, key)
+    return PackedCatalog(path, key)
@@ -0,0 +1,130 @@
+"""
+Polling watcher that reloads a catalog when its file or directory changes.
+
+Reloads run on the watcher's thread: the callback builds a complete new index
+off to the side and swaps it in with a single assignment, so readers keep
+using the previous catalog until the new one is ready.
+"""
+import logging
+import os
+import threading
+from typing import Any, Callable, Dict, Optional
+
+from .catalog import open_catalog
+
+
+logger = logging.getLogger(__name__)
+
+def catalog_fingerprint(path: str) -> tuple:
+    """Cheap signature of a catalog's on-disk state.
+
+    A packed file is replaced atomically, so its inode, size and mtime change
+    on every rewrite. A directory is summarized from the stat of each record
+    file, which also catches records edited in place.
+    """
+    if not os.path.isdir(path):
+        stat = os.stat(path)
+        return (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
+    count = total_size = latest = 0
+    for entry in os.scandir(path):
+        if entry.name.endswith(".json") and entry.is_file():
+            stat = entry.stat()
+            count += 1
+            total_size += stat.st_size
+            latest = max(latest, stat.st_mtime_ns)
+    return (count, total_size, latest, os.stat(path).st_mtime_ns)
+
+
+class CatalogWatcher:
+    """Polls a catalog path and hands a freshly opened catalog to a callback on change."""
+
+    def __init__(self, path: str, on_change: Callable[[Any], None],
+                 interval: float = 1.0, key: str = "id"):
+        """Initialize catalog watcher.
+
+        Args:
+            path: Packed catalog file or directory of <id>.json files
+            on_change: Called with the newly opened catalog after each change
+            interval: Seconds between polls
+            key: Record field holding the unique id
+        """
+        if interval <= 0:
+            raise ValueError("interval must be positive")
+
+        self.path = path
+        self.on_change = on_change
+        self.interval = interval
+        self.key = key
+        self.reloads = 0
+        self.errors = 0
+        self.last_error: Optional[str] = None
+        self._fingerprint = catalog_fingerprint(path)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def check(self) -> bool:
+        """Poll once, reloading if the catalog changed.
+
+        A catalog that fails to open or load is reported in last_error and
+        retried on the next poll; the previous catalog stays in use. Any
+        error is caught, so one bad reload does not stop the polling thread.
+
+        Returns:
+            True if a reload happened
+        """
+        try:
+            fingerprint = catalog_fingerprint(self.path)
+        except OSError as e:
+            self.errors += 1
+            self.last_error = str(e)
+            return False
+
+        if fingerprint == self._fingerprint:
+            return False
+
+        try:
+            self.on_change(open_catalog(self.path, self.key))
+        except Exception as e:
+            if not isinstance(e, (OSError, ValueError)):
+                # Not a bad catalog but a bug in the reload, so keep the traceback
+                logger.exception("Reloading catalog %s failed", self.path)
+            self.errors += 1
+            self.last_error = str(e)
+            return False
+
+        # Only now, so a failed reload is retried even if the catalog doesn't change again
+        self._fingerprint = fingerprint
+        self.reloads += 1
+        self.last_error = None
+        return True
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.check()
+
+    def start(self) -> 'CatalogWatcher':
+        """Start polling on a daemon thread."""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name=f"catalog-watcher:{self.path}",
+                                            daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Stop polling and wait for the thread to exit."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def stats(self) -> Dict[str, Any]:
+        """Return reload counters."""
+        return {
+            "path": self.path,
+            "running": self._thread is not None and self._thread.is_alive(),
+            "reloads": self.reloads,
+            "errors": self.errors,
+            "last_error": self.last_error,
+        }
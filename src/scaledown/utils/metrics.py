@@ -0,0 +1,299 @@
+"""
+Operational metrics kept by the library: counters and histograms.
+
+The standard metrics below cover provider calls (latency, tokens, errors,
+retries), optimizer overhead tokens and client-side rate-limit waits.
+Recording a sample takes a lock and a dictionary update. Caches cost nothing
+on the hot path: named LRUCaches register themselves, and their own hit,
+miss and eviction counters are read when a snapshot is taken.
+
+snapshot() returns plain dictionaries; render_prometheus() returns the
+Prometheus text exposition format.
+"""
+import bisect
+import threading
+import weakref
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+TOKEN_BUCKETS = (-1000, -250, -100, -10, 0, 10, 50, 100, 250, 500, 1000, 2500)
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[Any]) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, description: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.description = description
+        self.labels = tuple(labels)
+        self._values: Dict[Tuple, Any] = {}
+        self._lock = threading.Lock()
+
+    def _check(self, labels: Tuple) -> None:
+        if len(labels) != len(self.labels):
+            raise ValueError(f"{self.name} expects labels {self.labels}, got {labels}")
+
+    def reset(self) -> None:
+        """Forget all recorded values."""
+        with self._lock:
+            self._values.clear()
+
+
+class Counter(_Metric):
+    """Monotonically increasing total per label values."""
+    kind = "counter"
+
+    def inc(self, labels: Tuple = (), amount: float = 1.0) -> None:
+        """Add to the total of a label tuple (ordered like the metric's labels)."""
+        with self._lock:
+            value = self._values.get(labels)
+            if value is None:
+                self._check(labels)
+                value = 0.0
+            self._values[labels] = value + amount
+
+    def value(self, labels: Tuple = ()) -> float:
+        """Current total of a label tuple."""
+        return self._values.get(labels, 0.0)
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            items = list(self._values.items())
+        return [{"labels": dict(zip(self.labels, key)), "value": value} for key, value in items]
+
+    def _samples(self) -> Iterator[str]:
+        with self._lock:
+            items = list(self._values.items())
+        for key, value in items:
+            yield f"{self.name}{_format_labels(self.labels, key)} {_format_value(value)}"
+
+
+class Histogram(_Metric):
+    """Distribution of observed values in fixed buckets per label values."""
+    kind = "histogram"
+
+    def __init__(self, name: str, description: str, labels: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, description, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, labels: Tuple = ()) -> None:
+        """Record an observation for a label tuple."""
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(labels)
+            if entry is None:
+                self._check(labels)
+                # Per-bucket counts (the last one is +Inf), sum and count
+                entry = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def _entries(self) -> List[Tuple[Tuple, List[int], float, int]]:
+        with self._lock:
+            return [(key, list(entry[0]), entry[1], entry[2]) for key, entry in self._values.items()]
+
+    def _cumulative(self, counts: List[int]) -> List[Tuple[float, int]]:
+        total = 0
+        cumulative = []
+        for bound, count in zip(self.buckets + (float("inf"),), counts):
+            total += count
+            cumulative.append((bound, total))
+        return cumulative
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        return [
+            {
+                "labels": dict(zip(self.labels, key)),
+                "count": count,
+                "sum": total,
+                "buckets": {_format_value(bound): cumulative for bound, cumulative in self._cumulative(counts)},
+            }
+            for key, counts, total, count in self._entries()
+        ]
+
+    def _samples(self) -> Iterator[str]:
+        for key, counts, total, count in self._entries():
+            for bound, cumulative in self._cumulative(counts):
+                labels = _format_labels(self.labels + ("le",), key + (_format_value(bound),))
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            labels = _format_labels(self.labels, key)
+            yield f"{self.name}_sum{labels} {_format_value(total)}"
+            yield f"{self.name}_count{labels} {count}"
+
+
+_CACHE_FIELDS = (
+    ("hits", "counter", "Cache lookups that found an entry"),
+    ("misses", "counter", "Cache lookups that found no entry"),
+    ("evictions", "counter", "Entries evicted to stay within the cache size"),
+    ("size", "gauge", "Entries currently cached"),
+)
+
+
+class MetricsRegistry:
+    """Named metrics and caches, exported as snapshots or Prometheus text."""
+
+    def __init__(self, prefix: str = "scaledown"):
+        """Initialize registry.
+
+        Args:
+            prefix: Prefix of the cache metric names
+        """
+        self.prefix = prefix
+        self._metrics: Dict[str, _Metric] = {}
+        self._caches: Dict[str, "weakref.WeakSet"] = {}
+        # Final counts of collected caches, per cache name
+        self._retired: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name: str, description: str, labels: Sequence[str], **options) -> Any:
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, description, labels, **options)
+            elif not isinstance(metric, cls) or metric.labels != tuple(labels):
+                raise ValueError(f"Metric {name} is already registered differently")
+        return metric
+
+    def counter(self, name: str, description: str, labels: Sequence[str] = ()) -> Counter:
+        """Get or create a counter."""
+        return self._get_or_create(Counter, name, description, labels)
+
+    def histogram(self, name: str, description: str, labels: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        """Get or create a histogram."""
+        return self._get_or_create(Histogram, name, description, labels, buckets=buckets)
+
+    def get(self, name: str) -> Optional[_Metric]:
+        """Get a registered metric by name."""
+        return self._metrics.get(name)
+
+    def register_cache(self, name: str, cache, counts: Optional[Dict[str, int]] = None) -> None:
+        """Report a cache's stats() under a name; caches sharing a name are summed.
+
+        The registry only keeps a weak reference, so caches can still be collected.
+
+        Args:
+            name: Cache name the stats are reported under
+            cache: Object with a stats() method
+            counts: The cache's running hits, misses and evictions, in a mapping
+                that does not refer back to the cache; once the cache is collected
+                its final counts stay in the totals, so the counters never go back
+        """
+        with self._lock:
+            caches = self._caches.get(name)
+            if caches is None:
+                caches = self._caches[name] = weakref.WeakSet()
+            caches.add(cache)
+        if counts is not None:
+            weakref.finalize(cache, self._retire_cache, name, counts)
+
+    def _retire_cache(self, name: str, counts: Dict[str, int]) -> None:
+        with self._lock:
+            retired = self._retired.setdefault(name, {})
+            for field, kind, _ in _CACHE_FIELDS:
+                if kind == "counter":
+                    retired[field] = retired.get(field, 0) + counts.get(field, 0)
+
+    def cache_stats(self) -> Dict[str, Dict[str, int]]:
+        """Hits, misses, evictions, size and instance count per cache name.
+
+        Hits, misses and evictions include the caches that were collected.
+        """
+        with self._lock:
+            groups = {name: list(caches) for name, caches in self._caches.items()}
+            retired = {name: dict(counts) for name, counts in self._retired.items()}
+        stats = {}
+        for name, caches in groups.items():
+            totals = {field: 0 for field, _, _ in _CACHE_FIELDS}
+            totals.update(retired.get(name, {}))
+            for cache in caches:
+                cache_stats = cache.stats()
+                for field in totals:
+                    totals[field] += cache_stats[field]
+            totals["instances"] = len(caches)
+            stats[name] = totals
+        return stats
+
+    def snapshot(self) -> Dict[str, Any]:
+        """All metric values as plain dictionaries."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return {
+            "metrics": {
+                metric.name: {"type": metric.kind, "help": metric.description, "values": metric.snapshot()}
+                for metric in metrics
+            },
+            "caches": self.cache_stats(),
+        }
+
+    def render_prometheus(self) -> str:
+        """All metric values in the Prometheus text exposition format."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.description}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric._samples())
+
+        cache_stats = self.cache_stats()
+        for field, kind, description in _CACHE_FIELDS:
+            name = f"{self.prefix}_cache_{field}" + ("_total" if kind == "counter" else "")
+            lines.append(f"# HELP {name} {description}")
+            lines.append(f"# TYPE {name} {kind}")
+            for cache, values in cache_stats.items():
+                lines.append(f"{name}{_format_labels(('cache',), (cache,))} {values[field]}")
+        return "\n".join(lines) + "\n"
+
+    def reset(self) -> None:
+        """Forget all recorded values (cache statistics belong to the caches)."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for metric in metrics:
+            metric.reset()
+
+
+# Global registry instance, created with the module so the metrics below are shared
+_global_registry = MetricsRegistry()
+
+def get_metrics_registry() -> MetricsRegistry:
+    """Get the global metrics registry instance."""
+    return _global_registry
+
+
+LLM_REQUESTS = _global_registry.counter(
+    "scaledown_llm_requests_total", "Provider calls by outcome", ("provider", "model", "status"))
+LLM_ERRORS = _global_registry.counter(
+    "scaledown_llm_errors_total", "Failed provider calls by error type", ("provider", "model", "error"))
+LLM_RETRIES = _global_registry.counter(
+    "scaledown_llm_retries_total", "Calls retried on another model", ("provider", "model", "reason"))
+LLM_LATENCY = _global_registry.histogram(
+    "scaledown_llm_request_duration_seconds", "Provider call latency", ("provider", "model"))
+LLM_INPUT_TOKENS = _global_registry.counter(
+    "scaledown_llm_input_tokens_total", "Prompt and context tokens sent to providers", ("provider", "model"))
+LLM_OUTPUT_TOKENS = _global_registry.counter(
+    "scaledown_llm_output_tokens_total", "Response tokens received from providers", ("provider", "model"))
+OPTIMIZER_OVERHEAD_TOKENS = _global_registry.histogram(
+    "scaledown_optimizer_overhead_tokens", "Tokens added (or removed) by the optimizer pipeline",
+    buckets=TOKEN_BUCKETS)
+RATE_LIMIT_WAIT = _global_registry.histogram(
+    "scaledown_rate_limit_wait_seconds", "Client-side rate-limit sleeps before provider calls", ("provider",))
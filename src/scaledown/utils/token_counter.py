@@ -0,0 +1,48 @@
+"""
+Token counting helpers shared by optimizers and models.
+"""
+from .tracing import span
+
+_encodings = {}
+
+
+def _get_encoding(name: str):
+    """Get (and memoize) a tiktoken encoding; tiktoken is imported on first use.
+
+    Returns None if tiktoken is not installed or does not know the encoding;
+    that failure is memoized too, so it is not retried on every call.
+    """
+    encoding = _encodings.get(name)
+    if encoding is None:
+        try:
+            import tiktoken
+            encoding = tiktoken.get_encoding(name)
+        except Exception:
+            encoding = False
+        _encodings[name] = encoding
+    return encoding or None
+
+
+def count_tokens(text: str, encoding: str = "approx") -> int:
+    """Count the tokens in text.
+
+    Args:
+        text: Text to count tokens for
+        encoding: A tiktoken encoding name (e.g. "cl100k_base") or "approx"
+            for the 4-characters-per-token approximation
+
+    Returns:
+        Number of tokens
+    """
+    with span("scaledown.count_tokens", encoding=encoding, chars=len(text)):
+        tokenizer = _get_encoding(encoding) if encoding != "approx" else None
+        if tokenizer is not None:
+            try:
+                # Special tokens in user text are counted as plain text
+                return len(tokenizer.encode(text, disallowed_special=()))
+            except Exception:
+                # Only this text falls back; the encoding stays in use
+                pass
+
+        # Approximation: 1 token ≈ 4 characters
+        return len(text) // 4
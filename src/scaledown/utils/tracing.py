@@ -0,0 +1,270 @@
+"""
+Lightweight tracing of the prompt pipeline's hot path.
+
+Stages (template rendering, style application, optimizer passes, token
+counting, rate-limit waits and provider calls) are wrapped in spans::
+
+    with span("scaledown.render", template=template.id):
+        ...
+
+While tracing is disabled, the default, span() returns one shared no-op
+context manager, so an instrumented stage costs a global lookup and a call.
+enable_tracing() installs a Tracer that hands finished spans to an exporter,
+such as JsonlExporter (one JSON object per line, works offline), or an
+OpenTelemetryTracer that opens the spans with the OpenTelemetry API instead.
+
+Spans nest through contextvars, so calls run by the RequestScheduler stay
+children of the span that submitted them.
+"""
+import contextvars
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Union
+
+
+class _NoopSpan:
+    """Span returned while tracing is disabled."""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+_current_span: contextvars.ContextVar = contextvars.ContextVar("scaledown_span", default=None)
+
+
+def _new_id(size: int) -> str:
+    return os.urandom(size).hex()
+
+
+class Span:
+    """A timed pipeline stage recorded by a Tracer."""
+
+    def __init__(self, tracer: 'Tracer', name: str, attributes: Dict[str, Any]):
+        self.tracer = tracer
+        self.name = name
+        self.attributes = attributes
+        self.span_id = _new_id(8)
+        self.parent_id: Optional[str] = None
+        self.trace_id: Optional[str] = None
+        self.start_time = 0.0
+        self.duration = 0.0
+        self.error: Optional[str] = None
+        self._started = 0.0
+        self._token = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        """Set an attribute, e.g. a result only known at the end of the stage."""
+        self.attributes[key] = value
+
+    def __enter__(self):
+        parent = _current_span.get()
+        if parent is not None:
+            self.parent_id = parent.span_id
+            self.trace_id = parent.trace_id
+        else:
+            self.trace_id = _new_id(16)
+        self._token = _current_span.set(self)
+        self.start_time = time.time()
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.duration = time.perf_counter() - self._started
+        _current_span.reset(self._token)
+        if exc_type is not None:
+            self.error = f"{exc_type.__name__}: {exc}"
+        self.tracer.exporter.export(self)
+        return False
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert the finished span to a JSON-friendly dictionary."""
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start_time": self.start_time,
+            "duration": self.duration,
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+
+class MemoryExporter:
+    """Keeps finished spans in a list."""
+
+    def __init__(self):
+        self.spans: List[Span] = []
+
+    def export(self, span: Span) -> None:
+        self.spans.append(span)
+
+    def close(self) -> None:
+        pass
+
+
+class JsonlExporter:
+    """Appends finished spans to a file, one JSON object per line."""
+
+    def __init__(self, path: str):
+        """Initialize exporter.
+
+        Args:
+            path: File the spans are appended to
+        """
+        self.path = path
+        self._file = open(path, "a", encoding="utf-8")
+        self._lock = threading.Lock()
+
+    def export(self, span: Span) -> None:
+        line = json.dumps(span.to_dict(), default=str)
+        with self._lock:
+            if not self._file.closed:
+                self._file.write(line + "\n")
+                self._file.flush()
+
+    def close(self) -> None:
+        with self._lock:
+            self._file.close()
+
+
+class Tracer:
+    """Records spans and hands them to an exporter when they end."""
+
+    def __init__(self, exporter=None):
+        """Initialize tracer.
+
+        Args:
+            exporter: Object with export(span) and close() (a MemoryExporter if None)
+        """
+        self.exporter = exporter if exporter is not None else MemoryExporter()
+
+    def span(self, name: str, attributes: Dict[str, Any]):
+        """Create a span; use it as a context manager."""
+        return Span(self, name, attributes)
+
+    def shutdown(self) -> None:
+        """Close the exporter."""
+        self.exporter.close()
+
+
+def _otel_value(value: Any) -> Any:
+    # OpenTelemetry accepts primitives and sequences of primitives
+    if isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, (list, tuple)) and all(isinstance(item, (bool, int, float, str)) for item in value):
+        return list(value)
+    return str(value)
+
+
+class _OpenTelemetrySpan:
+    """Adapts an OpenTelemetry span context manager to the span interface."""
+    __slots__ = ("_manager", "_span")
+
+    def __init__(self, manager):
+        self._manager = manager
+        self._span = None
+
+    def __enter__(self):
+        self._span = self._manager.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return self._manager.__exit__(exc_type, exc, tb)
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        if value is not None:
+            self._span.set_attribute(key, _otel_value(value))
+
+
+class OpenTelemetryTracer(Tracer):
+    """Opens spans with the OpenTelemetry API; exporting is left to its SDK."""
+
+    def __init__(self, tracer=None):
+        """Initialize tracer.
+
+        Args:
+            tracer: An opentelemetry.trace.Tracer (the "scaledown" tracer of the
+                global provider if None)
+        """
+        if tracer is None:
+            try:
+                from opentelemetry import trace
+            except ImportError as e:
+                raise ImportError("opentelemetry-api not installed") from e
+            tracer = trace.get_tracer("scaledown")
+        self._tracer = tracer
+
+    def span(self, name: str, attributes: Dict[str, Any]):
+        attributes = {key: _otel_value(value) for key, value in attributes.items() if value is not None}
+        return _OpenTelemetrySpan(self._tracer.start_as_current_span(name, attributes=attributes))
+
+    def shutdown(self) -> None:
+        pass
+
+
+# Global tracer; None while tracing is disabled
+_global_tracer: Optional[Tracer] = None
+
+
+def span(name: str, **attributes):
+    """Open a span around a pipeline stage, or a no-op while tracing is disabled.
+
+    Args:
+        name: Stage name, e.g. "scaledown.render"
+        **attributes: Span attributes
+
+    Returns:
+        Context manager whose value has set_attribute(key, value)
+    """
+    tracer = _global_tracer
+    if tracer is None:
+        return _NOOP_SPAN
+    return tracer.span(name, attributes)
+
+
+def enable_tracing(target: Union[Tracer, str, Any, None] = None) -> Tracer:
+    """Start tracing.
+
+    Args:
+        target: A Tracer, a path of a JSONL file to append spans to, an
+            exporter, or None to keep spans in memory
+
+    Returns:
+        The installed tracer
+    """
+    global _global_tracer
+    if isinstance(target, Tracer):
+        tracer = target
+    elif isinstance(target, (str, os.PathLike)):
+        tracer = Tracer(JsonlExporter(os.fspath(target)))
+    else:
+        tracer = Tracer(target)
+
+    previous, _global_tracer = _global_tracer, tracer
+    if previous is not None and previous is not tracer:
+        previous.shutdown()
+    return tracer
+
+
+def disable_tracing() -> None:
+    """Stop tracing and close the exporter."""
+    global _global_tracer
+    tracer, _global_tracer = _global_tracer, None
+    if tracer is not None:
+        tracer.shutdown()
+
+
+def get_tracer() -> Optional[Tracer]:
+    """Get the installed tracer, or None while tracing is disabled."""
+    return _global_tracer
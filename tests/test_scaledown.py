@@ -141,6 +141,973 @@ def test_optimization():
         print(f"Words saved: {result['saved_tokens']} ({result['saved_percentage']:.1f}%)")
         print()
 
+def test_scaledown_context_cache(monkeypatch):
+    """Repeated contexts are sent once and then referenced by handle."""
+    from scaledown.tools import llms
+
+    payloads = []
+
+    class FakeResponse:
+        status_code = 200
+
+        def json(self):
+            return {"full_response": "ok", "context_id": "ctx-1"}
+
+    def fake_post(endpoint, headers=None, data=None, timeout=None):
+        payloads.append(json.loads(data))
+        return FakeResponse()
+
+    monkeypatch.setattr(llms.requests, "post", fake_post)
+    llm = llms.ScaledownLLM("scaledown-gpt-4o", 0.0, {"SCALEDOWN_API_KEY": "test"})
+    llm.min_request_interval = 0
+
+    context = "A long retrieved document. " * 100
+    assert llm.call_llm("First question?", 100, context=context) == "ok"
+    assert llm.call_llm("Second question?", 100, context=context) == "ok"
+
+    assert payloads[0]["context"] == context and payloads[0]["max_tokens"] == 100
+    assert payloads[1]["context"] == ""
+    assert payloads[1]["context_id"] == "ctx-1"
+    assert llm.context_cache.stats()["hits"] == 1
+
+
+def test_dedup_optimizer(monkeypatch):
+    """Duplicate paragraphs are dropped in order and savings are reported."""
+    from scaledown.optimization import get_optimizer_registry
+
+    registry = get_optimizer_registry()
+    boilerplate = "Copyright 2024 Example Corp. All rights reserved. Do not redistribute."
+    passage = ("The warranty covers manufacturing defects for two years from the date of purchase, provided the "
+               "product was registered online and used as directed in the manual. Claims must include the original "
+               "receipt, the serial number and a short description of the fault. Repairs are carried out at an "
+               "authorized service center, and replacement parts are covered for the remainder of the original "
+               "warranty period. Damage caused by accidents, misuse, unauthorized modification or normal wear and "
+               "tear is not covered. Shipping to the service center is paid by the customer, while return shipping "
+               "is paid by the manufacturer. The warranty cannot be transferred when the product is resold, and it "
+               "does not affect any statutory rights the customer may have under local consumer law.")
+    # Differs only in punctuation, so it normalizes to an exact duplicate
+    punctuated_copy = passage[:-1] + "!"
+    # One word changed, caught by MinHash
+    near_copy = passage.replace("two years", "three years")
+    returns = "Returns are accepted within thirty days of delivery."
+    context = "\n\n".join([passage, boilerplate, returns, boilerplate, near_copy, punctuated_copy])
+
+    stats = {}
+    optimized = registry.apply_optimizers(context, ["dedup"], stats)
+    assert optimized == "\n\n".join([passage, boilerplate, returns])
+
+    # The report reads the statistics of the pass above instead of deduplicating again
+    dedup = registry.get_optimizer("dedup")
+    assert stats["dedup"] == dedup.analyze(context)
+    calls = []
+    original_deduplicate = dedup.deduplicator.deduplicate
+    monkeypatch.setattr(dedup.deduplicator, "deduplicate",
+                        lambda *args: calls.append(args) or original_deduplicate(*args))
+    report = registry.get_optimization_report(context, optimized, ["dedup"], stats)
+    assert calls == []
+    assert report["dedup"] is stats["dedup"]
+    assert report["dedup"]["exact_duplicates"] == 2
+    assert report["dedup"]["near_duplicates"] == 1
+    assert report["dedup"]["tokens_saved"] > 0
+    assert report["token_change"] < 0
+
+
+def test_prompt_document_pipeline():
+    """Segmented rendering matches the string pipeline and keeps segment kinds."""
+    from scaledown.templates import Template
+    from scaledown.styles.optimization_style import OptimizationStyle
+
+    template = Template("t", "T", "Summarize [doc] for [audience].", "writing")
+    style = OptimizationStyle("s", "S", "desc", ["expert_persona", "cot"], template_modifier="Be concise: ")
+    values = {"doc": "the quarterly report", "audience": "executives"}
+
+    document = style.apply_to_document(template.render_document(**values))
+    assert document.render() == style.apply_to_prompt(template.render(**values))
+    assert [segment.kind for segment in document.segments] == [
+        "system", "instruction", "template", "value", "template", "value", "template", "instruction"
+    ]
+    assert document.token_count() == sum(segment.token_count for segment in document.segments)
+
+
+def test_compiled_template_render():
+    """Values are inserted once and never expanded as placeholders."""
+    template = Template("t", "T", "Compare [a] with [b], then [a] again {literal}.", "writing")
+
+    assert template.render(a="[b]", b="{0}") == "Compare [b] with {0}, then [b] again {literal}."
+    rows = [{"a": i, "b": i * 2} for i in range(3)]
+    assert list(template.render_many(rows)) == [template.render(**row) for row in rows]
+
+    try:
+        template.render(a="x")
+        assert False, "missing placeholder should raise"
+    except ValueError as e:
+        assert "b" in str(e)
+
+
+def test_bulk_render_jsonl(tmp_path):
+    """Rows stream from JSONL to CSV through the template and style."""
+    import csv as csv_module
+    from scaledown.bulk import BulkRenderer
+
+    input_path = tmp_path / "rows.jsonl"
+    input_path.write_text("\n".join(json.dumps({"id": i, "topic": f"topic {i}"}) for i in range(25)) +
+                          "\n" + json.dumps({"id": 99}) + "\n")
+    template = get_default_manager().get_template("writing-1")
+    style = get_default_style_manager().get_style("concise")
+
+    renderer = BulkRenderer(template, style=style, chunk_size=10, on_error="skip")
+    stats = renderer.render_file(str(input_path), str(tmp_path / "out.csv"), id_field="id")
+
+    assert (stats["rows"], stats["rendered"], stats["skipped"], stats["chunks"]) == (26, 25, 1, 3)
+    with open(tmp_path / "out.csv", newline="") as f:
+        rows = list(csv_module.DictReader(f))
+    assert rows[3] == {"id": "3", "prompt": style.apply_to_prompt(template.render(topic="topic 3"))}
+
+
+def test_indexed_template_manager():
+    """Category indexes, pagination and ranked search stay consistent."""
+    from scaledown.categories import CategoryManager
+
+    manager = get_default_manager()
+    manager.add_template(Template("extra-1", "Release Notes", "Write release notes for [version].",
+                                  "technical", "development"))
+
+    assert [t.id for t in manager.list_templates("technical", "development")] == ["technical-2", "extra-1"]
+    assert manager.list_templates(offset=1, limit=2) == manager.list_templates()[1:3]
+    # An empty filter lists everything, as before
+    assert manager.list_templates(category="") == manager.list_templates()
+    assert manager.count_templates("") == len(manager.list_templates())
+    assert manager.search_templates("bug report")[0].id == "technical-2"
+
+    manager.remove_template("technical-2")
+    assert [t.id for t in manager.list_templates("technical", "development")] == ["extra-1"]
+    assert manager.search_templates("bug report") == []
+
+    technical = CategoryManager(manager).get_category("technical")
+    assert technical.template_count == manager.count_templates("technical")
+    assert technical.subcategories["development"] == 1
+
+
+def test_template_and_style_catalogs(tmp_path):
+    """Catalog-backed managers decode entries on first access."""
+    from scaledown.templates import load_template_catalog
+    from scaledown.styles import load_style_catalog
+    from scaledown.utils.catalog import open_catalog, write_packed_catalog
+
+    records = [Template(f"cat-{i}", f"Catalog {i}", f"Explain [topic] number {i}.", "catalog",
+                        "packed" if i % 2 else None).to_dict() for i in range(50)]
+    write_packed_catalog(records, str(tmp_path / "templates.sdcat"))
+
+    manager = load_template_catalog(str(tmp_path / "templates.sdcat"))
+    assert manager.get_template("cat-7").render(topic="caching") == "Explain caching number 7."
+    assert manager.get_template("missing") is None
+    assert len(manager._index.templates) == 1
+    manager.remove_template("cat-3")
+    manager.add_template(Template("local-1", "Local", "Local [topic].", "catalog"))
+    # Unfiltered counts and pages decode only the templates they return
+    assert manager.count_templates() == 50
+    page = manager.list_templates(offset=2, limit=3)
+    assert [t.id for t in page] == ["cat-2", "cat-4", "cat-5"] and len(manager._index.templates) == 5
+    assert [t.id for t in manager.list_templates(offset=48)] == ["cat-49", "local-1"]
+    assert manager.count_templates("catalog", "packed") == 24
+    assert manager.get_template("cat-3") is None
+    assert manager.list_templates(offset=2, limit=3) == page
+    assert [t.id for t in manager.list_templates(offset=48)] == ["cat-49", "local-1"]
+
+    with open_catalog(str(tmp_path / "templates.sdcat")) as catalog:
+        assert catalog.records_at([catalog.record_position("cat-9")])[0]["id"] == "cat-9"
+    try:
+        catalog.get_record("cat-9")
+        assert False, "a closed catalog cannot be read"
+    except ValueError:
+        pass
+
+    styles = tmp_path / "styles"
+    styles.mkdir()
+    (styles / "terse.json").write_text(json.dumps({"name": "Terse", "description": "Short answers",
+                                                   "template_modifier": "Be brief. "}))
+    (styles / "checked.json").write_text(json.dumps({"name": "Checked", "description": "Verified",
+                                                     "optimizers": ["cove"]}))
+    style_manager = load_style_catalog(str(styles))
+    assert style_manager.get_style("terse").apply_to_prompt("Hi") == "Be brief. Hi"
+    assert sorted(s.id for s in style_manager.list_styles()) == ["checked", "terse"]
+    assert style_manager.get_style("checked").optimizers == ("cove",)
+
+    catalog_sd = ScaleDown(template_catalog=str(tmp_path / "templates.sdcat"))
+    assert catalog_sd.select_template("cat-1").id == "cat-1"
+    assert catalog_sd.select_template("technical-2").category == "technical"
+
+
+def test_catalog_hot_reload(tmp_path):
+    """Reloaded catalogs are swapped in whole and keep local changes."""
+    from scaledown.utils.catalog import write_packed_catalog
+    from scaledown.utils.catalog_watcher import CatalogWatcher
+
+    path = str(tmp_path / "templates.sdcat")
+    write_packed_catalog([Template("hot-1", "Hot", "Version one of [topic].", "hot").to_dict(),
+                          Template("hot-2", "Gone", "Removed later.", "hot").to_dict()], path)
+
+    manager = TemplateManager()
+    manager.add_template(Template("local-1", "Local", "Local [topic].", "hot"))
+    watcher = manager.watch_catalog(path, interval=60)
+    watcher.stop()
+    assert manager.search_templates("version")[0].id == "hot-1"
+
+    before = manager._index
+    write_packed_catalog([Template("hot-1", "Hot", "Version two of [topic].", "hot").to_dict(),
+                          Template("hot-3", "New", "Added later.", "hot").to_dict()], path)
+    assert watcher.check()
+    assert not watcher.check()
+
+    assert before.get("hot-1").render(topic="x") == "Version one of x."
+    assert manager.get_template("hot-1").render(topic="x") == "Version two of x."
+    assert [t.id for t in manager.list_templates("hot")] == ["hot-1", "hot-3", "local-1"]
+    assert manager.search_templates("added")[0].id == "hot-3"
+    assert watcher.stats()["reloads"] == 1
+
+    (tmp_path / "broken.sdcat").write_bytes(b"not a catalog")
+    broken = CatalogWatcher(str(tmp_path / "broken.sdcat"), manager.reload_catalog, interval=60)
+    (tmp_path / "broken.sdcat").write_bytes(b"still not a catalog")
+    assert not broken.check()
+    assert broken.stats()["errors"] == 1
+    assert manager.get_template("hot-3") is not None
+
+    # A failing callback is counted too rather than ending the polling thread
+    def failing(catalog):
+        raise KeyError("id")
+
+    failing_watcher = CatalogWatcher(path, failing, interval=60)
+    write_packed_catalog([Template("hot-4", "Newer", "Added last.", "hot").to_dict()], path)
+    assert not failing_watcher.check()
+    assert failing_watcher.stats()["errors"] == 1
+    # The failed reload is retried on the next poll, without another change
+    assert not failing_watcher.check()
+    assert failing_watcher.stats()["errors"] == 2
+
+    # A catalog with a malformed style is closed, not leaked, and the previous one stays
+    from scaledown.styles import StyleManager
+    from scaledown.utils.catalog import open_catalog
+    styles_path = str(tmp_path / "styles.sdcat")
+    write_packed_catalog([{"id": "ok", "name": "OK", "description": "Fine"}], styles_path)
+    style_manager = StyleManager()
+    style_manager.watch_catalog(styles_path, interval=60).stop()
+    write_packed_catalog([{"id": "bad", "name": "Bad", "description": "Broken", "optimizers": 5}],
+                         str(tmp_path / "bad.sdcat"))
+    bad = open_catalog(str(tmp_path / "bad.sdcat"))
+    try:
+        style_manager.reload_catalog(bad)
+        assert False, "a malformed style should raise"
+    except TypeError:
+        pass
+    assert bad._mmap.closed
+    assert style_manager.get_style("ok") is not None
+
+
+def test_get_prompt_memo():
+    """get_prompt reuses rendered prompts until the template, values or style change."""
+    memo_sd = ScaleDown()
+    memo_sd.select_template("technical-2")
+    memo_sd.set_values({p: f"value for {p}" for p in memo_sd.current_template.placeholders})
+    memo_sd.select_style("expert_thinking")
+
+    first = memo_sd.get_prompt()
+    assert memo_sd.get_prompt() is first
+    assert memo_sd.prompt_cache_stats()["hits"] == 1
+
+    placeholder = memo_sd.current_template.placeholders[0]
+    memo_sd.set_value(placeholder, "changed")
+    assert "changed" in memo_sd.get_prompt()
+
+    memo_sd.template_values[placeholder] = "written directly"
+    assert "written directly" in memo_sd.get_prompt()
+
+    memo_sd.set_value(placeholder, f"value for {placeholder}")
+    assert memo_sd.get_prompt() == first
+    memo_sd.select_style("verified_expert")
+    assert memo_sd.get_prompt() != first
+
+    stats = memo_sd.prompt_cache_stats()
+    assert (stats["hits"], stats["misses"]) == (2, 4)
+
+
+def test_optimization_style_lookup():
+    """Optimization styles come from a shared catalog and custom styles are interned."""
+    from scaledown.styles import get_default_optimization_styles, get_optimization_style_by_optimizers
+
+    defaults = get_default_optimization_styles()
+    assert get_default_optimization_styles() is defaults
+    assert get_optimization_style_by_optimizers(["cot", "expert_persona"]) is defaults[0]
+    assert get_optimization_style_by_optimizers(["none"]).id == "baseline"
+    assert get_optimization_style_by_optimizers([]) is None
+
+    custom = get_optimization_style_by_optimizers(["dedup", "cot"])
+    assert custom.id == "custom_dedup_cot"
+    assert get_optimization_style_by_optimizers(["dedup", "cot"]) is custom
+
+    # Shared styles can't be changed in place, and their dicts are copies
+    assert defaults[0].optimizers == ("expert_persona", "cot")
+    defaults[0].to_dict()["optimizers"].append("cove")
+    assert defaults[0].optimizers == ("expert_persona", "cot")
+
+
+def test_shared_base_managers():
+    """ScaleDown instances overlay shared frozen managers and keep their changes private."""
+    from scaledown.templates import get_base_manager
+
+    first, second = ScaleDown(), ScaleDown()
+    assert first.template_manager._base is second.template_manager._base is get_base_manager()
+    assert first.style_manager._base is second.style_manager._base
+
+    style = first.create_expert_style("Technology", "Engineer")
+    assert first.style_manager.get_style(style.id) is style
+    assert second.style_manager.get_style(style.id) is None
+    assert len(first.style_manager.list_styles()) == len(second.style_manager.list_styles()) + 1
+
+    first.template_manager.remove_template("technical-2")
+    assert first.template_manager.get_template("technical-2") is None
+    assert second.template_manager.get_template("technical-2") is not None
+    assert first.template_manager.count_templates() == second.template_manager.count_templates() - 1
+
+    try:
+        get_base_manager().add_template(Template("frozen-1", "Frozen", "Text", "technical"))
+        assert False, "frozen managers must reject changes"
+    except RuntimeError:
+        pass
+    try:
+        get_base_manager().attach_catalog(None)
+        assert False, "frozen managers must reject catalogs"
+    except RuntimeError:
+        pass
+    try:
+        second.template_manager.templates["technical-2"] = None
+        assert False, "templates is read-only"
+    except TypeError:
+        pass
+
+
+def test_catalog_shadowed_by_base(tmp_path):
+    """Catalog entries with a base template's ID are neither counted nor searched."""
+    from scaledown.utils.catalog import write_packed_catalog
+
+    path = str(tmp_path / "templates.sdcat")
+    write_packed_catalog([Template("technical-2", "Shadowed zebra", "Shadowed [topic].", "technical").to_dict(),
+                          Template("technical-new", "New zebra", "New [topic].", "technical").to_dict()], path)
+    manager = ScaleDown(template_catalog=path).template_manager
+    assert manager.count_templates() == len(manager.list_templates())
+    assert manager.count_templates("technical") == len(manager.list_templates("technical"))
+    assert [template.id for template in manager.search_templates("zebra")] == ["technical-new"]
+    assert manager.search_templates("shadowed") == []
+    assert manager.get_template("technical-2").title != "Shadowed zebra"
+
+
+def test_stateless_requests():
+    """build() and execute() work from many threads without touching instance state."""
+    from concurrent.futures import ThreadPoolExecutor
+    from scaledown import PromptRequest
+    from scaledown.models import BaseModel
+
+    class EchoModel(BaseModel):
+        def optimize_prompt(self, prompt):
+            return prompt
+
+        def count_tokens(self, text):
+            return len(text) // 4
+
+        def get_token_limit(self):
+            return 4096
+
+        def optimize_and_call(self, prompt, optimizers, max_tokens=1000, context=""):
+            return {"llm_response": self.optimize_prompt_with_pipeline(prompt, optimizers)}
+
+    shared = ScaleDown()
+    template = shared.template_manager.get_template("technical-2")
+    requests = [PromptRequest("technical-2", {p: f"{p} {i}" for p in template.placeholders},
+                              style="expert_thinking", model=EchoModel("echo"))
+                for i in range(40)]
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        prompts = list(executor.map(shared.build, requests))
+        results = list(executor.map(shared.execute, requests))
+
+    assert all(f"{template.placeholders[0]} {i}" in prompt for i, prompt in enumerate(prompts))
+    assert [r["llm_response"] for r in results] == prompts
+    assert shared.current_template is None and shared.template_values == {}
+
+    request = PromptRequest(question="What is caching?", optimizers=["cot"])
+    assert shared.build(request).startswith("What is caching?")
+    assert request.replace(optimizers=[]).optimizers == ()
+    try:
+        request.max_tokens = 10
+        assert False, "requests must be immutable"
+    except AttributeError:
+        pass
+
+
+def test_http_server():
+    """The embedded server renders, counts tokens, calls the mock model and sheds load."""
+    import asyncio
+    from scaledown.server import ScaleDownServer
+    from scaledown.tools.llms import ProviderTimeoutError, RateLimitError
+
+    async def call(port, method, path, payload=None):
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        body = json.dumps(payload).encode() if payload is not None else b""
+        writer.write(f"{method} {path} HTTP/1.1\r\nHost: test\r\nConnection: close\r\n"
+                     f"Content-Length: {len(body)}\r\n\r\n".encode() + body)
+        await writer.drain()
+        response = await reader.read()
+        writer.close()
+        head, _, data = response.partition(b"\r\n\r\n")
+        return int(head.split()[1]), json.loads(data)
+
+    async def scenario():
+        server = ScaleDownServer(ScaleDown(model_configuration={"MOCK_LATENCY": "0.2"}),
+                                 port=0, workers=1, queue_size=1)
+        await server.start()
+        port = server.port
+
+        status, body = await call(port, "POST", "/render", {"question": "Why cache?", "optimizers": ["cot"]})
+        assert status == 200 and body["prompt"].startswith("Why cache?")
+        assert (await call(port, "POST", "/count-tokens", {"text": "x" * 40}))[1]["tokens"] == 10
+        assert (await call(port, "POST", "/render", {"template": "missing"}))[0] == 400
+        assert (await call(port, "GET", "/nowhere"))[0] == 404
+
+        # One call runs, one waits in the queue and the rest are turned away
+        calls = [asyncio.ensure_future(call(port, "POST", "/optimize-and-call",
+                                            {"question": "Q0", "model": "mock"}))]
+        await asyncio.sleep(0.05)
+        calls += [call(port, "POST", "/optimize-and-call", {"question": f"Q{i}", "model": "mock"})
+                  for i in range(1, 4)]
+        results = await asyncio.gather(*calls)
+        statuses = sorted(status for status, _ in results)
+        assert statuses == [200, 200, 503, 503]
+        assert any(body.get("llm_response", "").startswith("Mock response to:") for _, body in results)
+
+        status, metrics = await call(port, "GET", "/metrics")
+        assert metrics["rejected"] == 2 and metrics["requests"]["/optimize-and-call"] == 4
+        assert "/nowhere" not in metrics["requests"] and metrics["requests"]["unknown"] == 1
+
+        # Provider rate limits and timeouts keep their own status codes
+        def rate_limited(payload):
+            raise RateLimitError("quota exceeded", retry_after=2.5)
+
+        def timed_out(payload):
+            raise ProviderTimeoutError("timed out")
+
+        server.routes[("POST", "/limited")] = rate_limited
+        server.routes[("POST", "/slow")] = timed_out
+        assert (await call(port, "POST", "/limited", {}))[0] == 429
+        assert (await call(port, "POST", "/slow", {}))[0] == 504
+
+        # An idle keep-alive client does not hold up shutdown
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(b"GET /healthz HTTP/1.1\r\nHost: test\r\nContent-Length: 0\r\n\r\n")
+        await writer.drain()
+        assert b"keep-alive" in await reader.readuntil(b"\r\n\r\n")
+        await asyncio.wait_for(server.shutdown(), 5)
+        writer.close()
+
+    asyncio.run(scenario())
+
+
+def test_model_catalog():
+    """Model names resolve through the catalog to providers, limits and prices."""
+    from scaledown.models import ModelSpec, ModelCatalog, get_model_catalog
+    from scaledown.models.llm_model import LLMModel
+    from scaledown.tools.llms import LLMProviderFactory, MockLLM
+
+    catalog = get_model_catalog()
+    assert catalog.resolve("GPT-4o").context_window == 128000
+    # Longest prefix wins: gpt-4o-mini is a gpt-4o, not a gpt-4
+    assert catalog.resolve("gpt-4o-mini").context_window == 128000
+    assert catalog.resolve("gpt-4-0613").context_window == 8192
+    assert catalog.resolve("gemini-2.0-pro").provider == "google"
+    assert catalog.resolve("llama-3") is None
+    assert catalog.get_context_window("llama-3") == 4096
+    assert catalog.resolve("claude-3-haiku-20240307").cost(1_000_000, 1_000_000) == 1.5
+
+    assert isinstance(LLMProviderFactory.create_provider("mock-fast"), MockLLM)
+    try:
+        LLMProviderFactory.create_provider("llama-3")
+        assert False, "unknown model should raise"
+    except ValueError:
+        pass
+    assert LLMModel("mock-fast", temperature=0.0).get_token_limit() == 128000
+
+    # SDK models are picked for names the vendor's API knows, not Scaledown's own
+    from scaledown.models.model_registry import model_registry
+    assert model_registry.get_model_class("scaledown-gpt-4o") is None
+    assert "gpt-4-vision" in model_registry.list_available_models("openai")
+    assert "scaledown-gpt-4o" not in model_registry.list_available_models("openai")
+
+    custom = ModelCatalog(families=[ModelSpec("acme", "mock", "acme", 32000)])
+    custom.register(ModelSpec("acme-xl", "mock", "acme", 64000))
+    assert custom.get_context_window("acme-small") == 32000
+    assert custom.get_context_window("ACME-XL") == 64000
+
+
+def test_request_scheduler():
+    """Scheduled calls run by priority class, then by fair share between tenants."""
+    import asyncio
+    import threading
+    from scaledown.models import RequestScheduler
+    from scaledown.models.llm_model import LLMModel
+
+    scheduler = RequestScheduler(concurrency=1)
+    gate, order = threading.Event(), []
+    blocker = scheduler.submit("p", gate.wait)
+    futures = [scheduler.submit("p", order.append, f"batch-{i}", priority="batch", tenant="a") for i in range(2)]
+    futures += [scheduler.submit("p", order.append, f"a-{i}", tenant="a") for i in range(3)]
+    futures += [scheduler.submit("p", order.append, f"b-{i}", tenant="b") for i in range(2)]
+    futures.append(scheduler.submit("p", order.append, "live", priority="interactive", tenant="c"))
+    gate.set()
+    for future in [blocker] + futures:
+        future.result(timeout=5)
+    assert order == ["live", "a-0", "b-0", "a-1", "b-1", "a-2", "batch-0", "batch-1"]
+
+    stats = scheduler.stats()
+    assert stats["providers"]["p"]["completed"] == 9
+    assert stats["queue_time"]["batch"]["count"] == 2
+    assert stats["tenants"]["a"] == {"submitted": 5, "completed": 5}
+
+    model = LLMModel("mock", configuration={"MOCK_LATENCY": "0"}, scheduler=scheduler, priority="interactive")
+    assert model.call_llm("Hello?").startswith("Mock response to:")
+    assert asyncio.run(model.call_llm_async("Hello?", tenant="b")).startswith("Mock response to:")
+    assert scheduler.stats()["providers"]["mock"]["completed"] == 2
+    scheduler.shutdown()
+
+
+def test_adaptive_concurrency():
+    """Limits grow while latency is flat and back off on latency, 429s and timeouts."""
+    from scaledown.models import AdaptiveConcurrencyLimiter, RequestScheduler
+    from scaledown.models.llm_model import LLMModel
+    from scaledown.tools.llms import ProviderTimeoutError, RateLimitError
+
+    # A cold limiter backs off on the very first 429
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=8, max_limit=8)
+    limiter.record(0.1, RateLimitError("429"))
+    assert limiter.limit == 4
+
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=4, max_limit=8)
+    for _ in range(40):
+        limiter.record(0.1, in_flight=limiter.limit)
+    assert limiter.limit == 8
+    limiter.record(0.1, RateLimitError("429"))
+    assert limiter.limit == 4
+    # Further 429s from the same round of calls are not cut again
+    limiter.record(0.1, RateLimitError("429"))
+    assert limiter.limit == 4
+    for _ in range(4):
+        limiter.record(1.0)
+    assert limiter.limit == 2
+    for _ in range(2):
+        limiter.record(0.1, ProviderTimeoutError("timeout"))
+    assert limiter.limit == 1
+    assert limiter.stats()["decisions"] == {"increase": 4, "latency": 1, "rate_limited": 1, "timeout": 1}
+    assert limiter.acquire(timeout=0) and not limiter.acquire(timeout=0)
+    limiter.release(0.1)
+
+    scheduler = RequestScheduler(concurrency=2, adaptive=True)
+    model = LLMModel("mock", configuration={"MOCK_LATENCY": "0", "MOCK_RATE_LIMIT": "1"}, scheduler=scheduler)
+    futures = [model.submit("Hello?") for _ in range(20)]
+    errors = [future.exception() for future in futures]
+    assert all(error is None or isinstance(error, RateLimitError) for error in errors)
+    stats = scheduler.stats()["providers"]["mock"]
+    assert stats["limit"] == stats["limiter"]["limit"]
+    scheduler.shutdown()
+
+
+def test_model_router():
+    """The router picks the cheapest or fastest model that fits and records each route."""
+    from scaledown.models import ModelCatalog, ModelSpec, RouterModel, get_model_catalog
+    from scaledown.models.llm_model import LLMModelFactory
+
+    # A local catalog, so the test models do not leak into the global one
+    catalog = ModelCatalog([get_model_catalog().resolve("gpt-3.5-turbo")])
+    catalog.register(ModelSpec("mock-router-small", "mock", "mock", 300, input_price=1.0, output_price=1.0,
+                               typical_latency=0.5))
+    catalog.register(ModelSpec("mock-router-large", "mock", "mock", 5000, input_price=4.0, output_price=4.0,
+                               typical_latency=1.0))
+    catalog.register(ModelSpec("mock-router-fast", "mock", "mock", 5000, input_price=8.0, output_price=8.0,
+                               typical_latency=0.1))
+    # gpt-3.5-turbo is cheapest but has no API key configured, so it is skipped
+    candidates = ["gpt-3.5-turbo", "mock-router-small", "mock-router-large", "mock-router-fast"]
+    router = RouterModel(candidates, configuration={"MOCK_LATENCY": "0"}, catalog=catalog)
+
+    result = router.optimize_and_call("Why cache prompts?", ["cot"], max_tokens=100)
+    assert result["model_info"]["routed_to"] == "mock-router-small"
+    long_prompt = "Explain the cache. " * 100
+    assert router.route(long_prompt, 100)[0][0].name == "gpt-3.5-turbo"
+    assert router.optimize_and_call(long_prompt, [], max_tokens=100)["model_info"]["routed_to"] == "mock-router-large"
+    try:
+        router.call_llm("word " * 20000, 100)
+        assert False, "oversized prompt should raise"
+    except ValueError:
+        pass
+
+    stats = router.route_stats()
+    assert stats["mock-router-small"]["calls"] == 1 and stats["mock-router-large"]["calls"] == 1
+    assert stats["mock-router-large"]["input_tokens"] >= 450 and stats["mock-router-large"]["cost"] > 0
+    assert "SCALEDOWN_API_KEY" in stats["gpt-3.5-turbo"]["unavailable"]
+
+    fastest = RouterModel(candidates[1:], policy="fastest", configuration={"MOCK_LATENCY": "0"}, catalog=catalog)
+    assert get_model_catalog().resolve("mock-router-small").context_window == 128000
+    assert fastest.optimize_and_call("Hi", [], max_tokens=10)["model_info"]["routed_to"] == "mock-router-fast"
+    assert LLMModelFactory.create_model("router:fastest").policy == "fastest"
+
+    # Models only the local catalog knows are created from it too
+    catalog.register(ModelSpec("acme-private", "mock", "acme", 5000, input_price=0.5, output_price=0.5))
+    private = RouterModel(["acme-private"] + candidates[1:], configuration={"MOCK_LATENCY": "0"}, catalog=catalog)
+    assert private.optimize_and_call("Hi", [], max_tokens=10)["model_info"]["routed_to"] == "acme-private"
+
+
+def test_output_budget():
+    """max_tokens is predicted from past output lengths unless the caller sets it."""
+    from scaledown.models.llm_model import LLMModel
+    from scaledown.models.output_budget import OutputBudgetPredictor
+
+    predictor = OutputBudgetPredictor(percentile=0.9, headroom=1.0, min_samples=10, min_budget=1)
+    assert predictor.predict("m", ["cot"]) == 1000
+    for tokens in range(1, 101):
+        predictor.record("m", tokens, ["cove"], style="s", template="t")
+    for tokens in range(1, 11):
+        predictor.record("m", tokens, ["cot"], style="s")
+    assert predictor.predict("m", ["cove"], "s", "t") == 92
+    # Too few samples for the template: fall back to the model and optimizers
+    assert predictor.predict("m", ["cot"], "s", "t") == 11
+    assert predictor.predict("m") == 91
+    # A truncated output counts double so the budget can grow again
+    predictor.record("other", 50, budget=50)
+    assert predictor._samples[("other",)][-1] == 100
+
+    model = LLMModel("mock", configuration={"MOCK_LATENCY": "0"},
+                     output_budget=OutputBudgetPredictor(min_samples=3))
+    for _ in range(3):
+        result = model.optimize_and_call("Why cache prompts?", ["cot"], style="expert_thinking")
+    assert result["max_tokens"] == 1000 and result["max_tokens_predicted"]
+    result = model.optimize_and_call("Why cache prompts?", ["cot"], style="expert_thinking")
+    assert result["max_tokens"] < 200 and result["max_tokens_predicted"]
+    result = model.optimize_and_call("Why cache prompts?", ["cot"], max_tokens=500, style="expert_thinking")
+    assert result["max_tokens"] == 500 and not result["max_tokens_predicted"]
+    assert model.output_budget.stats()["groups"][0]["samples"] == 5
+
+
+def test_final_answer_streaming():
+    """Final answers are parsed from streamed chunks and generation stops at the end delimiter."""
+    from scaledown.models.llm_model import LLMModel
+    from scaledown.tools.final_answer import FinalAnswerParser, extract_final_answer
+    from scaledown.tools.llms import LLM
+    from scaledown.tools.prompts import SIMPLEQA_FINAL_ANSWER_FORMAT
+
+    parser = FinalAnswerParser()
+    chunks = ["Reasoning... === FINAL", " ANSWER ===\n1. Ada Lovelace\n2) Alan", " Turing\n=== END FI",
+              "NAL ANSWER ===\nConfidence: 90%"]
+    assert [parser.feed(chunk) for chunk in chunks] == [False, False, False, True]
+    result = parser.result()
+    assert result["items"] == ["Ada Lovelace", "Alan Turing"] and result["complete"]
+    assert result["text"].endswith("=== END FINAL ANSWER ===")
+    assert extract_final_answer("No answer here")["answer"] is None
+
+    produced = []
+
+    class ChattyLLM(LLM):
+        def stream_llm(self, prompt, max_tokens, context="", stop=None):
+            # Ignores stop sequences, so the parser has to cancel it
+            for chunk in chunks + [" more"] * 10:
+                produced.append(chunk)
+                yield chunk
+
+    model = LLMModel("mock", configuration={"MOCK_LATENCY": "0", "MOCK_ANSWER": "Radcliffe College"})
+    result = model.optimize_and_call("Which college? " + SIMPLEQA_FINAL_ANSWER_FORMAT, ["cot"], max_tokens=2000)
+    assert result["final_answer"]["answer"] == "Radcliffe College" and result["final_answer"]["complete"]
+    assert result["llm_response"].endswith("=== END FINAL ANSWER ===")
+    assert "confidence note" not in result["llm_response"]
+    stats = result["response_stats"]
+    assert stats["usage"]["output_tokens"] > 0 and "llm_response" not in result["final_answer"]
+
+    # Cut off by max_tokens inside the answer: incomplete, and no end delimiter is made up
+    result = model.call_for_final_answer("Which college? " + SIMPLEQA_FINAL_ANSWER_FORMAT, max_tokens=203)
+    assert result["answer"] == "Radclif" and not result["complete"]
+    assert not result["text"].endswith("=== END FINAL ANSWER ===")
+
+    model.llm_provider = ChattyLLM("chatty", 0.0, {})
+    result = model.call_for_final_answer("Who?")
+    assert result["stopped_early"] and len(produced) == 4
+
+
+def test_factored_cove():
+    """Factored CoVe drafts, verifies in parallel and revises, and can be compared to the prompt variant."""
+    from scaledown.models.cove import parse_verification_plan
+    from scaledown.models.llm_model import LLMModel
+
+    draft, questions = parse_verification_plan(
+        "=== DRAFT ANSWER ===\nParis\n=== VERIFICATION QUESTIONS ===\n1. Is Paris in France?\n- Is it the capital?\n",
+        max_questions=5)
+    assert draft == "Paris" and questions == ["Is Paris in France?", "Is it the capital?"]
+
+    model = LLMModel("mock", configuration={"MOCK_LATENCY": "0.2", "MOCK_ANSWER": "Radcliffe College"})
+    result = model.optimize_and_call("Which women's college is in Cambridge?", ["cot", "cove"],
+                                     max_tokens=300, cove_mode="factored")
+    assert "VERIFICATION PROCEDURE" not in result["optimized_prompt"]
+    assert result["final_answer"]["answer"] == "Radcliffe College"
+    cove = result["cove"]
+    assert cove["draft"] == "Radcliffe College" and len(cove["verifications"]) == 3
+    assert cove["stats"]["calls"] == 5 and cove["stats"]["output_tokens"] > 0
+    # Three verification calls of 0.2s each run at the same time
+    assert cove["stats"]["stages"]["verify"] < 0.45
+
+    comparison = LLMModel("mock", configuration={"MOCK_LATENCY": "0"}).compare_cove("Why?", max_tokens=300)
+    assert comparison["single"]["calls"] == 1 and comparison["factored"]["calls"] == 5
+    assert all(comparison[variant]["input_tokens"] > 0 for variant in ("single", "factored"))
+
+
+def test_self_consistency():
+    """Samples are voted on by normalized answer and stop once the consensus is reached."""
+    from scaledown.models import RequestScheduler
+    from scaledown.models.llm_model import LLMModel
+    from scaledown.tools.final_answer import normalize_answer
+    from scaledown.tools.prompts import SIMPLEQA_FINAL_ANSWER_FORMAT
+
+    assert normalize_answer("The Radcliffe College.") == normalize_answer("radcliffe  college")
+    assert normalize_answer("1. Bob\n2. Alice") == normalize_answer("1) alice\n2) Bob")
+
+    # One call at a time, so the fourth sample brings the third vote for Paris
+    scheduler = RequestScheduler(concurrency=1)
+    model = LLMModel("mock", configuration={"MOCK_LATENCY": "0.05", "MOCK_ANSWER": "Paris|paris.|Lyon|Paris|Lyon"},
+                     scheduler=scheduler)
+    prompt = "What is the capital of France? " + SIMPLEQA_FINAL_ANSWER_FORMAT
+    result = model.optimize_and_call(prompt, ["cot"], max_tokens=500, samples=5, consensus=0.6)
+    assert result["final_answer"]["answer"] == "Paris"
+    consistency = result["self_consistency"]
+    assert consistency["votes"] == {"paris": 3, "lyon": 1}
+    stats = consistency["stats"]
+    assert stats["samples_completed"] == 4 and stats["samples_stopped"] == 1 and stats["stopped_early"]
+    assert model.sampling_provider(0.7) is not model.llm_provider
+    scheduler.shutdown()
+
+    # Without a consensus every sample runs and the most common answer wins
+    model = LLMModel("mock", configuration={"MOCK_LATENCY": "0", "MOCK_ANSWER": "Lyon|Paris|Paris"})
+    result = model.optimize_and_call(prompt, [], max_tokens=500, samples=3, consensus=1.0)
+    assert result["final_answer"]["answer"] == "Paris"
+    assert result["self_consistency"]["stats"]["samples_completed"] == 3
+    assert not result["self_consistency"]["stats"]["stopped_early"]
+
+    # Rate-limited samples are not votes and do not abort the vote
+    model = LLMModel("mock", configuration={"MOCK_LATENCY": "0.1", "MOCK_RATE_LIMIT": "3"})
+    result = model.optimize_and_call(prompt, [], max_tokens=500, samples=5, consensus=0.4)
+    stats = result["self_consistency"]["stats"]
+    assert result["final_answer"]["answer"] == "Mock answer" and stats["samples_failed"] == 2
+
+
+def test_tracing(tmp_path):
+    """Pipeline stages open nested spans while tracing is enabled and no-ops otherwise."""
+    import json
+    import time
+    from scaledown.models import RequestScheduler
+    from scaledown.utils import tracing
+
+    assert tracing.span("scaledown.render") is tracing._NOOP_SPAN
+
+    tracer = tracing.enable_tracing()
+    try:
+        scheduler = RequestScheduler(concurrency=2)
+        traced_sd = ScaleDown(scheduler=scheduler)
+        traced_sd.select_template("technical-2")
+        traced_sd.set_values({p: f"value for {p}" for p in traced_sd.current_template.placeholders})
+        traced_sd.select_style("expert_thinking")
+        traced_sd.select_model("mock", configuration={"MOCK_LATENCY": "0"})
+        assert traced_sd.current_model.scheduler is scheduler
+        traced_sd.optimize_and_call_llm("", ["cot"], max_tokens=100)
+        scheduler.shutdown()
+
+        spans = tracer.exporter.spans
+        by_name = {}
+        for finished in spans:
+            by_name.setdefault(finished.name, []).append(finished)
+        root = by_name["scaledown.optimize_and_call_llm"][0]
+        assert root.parent_id is None and root.attributes["model"] == "mock"
+        for name in ("scaledown.render", "scaledown.style", "scaledown.optimizer", "scaledown.count_tokens",
+                     "scaledown.scheduler.run", "scaledown.llm_call"):
+            assert all(finished.trace_id == root.trace_id for finished in by_name[name]), name
+        assert "cot" in {finished.attributes["optimizer"] for finished in by_name["scaledown.optimizer"]}
+        # The provider call ran on a scheduler thread but nests under the submitting span
+        ids = {finished.span_id: finished for finished in spans}
+        assert ids[by_name["scaledown.llm_call"][0].parent_id].name == "scaledown.scheduler.run"
+
+        provider = traced_sd.current_model.llm_provider
+        provider.min_request_interval, provider.last_request_time = 0.02, time.time()
+        path = tmp_path / "trace.jsonl"
+        tracing.enable_tracing(str(path))
+        provider._throttle()
+    finally:
+        tracing.disable_tracing()
+
+    assert tracing.get_tracer() is None
+    records = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [record["name"] for record in records] == ["scaledown.rate_limit_wait"]
+    assert records[0]["attributes"]["wait"] > 0
+
+
+def test_metrics():
+    """Provider calls, optimizer overhead, rate-limit waits and caches show up in the metrics."""
+    import time
+    from scaledown.models.llm_model import LLMModel
+    from scaledown.utils.metrics import LLM_LATENCY, LLM_REQUESTS, MetricsRegistry, get_metrics_registry
+
+    registry = MetricsRegistry()
+    calls = registry.counter("calls_total", "Calls", ("provider",))
+    calls.inc(("a",))
+    calls.inc(("a",), 2)
+    latency = registry.histogram("latency_seconds", "Latency", buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        latency.observe(value)
+    text = registry.render_prometheus()
+    assert 'calls_total{provider="a"} 3' in text
+    assert 'latency_seconds_bucket{le="0.1"} 2' in text and 'latency_seconds_bucket{le="+Inf"} 4' in text
+    assert "latency_seconds_count 4" in text
+    assert registry.snapshot()["metrics"]["latency_seconds"]["values"][0]["sum"] == 3.65
+    try:
+        calls.inc(("a", "b"))
+        assert False, "label count is checked"
+    except ValueError:
+        pass
+
+    # Counts of collected caches are kept, so the cache counters never go back
+    import gc
+    from scaledown.utils.cache import LRUCache
+    caches = [LRUCache(2), LRUCache(2)]
+    for cache in caches:
+        registry.register_cache("local", cache, cache._counts)
+        cache.put("key", 1)
+        cache.get("key")
+    del cache, caches
+    gc.collect()
+    assert registry.cache_stats()["local"]["hits"] == 2
+
+    metrics = get_metrics_registry()
+    labels = ("mock", "mock-metrics")
+    before = LLM_REQUESTS.value(labels + ("ok",))
+    model = LLMModel("mock-metrics", configuration={"MOCK_LATENCY": "0"})
+    model.optimize_and_call("Explain caching", ["cot"], max_tokens=50)
+    model.call_llm("Explain caching", 50)
+    assert LLM_REQUESTS.value(labels + ("ok",)) == before + 2
+    snapshot = metrics.snapshot()
+    assert any(entry["labels"] == {"provider": "mock", "model": "mock-metrics"} and entry["count"] >= 2
+               for entry in snapshot["metrics"][LLM_LATENCY.name]["values"])
+    assert snapshot["metrics"]["scaledown_optimizer_overhead_tokens"]["values"][0]["sum"] > 0
+
+    model.llm_provider.min_request_interval, model.llm_provider.last_request_time = 0.01, time.time()
+    model.llm_provider._throttle()
+    metrics_sd = ScaleDown()
+    metrics_sd.select_template("technical-2")
+    metrics_sd.set_values({p: "value" for p in metrics_sd.current_template.placeholders})
+    metrics_sd.get_prompt()
+    metrics_sd.get_prompt()
+    assert metrics.cache_stats()["prompt"]["hits"] >= 1
+
+    text = metrics.render_prometheus()
+    assert 'scaledown_llm_output_tokens_total{provider="mock",model="mock-metrics"}' in text
+    assert 'scaledown_rate_limit_wait_seconds_count{provider="mock"}' in text
+    assert 'scaledown_cache_hits_total{cache="prompt"}' in text
+
+
+def test_llm_response():
+    """Providers return structured responses with usage and latency; call_llm stays plain text."""
+    from scaledown.models import RequestScheduler
+    from scaledown.models.llm_model import LLMModel
+    from scaledown.tools.llm_response import LLMResponse
+    from scaledown.tools.llms import MockLLM, ScaledownLLM
+
+    provider = MockLLM("mock", 0.0, {"MOCK_LATENCY": "0"})
+    response = provider.generate("Explain caching", 100, context="Some context", raw=True)
+    assert response.text == provider.call_llm("Explain caching", 100, context="Some context")
+    assert response.input_tokens == len("Explain cachingSome context") // 4
+    assert response.output_tokens == len(response.text) // 4 and response.cached_tokens == 0
+    assert response.raw["usage"]["output_tokens"] == response.output_tokens
+    assert provider.generate("Explain caching", 100).raw is None
+    try:
+        response.text = "changed"
+        assert False, "responses are immutable"
+    except AttributeError:
+        pass
+    assert response.replace(retries=2).retries == 2 and str(response) == response.text
+
+    # Usage and compression statistics of a Scaledown API payload
+    result = {"full_response": "Hi", "compression_ratio": 0.4, "tokens_saved": 120,
+              "usage": {"prompt_tokens": 80, "completion_tokens": 5, "prompt_tokens_details": {"cached_tokens": 64}}}
+    assert ScaledownLLM._response_text(result) == "Hi"
+    assert ScaledownLLM._usage(result) == {"input_tokens": 80, "output_tokens": 5, "cached_tokens": 64}
+    assert ScaledownLLM._compression_stats(result) == {"compression_ratio": 0.4, "tokens_saved": 120}
+    assert ScaledownLLM._usage({"text": "Hi"}) == {"input_tokens": None, "output_tokens": None,
+                                                   "cached_tokens": None}
+
+    # Time spent behind another call in the scheduler is reported as queue time
+    scheduler = RequestScheduler(concurrency=1)
+    model = LLMModel("mock", configuration={"MOCK_LATENCY": "0.05"}, scheduler=scheduler)
+    first = model.submit("First question", 50)
+    response = model.generate("Second question", 50)
+    assert isinstance(response, LLMResponse) and first.result()
+    assert response.queue_time >= 0.03 and response.generation_time >= 0.04
+    assert response.latency == response.queue_time + response.connect_time + response.generation_time
+    scheduler.shutdown()
+
+    result = LLMModel("mock", configuration={"MOCK_LATENCY": "0"}).optimize_and_call("Explain caching", [],
+                                                                                     max_tokens=100)
+    stats = result["response_stats"]
+    assert stats["usage"]["output_tokens"] == len(result["llm_response"]) // 4
+    assert stats["retries"] == 0 and set(stats["latency"]) == {"queue", "connect", "generation", "total"}
+
+
+def test_token_counter(monkeypatch):
+    """A text the tokenizer rejects falls back to the approximation without disabling the encoding."""
+    from scaledown.utils import token_counter
+
+    class FlakyEncoding:
+        def encode(self, text, disallowed_special=()):
+            if "\ud800" in text:
+                raise ValueError("unpaired surrogate")
+            return text.split()
+
+    monkeypatch.setitem(token_counter._encodings, "flaky", FlakyEncoding())
+    assert token_counter.count_tokens("one two three", "flaky") == 3
+    assert token_counter.count_tokens("bad \ud800 text!", "flaky") == 2
+    assert token_counter.count_tokens("one two", "flaky") == 2
+
+
+def test_scaledown_final_answer(monkeypatch):
+    """Final answers from the Scaledown API are complete when generation ended at the end delimiter."""
+    from scaledown.models.llm_model import LLMModel
+    from scaledown.tools import llms
+
+    responses = []
+
+    class FakeResponse:
+        status_code = 200
+
+        def json(self):
+            return responses.pop(0)
+
+    monkeypatch.setattr(llms.requests, "post", lambda *args, **kwargs: FakeResponse())
+    model = LLMModel("scaledown-gpt-4o", configuration={"SCALEDOWN_API_KEY": "test"})
+    model.llm_provider.min_request_interval = 0
+
+    # The upstream model ran past the delimiter and the client cut it there
+    responses.append({"full_response": "=== FINAL ANSWER ===\nRadcliffe College\n=== END FINAL ANSWER ===\nDone."})
+    result = model.call_for_final_answer("Which college?")
+    assert result["answer"] == "Radcliffe College" and result["complete"]
+
+    # The API stopped at the delimiter itself
+    responses.append({"choices": [{"message": {"content": "=== FINAL ANSWER ===\nRadcliffe College\n"},
+                                   "finish_reason": "stop"}]})
+    assert model.call_for_final_answer("Which college?")["complete"]
+
+    # Cut off by max_tokens
+    responses.append({"choices": [{"message": {"content": "=== FINAL ANSWER ===\nRadcl"},
+                                   "finish_reason": "length"}]})
+    result = model.call_for_final_answer("Which college?")
+    assert result["answer"] == "Radcl" and not result["complete"]
+
+
 def main():
     """Run all tests."""
     print_separator("SCALEDOWN TESTING")
@@ -154,4 +1121,4 @@ def main():
     print_separator("TESTING COMPLETE")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()